@@ -6,6 +6,20 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
 
 from mangum import Mangum
 from app.main import app
+from app.services.counters import flush_counters
+
+
+async def app_with_counter_flush(scope, receive, send):
+    """
+    Flush buffered counters after every request: with no lifespan there is
+    no shutdown flush, and a frozen or recycled function would lose them.
+    """
+    try:
+        await app(scope, receive, send)
+    finally:
+        if scope["type"] == "http":
+            await flush_counters()
+
 
 # Wrap FastAPI with Mangum for serverless compatibility
-handler = Mangum(app, lifespan="off")
+handler = Mangum(app_with_counter_flush, lifespan="off")
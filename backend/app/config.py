@@ -24,11 +24,37 @@ class Settings(BaseSettings):
     # Redis
     redis_url: str = Field(default="redis://localhost:6379/0")
     
+    # Realtime messaging: "memory" (single process) or "redis" (multi-worker)
+    realtime_backend: str = Field(default="memory")
+    
+    # API worker processes (uvicorn --workers also defaults to WEB_CONCURRENCY).
+    # Unless it is set to 1 or REALTIME_BACKEND=redis, the in-process
+    # principal cache is off, since invalidations might not reach every worker
+    web_concurrency: Optional[int] = None
+    
+    # Shared cache tier for authenticated users: "memory" or "redis"
+    cache_backend: str = Field(default="memory")
+    
+    # Background jobs: queued in Postgres; "redis" adds instant worker wake-ups
+    job_backend: str = Field(default="postgres")
+    job_concurrency: int = Field(default=4)  # Jobs in flight per worker process
+    job_poll_interval_seconds: float = Field(default=1.0)
+    
+    # View/response/download counter buffer: "memory" (per worker) or "redis" (shared)
+    counter_backend: str = Field(default="memory")
+    
     # JWT Authentication
     jwt_secret: str = Field(..., min_length=32, description="JWT signing secret")
     jwt_algorithm: str = Field(default="HS256")
     jwt_expiry_minutes: int = Field(default=60)
     
+    # Password hashing: bcrypt cost, thread pool size (default: CPU count)
+    # and how many hashes may run or wait before logins get 503
+    # (default: 8 per worker, about 2-3 s of backlog)
+    bcrypt_rounds: int = Field(default=12, ge=4, le=31)
+    password_hash_workers: Optional[int] = None
+    password_hash_max_pending: Optional[int] = None
+    
     # Google OAuth
     google_client_id: Optional[str] = None
     google_client_secret: Optional[str] = None
@@ -38,6 +64,7 @@ class Settings(BaseSettings):
     midtrans_client_key: Optional[str] = None
     midtrans_is_production: bool = Field(default=False)
     midtrans_merchant_id: Optional[str] = None
+    midtrans_base_url: Optional[str] = None  # Override gateway hosts, e.g. a local fake_midtrans.py
     
     # Encryption
     hashids_salt: str = Field(..., description="Salt for Hashids ID obfuscation")
@@ -45,9 +72,20 @@ class Settings(BaseSettings):
     signed_url_expiry_seconds: int = Field(default=1800)  # 30 minutes
     
     # Storage
+    storage_backend: str = Field(default="local")  # local, s3, supabase
     storage_path: str = Field(default="./storage/documents")
     storage_bucket: Optional[str] = None  # Supabase storage bucket
     
+    # S3-compatible storage (AWS S3, MinIO, Cloudflare R2, ...)
+    s3_bucket: Optional[str] = None
+    s3_endpoint_url: Optional[str] = None  # Leave empty for AWS
+    s3_region: Optional[str] = None
+    s3_access_key_id: Optional[str] = None
+    s3_secret_access_key: Optional[str] = None
+    
+    # Document previews (background thumbnail rendering)
+    preview_workers: int = Field(default=2)  # Render threads per process
+    
     # CORS
     cors_origins: str = Field(default="http://localhost:5500")
     
@@ -4,6 +4,10 @@ Uplokal Backend - Database Module
 Async SQLAlchemy database connection and session management.
 """
 
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import get_settings
@@ -22,6 +26,19 @@ engine = create_async_engine(
     }
 )
 
+# Per-request SQL statement counter, set by the request middleware in main.py
+query_counter: ContextVar[Optional[List[int]]] = ContextVar("query_counter", default=None)
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    """Count a statement against the current request, if one is tracking."""
+    counter = query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+event.listen(engine.sync_engine, "before_cursor_execute", count_query)
+
 # Session factory
 async_session_maker = async_sessionmaker(
     engine,
@@ -13,9 +13,18 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from app.config import get_settings
-from app.database import init_db, close_db
+from app.database import init_db, close_db, query_counter
+from app.services.pubsub import close_hub
+from app.services.storage import close_storage
+from app.services.previews import close_previews
+from app.services.jobs import close_jobs
+from app.services.payment import close_midtrans
+from app.services.auth import close_password_hasher
+from app.services.principal_cache import close_principal_cache
+from app.services.matching import close_matching
+from app.services.counters import close_counters
 from app.routers import auth, business, diagnostic, documents, rfq, messages, admin
-from app.routers import subscription, payment
+from app.routers import subscription, payment, jobs
 
 settings = get_settings()
 
@@ -30,6 +39,15 @@ async def lifespan(app: FastAPI):
     await init_db()
     yield
     # Shutdown
+    await close_principal_cache()
+    await close_hub()
+    await close_previews()
+    await close_jobs()
+    await close_midtrans()
+    close_password_hasher()
+    await close_matching()
+    await close_counters()
+    await close_storage()
     await close_db()
 
 
@@ -54,10 +72,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["*"],
-    expose_headers=["X-Request-ID"]
+    expose_headers=["X-Request-ID", "X-Next-Cursor", "X-Query-Count", "ETag", "Content-Range", "Accept-Ranges", "Location"]
 )
 
 
+# Query Count Middleware
+@app.middleware("http")
+async def count_queries(request: Request, call_next):
+    """Expose the number of SQL statements a request ran (debug only)."""
+    if not settings.debug:
+        return await call_next(request)
+    
+    counter = [0]
+    token = query_counter.set(counter)
+    try:
+        response = await call_next(request)
+    finally:
+        query_counter.reset(token)
+    
+    response.headers["X-Query-Count"] = str(counter[0])
+    return response
+
+
 # Security Headers Middleware
 @app.middleware("http")
 async def add_security_headers(request: Request, call_next):
@@ -101,6 +137,7 @@ app.include_router(messages.router, prefix="/api/messages", tags=["Messages"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 app.include_router(subscription.router, prefix="/api/subscription", tags=["Subscription"])
 app.include_router(payment.router, prefix="/api/payment", tags=["Payment"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
 
 
 # Health check endpoint
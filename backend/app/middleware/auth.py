@@ -4,14 +4,20 @@ Uplokal Backend - Authentication Middleware
 JWT token verification and user injection for protected routes.
 """
 
-from typing import Optional
+from typing import Optional, Sequence
 from fastapi import Request, HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select, inspect as sa_inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.database import get_db
 from app.services.auth import decode_access_token, get_user_id_from_token
+from app.services.principal_cache import (
+    get_principal, set_principal, make_snapshot, user_from_snapshot
+)
 from app.models.user import User
+from app.models.business import Business
 
 
 # HTTP Bearer scheme for Authorization header
@@ -39,6 +45,39 @@ async def get_token_from_request(request: Request) -> Optional[str]:
     return None
 
 
+async def load_principal(db: AsyncSession, user_id: int) -> tuple:
+    """
+    Load a user and the id of the business they own.
+    
+    Served from the principal cache when possible; otherwise one joined
+    query, whose result is cached (the business row is loaded into the
+    session too, so `get_current_business` needs no extra query).
+    
+    Returns:
+        (user or None, business_id or None)
+    """
+    snapshot = await get_principal(user_id)
+    if snapshot is not None:
+        # Attach to this session without a SELECT
+        user = await db.merge(user_from_snapshot(snapshot), load=False)
+        return user, snapshot["business_id"]
+    
+    result = await db.execute(
+        select(User, Business)
+        .outerjoin(Business, Business.owner_id == User.id)
+        .where(User.id == user_id)
+        .limit(1)
+    )
+    row = result.first()
+    if row is None:
+        return None, None
+    
+    user, business = row
+    business_id = business.id if business else None
+    await set_principal(user_id, make_snapshot(user, business_id))
+    return user, business_id
+
+
 async def get_current_user(
     request: Request,
     db: AsyncSession = Depends(get_db)
@@ -46,6 +85,9 @@ async def get_current_user(
     """
     Dependency to get the current authenticated user.
     
+    The owned business id (or None) is available afterwards as
+    `request.state.business_id`.
+    
     Usage in routes:
         @router.get("/protected")
         async def protected_route(user: User = Depends(get_current_user)):
@@ -69,9 +111,9 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"}
         )
     
-    # Get user from database
+    # Get user from the principal cache or database
     user_id = int(payload.get("sub"))
-    user = await db.get(User, user_id)
+    user, business_id = await load_principal(db, user_id)
     
     if not user:
         raise HTTPException(
@@ -85,6 +127,7 @@ async def get_current_user(
             detail="Account is deactivated"
         )
     
+    request.state.business_id = business_id
     return user
 
 
@@ -127,3 +170,77 @@ class AuthRequired:
             )
         
         return user
+
+
+async def resolve_business(
+    request: Request,
+    db: AsyncSession,
+    load: Sequence[str] = ()
+) -> Optional[Business]:
+    """
+    Get the current user's business, memoized for the request.
+    
+    Must run after `get_current_user`. Relationships named in `load`
+    are eager-loaded (or refreshed onto an already-loaded business).
+    """
+    if hasattr(request.state, "business"):
+        business = request.state.business
+    else:
+        business_id = getattr(request.state, "business_id", None)
+        options = [selectinload(getattr(Business, name)) for name in load]
+        business = await db.get(Business, business_id, options=options) if business_id else None
+        request.state.business = business
+    
+    if business is not None and load:
+        unloaded = [name for name in load if name in sa_inspect(business).unloaded]
+        if unloaded:
+            await db.refresh(business, attribute_names=unloaded)
+    
+    return business
+
+
+class CurrentBusiness:
+    """
+    Dependency class for the current user's business.
+    
+    Usage in routes:
+        @router.get("/mine")
+        async def my_route(business: Business = Depends(get_current_business)):
+            ...
+        
+        # Custom 404 message and eager-loaded relationships
+        Depends(CurrentBusiness(detail="No business", load=("documents",)))
+    """
+    
+    def __init__(
+        self,
+        required: bool = True,
+        detail: str = "Business profile required",
+        load: Sequence[str] = ()
+    ):
+        self.required = required
+        self.detail = detail
+        self.load = tuple(load)
+    
+    async def __call__(
+        self,
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        user: User = Depends(get_current_user)
+    ) -> Optional[Business]:
+        business = await resolve_business(request, db, self.load)
+        
+        if business is None and self.required:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=self.detail
+            )
+        
+        return business
+
+
+# 404 if the user has no business profile
+get_current_business = CurrentBusiness()
+
+# None if the user has no business profile
+get_optional_business = CurrentBusiness(required=False)
@@ -2,11 +2,13 @@
 
 from app.models.user import User, UserRole, OAuthProvider
 from app.models.business import Business
-from app.models.document import Document
-from app.models.rfq import RFQ, RFQResponse
+from app.models.document import Document, Blob
+from app.models.rfq import RFQ, RFQResponse, RFQMatch
 from app.models.message import Message, Conversation
 from app.models.subscription import SubscriptionPlan, UserSubscription, SubscriptionTier, SubscriptionStatus
 from app.models.payment import PaymentTransaction, PaymentStatus, PaymentMethod
+from app.models.job import Job, JobStatus
+from app.models.matching import MatchIndexChange
 
 __all__ = [
     "User",
@@ -14,8 +16,10 @@ __all__ = [
     "OAuthProvider",
     "Business", 
     "Document",
+    "Blob",
     "RFQ",
     "RFQResponse",
+    "RFQMatch",
     "Message",
     "Conversation",
     "SubscriptionPlan",
@@ -24,5 +28,8 @@ __all__ = [
     "SubscriptionStatus",
     "PaymentTransaction",
     "PaymentStatus",
-    "PaymentMethod"
+    "PaymentMethod",
+    "Job",
+    "JobStatus",
+    "MatchIndexChange"
 ]
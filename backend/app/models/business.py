@@ -5,15 +5,37 @@ UMKM business profile with diagnostic data.
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, DDL, Index, event
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 
+# Full-text search for the directory (PostgreSQL only).
+# `search_vector` is a generated column kept up to date by the database;
+# the trigram index on name gives prefix/typo tolerance for product names.
+BUSINESS_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE businesses ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(tagline, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_businesses_search_vector ON businesses USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_businesses_name_trgm ON businesses USING GIN (name gin_trgm_ops)",
+]
+
+
 class Business(Base):
     """Business profile model for UMKM."""
     
     __tablename__ = "businesses"
+    __table_args__ = (
+        # Backs directory keyset paging on (is_featured, health_score, id)
+        Index("ix_businesses_directory_order", "is_verified", "is_featured", "health_score", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
@@ -76,3 +98,11 @@ class Business(Base):
     
     def __repr__(self):
         return f"<Business(id={self.id}, name={self.name})>"
+
+
+for _statement in BUSINESS_SEARCH_DDL:
+    event.listen(
+        Business.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="postgresql")
+    )
@@ -6,7 +6,7 @@ Document vault with encryption support.
 
 from datetime import datetime
 from enum import Enum as PyEnum
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, BigInteger, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, BigInteger, Enum, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -21,6 +21,37 @@ class DocumentCategory(str, PyEnum):
     OTHER = "other"
 
 
+class Blob(Base):
+    """
+    Content-addressed stored file, shared by every document with the
+    same plaintext content and the same encryption at rest.
+    
+    `ref_count` is the number of documents pointing at the blob; the
+    file is removed when the last one is deleted.
+    """
+    
+    __tablename__ = "blobs"
+    __table_args__ = (
+        # An encrypted upload never shares a plaintext object, or the reverse
+        UniqueConstraint("content_hash", "is_encrypted", name="uq_blobs_content_hash_encrypted"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False)  # SHA-256 of the plaintext, hex
+    is_encrypted = Column(Boolean, nullable=False, default=True)  # Stored AES-GCM encrypted
+    size = Column(BigInteger, nullable=False)  # Plaintext bytes
+    stored_size = Column(BigInteger)  # Bytes on storage (encrypted)
+    
+    storage_path = Column(String(500), nullable=False)
+    storage_type = Column(String(20), default="local")
+    
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<Blob(id={self.id}, hash={self.content_hash[:12]}, refs={self.ref_count})>"
+
+
 class Document(Base):
     """Document model for the Document Vault."""
     
@@ -29,15 +60,17 @@ class Document(Base):
     id = Column(Integer, primary_key=True, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     business_id = Column(Integer, ForeignKey("businesses.id"))
+    blob_id = Column(Integer, ForeignKey("blobs.id"), index=True)
     
     # File info
     filename = Column(String(255), nullable=False)
     original_filename = Column(String(255), nullable=False)
     mime_type = Column(String(100))
     file_size = Column(BigInteger)  # In bytes
+    content_hash = Column(String(64), index=True)  # SHA-256 of the plaintext, hex
     
     # Storage
-    storage_path = Column(String(500), nullable=False)  # Encrypted path
+    storage_path = Column(String(500), nullable=False)  # Encrypted path (the blob's, when set)
     storage_type = Column(String(20), default="local")  # local, s3
     
     # Metadata
@@ -0,0 +1,61 @@
+"""
+Uplokal Backend - Background Job Model
+=======================================
+Durable queue of slow side effects (AI analysis, payment gateway calls),
+run by the worker process (`python -m app.worker`).
+"""
+
+from datetime import datetime
+from enum import Enum as PyEnum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, JSON, Index
+
+from app.database import Base
+
+
+class JobStatus(str, PyEnum):
+    """Job lifecycle."""
+    QUEUED = "queued"        # Waiting for a worker (or for its retry time)
+    RUNNING = "running"      # Claimed by a worker
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"        # Out of attempts
+
+
+class Job(Base):
+    """
+    A unit of background work.
+
+    Workers claim queued rows with FOR UPDATE SKIP LOCKED, so any number
+    of them can poll the table without handing out a job twice.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)  # Registered handler, e.g. "diagnostic.analyze"
+    payload = Column(JSON, nullable=False, default=dict)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+
+    # Clients retrying a request get the job they already started
+    idempotency_key = Column(String(255), unique=True)
+
+    status = Column(Enum(JobStatus, native_enum=False), nullable=False, default=JobStatus.QUEUED)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Earliest next run
+
+    # Worker lease; expired leases are requeued
+    locked_by = Column(String(100))
+    locked_at = Column(DateTime)
+
+    result = Column(JSON)
+    last_error = Column(Text)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        # Claim query: queued jobs that are due, oldest first
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    def __repr__(self):
+        return f"<Job {self.id}: {self.name} ({self.status})>"
@@ -0,0 +1,28 @@
+"""
+Uplokal Backend - Match Index Change Feed
+==========================================
+Outbox of business profile changes that affect matchmaking, written in
+the same transaction as the change. Every API process tails the feed to
+keep its in-memory match index fresh (see app/services/matching.py).
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+
+from app.database import Base
+
+
+class MatchIndexChange(Base):
+    """One business whose matching features (may) have changed."""
+    __tablename__ = "match_index_changes"
+
+    id = Column(Integer, primary_key=True)  # Feed position; readers remember the last one applied
+    # NULL asks every process to rebuild its whole index (rebuild_match_index.py)
+    business_id = Column(Integer, ForeignKey("businesses.id", ondelete="CASCADE"))
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)  # Lag, pruning
+
+    business = relationship("Business")
+
+    def __repr__(self):
+        return f"<MatchIndexChange {self.id}: business {self.business_id}>"
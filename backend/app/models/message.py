@@ -5,15 +5,24 @@ Messaging system for B2B communication.
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 
+# Characters of the latest message kept on the conversation for the inbox
+PREVIEW_LENGTH = 100
+
+
 class Conversation(Base):
     """Conversation between two parties."""
     
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Inbox reads for either participant, newest first
+        Index("ix_conversations_participant_1_last", "participant_1_id", "last_message_at"),
+        Index("ix_conversations_participant_2_last", "participant_2_id", "last_message_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -29,6 +38,12 @@ class Conversation(Base):
     is_archived_1 = Column(Boolean, default=False)  # Archived by participant 1
     is_archived_2 = Column(Boolean, default=False)  # Archived by participant 2
     
+    # Inbox snapshot (denormalized from messages, see services/inbox.py)
+    unread_count_1 = Column(Integer, default=0)  # Unread by participant 1
+    unread_count_2 = Column(Integer, default=0)  # Unread by participant 2
+    last_message_preview = Column(String(PREVIEW_LENGTH))
+    last_sender_id = Column(Integer, ForeignKey("users.id"))
+    
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     last_message_at = Column(DateTime, default=datetime.utcnow)
@@ -44,6 +59,10 @@ class Message(Base):
     """Individual message within a conversation."""
     
     __tablename__ = "messages"
+    __table_args__ = (
+        # Backs message history keyset paging on (created_at, id)
+        Index("ix_messages_conversation_created", "conversation_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
@@ -6,7 +6,7 @@ Request for Quotation for B2B Matchmaking.
 
 from datetime import datetime
 from enum import Enum as PyEnum
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Enum, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Enum, Numeric, Index, SmallInteger, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -32,6 +32,10 @@ class RFQ(Base):
     """Request for Quotation model."""
     
     __tablename__ = "rfqs"
+    __table_args__ = (
+        # Backs RFQ list keyset paging on (created_at, id)
+        Index("ix_rfqs_status_created", "status", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     business_id = Column(Integer, ForeignKey("businesses.id"), nullable=False)
@@ -71,15 +75,45 @@ class RFQ(Base):
     # Relationships
     business = relationship("Business", back_populates="rfqs")
     responses = relationship("RFQResponse", back_populates="rfq")
+    matches = relationship("RFQMatch", back_populates="rfq", passive_deletes=True)
     
     def __repr__(self):
         return f"<RFQ(id={self.id}, title={self.title})>"
 
 
+class RFQMatch(Base):
+    """An open RFQ in a supplier's suggestion feed (see app/services/rfq_matching.py)."""
+    
+    __tablename__ = "rfq_matches"
+    __table_args__ = (
+        # Backs a supplier's feed, keyset-paged best first
+        Index("ix_rfq_matches_business_score", "business_id", "score", "rfq_id"),
+    )
+    
+    rfq_id = Column(Integer, ForeignKey("rfqs.id", ondelete="CASCADE"), primary_key=True)
+    business_id = Column(Integer, ForeignKey("businesses.id", ondelete="CASCADE"), primary_key=True)
+    
+    score = Column(SmallInteger, nullable=False)  # 0-100
+    reasons = Column(JSON)  # Human-readable match reasons
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    rfq = relationship("RFQ", back_populates="matches")
+    business = relationship("Business")
+    
+    def __repr__(self):
+        return f"<RFQMatch(rfq_id={self.rfq_id}, business_id={self.business_id}, score={self.score})>"
+
+
 class RFQResponse(Base):
     """Response to an RFQ from a supplier."""
     
     __tablename__ = "rfq_responses"
+    __table_args__ = (
+        # One quote per supplier, even for concurrent submissions
+        UniqueConstraint("rfq_id", "responder_id", name="uq_rfq_responses_rfq_responder"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     rfq_id = Column(Integer, ForeignKey("rfqs.id"), nullable=False)
@@ -6,8 +6,8 @@ User authentication and role management.
 
 from datetime import datetime
 from enum import Enum as PyEnum
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Index
+from sqlalchemy.orm import relationship, deferred
 from app.database import Base
 
 
@@ -28,10 +28,17 @@ class User(Base):
     """User model for authentication and profile."""
     
     __tablename__ = "users"
+    __table_args__ = (
+        # Backs admin user list keyset paging on (created_at, id)
+        Index("ix_users_created", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, nullable=False, index=True)
-    password_hash = Column(String(255), nullable=True)  # Nullable for OAuth users
+    # Nullable for OAuth users. Never loaded unless asked for with
+    # undefer(User.password_hash): cached principals don't carry it, and
+    # reading it from one raises instead of lazy-loading outside a greenlet
+    password_hash = deferred(Column(String(255), nullable=True), raiseload=True)
     full_name = Column(String(255))
     phone = Column(String(20))
     avatar_url = Column(String(500))  # Profile picture from OAuth
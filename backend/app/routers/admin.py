@@ -5,10 +5,10 @@ Protected admin routes with RBAC.
 """
 
 from datetime import datetime
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from pydantic import BaseModel
-from sqlalchemy import select, func
+from sqlalchemy import select, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
@@ -18,7 +18,11 @@ from app.models.document import Document
 from app.models.rfq import RFQ
 from app.middleware.auth import get_current_user
 from app.middleware.rbac import RequireRole, require_admin, require_super_admin
+from app.services.auth import get_password_hasher
 from app.services.encryption import encode_id
+from app.services.matching import get_match_updater, record_match_change
+from app.services.principal_cache import invalidate_principal
+from app.utils.pagination import encode_cursor, decode_cursor, datetime_to_cursor, cursor_to_datetime
 
 router = APIRouter()
 
@@ -104,18 +108,43 @@ async def get_admin_stats(
     )
 
 
+@router.get("/metrics")
+async def get_runtime_metrics(
+    admin: User = Depends(require_admin)
+) -> Dict[str, Any]:
+    """
+    Runtime metrics of this API process.
+    
+    - password_hashing: bcrypt pool size, queue depth, rejections and
+      average wait/run times
+    - match_index: businesses indexed, change feed position and
+      freshness lag (how old an unapplied profile change can be)
+    
+    Requires: admin or super_admin role
+    """
+    return {
+        "password_hashing": get_password_hasher().stats(),
+        "match_index": get_match_updater().stats()
+    }
+
+
 @router.get("/users", response_model=List[AdminUserResponse])
 async def list_users(
+    response: Response,
     role: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
     limit: int = Query(default=50, le=200),
     offset: int = Query(default=0),
+    cursor: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(require_admin)
 ):
     """
     List all users.
     
+    - Next page cursor is returned in the `X-Next-Cursor` header;
+      pass it back as `cursor` (`offset` still works)
+    
     Requires: admin or super_admin role
     """
     query = select(User)
@@ -130,11 +159,25 @@ async def list_users(
     if is_active is not None:
         query = query.where(User.is_active == is_active)
     
-    query = query.order_by(User.created_at.desc()).offset(offset).limit(limit)
+    query = query.order_by(User.created_at.desc(), User.id.desc()).limit(limit)
+    
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, 2)
+        query = query.where(
+            tuple_(User.created_at, User.id) < tuple_(cursor_to_datetime(created_at), last_id)
+        )
+    else:
+        query = query.offset(offset)
     
     result = await db.execute(query)
     users = result.scalars().all()
     
+    if len(users) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            datetime_to_cursor(users[-1].created_at),
+            users[-1].id
+        )
+    
     return [
         AdminUserResponse(
             id=encode_id(u.id),
@@ -181,6 +224,7 @@ async def deactivate_user(
     
     user.is_active = False
     await db.commit()
+    await invalidate_principal(user.id)
     
     return {"message": "User deactivated successfully"}
 
@@ -209,6 +253,7 @@ async def verify_business(
     
     business.is_verified = data.verified
     business.updated_at = datetime.utcnow()
+    record_match_change(db, business)
     await db.commit()
     
     status_msg = "verified" if data.verified else "unverified"
@@ -267,5 +312,6 @@ async def promote_user_to_admin(
     
     user.role = UserRole.ADMIN
     await db.commit()
+    await invalidate_principal(user.id)
     
     return {"message": f"User {user.email} promoted to admin"}
@@ -9,17 +9,19 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Response, status
 from pydantic import BaseModel, EmailStr, Field
 from sqlalchemy import select
+from sqlalchemy.orm import undefer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.user import User, UserRole
 from app.services.auth import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_and_update_password,
     create_access_token,
     create_refresh_token,
     decode_refresh_token
 )
+from app.services.principal_cache import invalidate_principal
 from app.middleware.auth import get_current_user, get_token_from_request
 from app.middleware.sanitization import sanitize_string
 
@@ -103,7 +105,7 @@ async def register(
     # Create new user
     user = User(
         email=email,
-        password_hash=hash_password(data.password),
+        password_hash=await hash_password_async(data.password),
         full_name=full_name,
         phone=sanitize_string(data.phone) if data.phone else None,
         role=UserRole.USER
@@ -132,11 +134,17 @@ async def login(
     
     # Find user
     result = await db.execute(
-        select(User).where(User.email == email)
+        select(User)
+        .options(undefer(User.password_hash))
+        .where(User.email == email)
     )
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(data.password, user.password_hash):
+    valid, new_hash = (
+        await verify_and_update_password(data.password, user.password_hash)
+        if user else (False, None)
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -170,8 +178,10 @@ async def login(
         max_age=604800  # 7 days
     )
     
-    # Update last login
+    # Update last login; re-hash if the bcrypt cost has changed
     user.last_login = datetime.utcnow()
+    if new_hash:
+        user.password_hash = new_hash
     await db.commit()
     
     return {
@@ -250,11 +260,17 @@ async def admin_login(
     
     # Find user
     result = await db.execute(
-        select(User).where(User.email == email)
+        select(User)
+        .options(undefer(User.password_hash))
+        .where(User.email == email)
     )
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(data.password, user.password_hash):
+    valid, new_hash = (
+        await verify_and_update_password(data.password, user.password_hash)
+        if user else (False, None)
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -286,8 +302,10 @@ async def admin_login(
         max_age=3600
     )
     
-    # Update last login
+    # Update last login; re-hash if the bcrypt cost has changed
     user.last_login = datetime.utcnow()
+    if new_hash:
+        user.password_hash = new_hash
     await db.commit()
     
     return {
@@ -413,6 +431,9 @@ async def google_auth(
     user.last_login = datetime.utcnow()
     await db.commit()
     
+    # OAuth details may have been linked to the profile
+    await invalidate_principal(user.id)
+    
     return {
         "message": "Google authentication successful",
         "success": True,
@@ -8,18 +8,29 @@ from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
-from sqlalchemy import select, or_
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.business import Business
 from app.models.user import User
-from app.middleware.auth import get_current_user
+from app.middleware.auth import get_current_user, get_optional_business, CurrentBusiness
 from app.middleware.sanitization import sanitize_string, sanitize_dict
+from app.services.cache import TTLCache
 from app.services.encryption import encode_id, decode_id
+from app.services.principal_cache import invalidate_principal
+from app.services.matching import record_match_change
+from app.services.search import business_search
+from app.utils.pagination import count_rows, estimate_rows, encode_cursor, decode_cursor
 
 router = APIRouter()
 
+# 404 for the /me routes when no profile exists yet
+get_own_business = CurrentBusiness(detail="Business profile not found")
+
+# How long a cached directory total stays valid
+DIRECTORY_COUNT_CACHE_SECONDS = 60
+
 
 # =============================================================================
 # SCHEMAS
@@ -84,6 +95,35 @@ class BusinessListResponse(BaseModel):
     """List of businesses for directory."""
     businesses: List[BusinessResponse]
     total: int
+    next_cursor: Optional[str] = None  # Pass as `cursor` to get the next page
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+# Recent directory totals keyed by filter values, for total_mode="cached"
+_directory_count_cache = TTLCache(maxsize=1024, ttl=DIRECTORY_COUNT_CACHE_SECONDS)
+
+
+async def _directory_total(
+    db: AsyncSession,
+    filters: list,
+    total_mode: str,
+    cache_key: tuple
+) -> int:
+    """Count directory rows for the given filters using the requested mode."""
+    if total_mode == "approx":
+        return await estimate_rows(db, Business, filters)
+    
+    if total_mode == "cached":
+        total = _directory_count_cache.get(cache_key)
+        if total is None:
+            total = await count_rows(db, Business, filters)
+            _directory_count_cache.set(cache_key, total)
+        return total
+    
+    return await count_rows(db, Business, filters)
 
 
 # =============================================================================
@@ -94,7 +134,8 @@ class BusinessListResponse(BaseModel):
 async def create_business(
     data: BusinessCreateRequest,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_current_user),
+    existing: Optional[Business] = Depends(get_optional_business)
 ):
     """
     Create a business profile for the current user.
@@ -103,10 +144,7 @@ async def create_business(
     - Sanitizes all input
     """
     # Check if user already has a business
-    existing = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
-    )
-    if existing.scalar_one_or_none():
+    if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User already has a business profile"
@@ -122,9 +160,13 @@ async def create_business(
     )
     
     db.add(business)
+    record_match_change(db, business)
     await db.commit()
     await db.refresh(business)
     
+    # Cached principal still says "no business"
+    await invalidate_principal(user.id)
+    
     return BusinessResponse(
         id=encode_id(business.id),
         name=business.name,
@@ -143,20 +185,9 @@ async def create_business(
 @router.get("/me", response_model=BusinessResponse)
 async def get_my_business(
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    business: Business = Depends(get_own_business)
 ):
     """Get current user's business profile."""
-    result = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
-    )
-    business = result.scalar_one_or_none()
-    
-    if not business:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Business profile not found"
-        )
-    
     return BusinessResponse(
         id=encode_id(business.id),
         name=business.name,
@@ -176,26 +207,16 @@ async def get_my_business(
 async def update_my_business(
     data: BusinessUpdateRequest,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    business: Business = Depends(get_own_business)
 ):
     """Update current user's business profile."""
-    result = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
-    )
-    business = result.scalar_one_or_none()
-    
-    if not business:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Business profile not found"
-        )
-    
     # Sanitize and update
     clean_data = sanitize_dict(data.model_dump(exclude_unset=True))
     for key, value in clean_data.items():
         setattr(business, key, value)
     
     business.updated_at = datetime.utcnow()
+    record_match_change(db, business)
     await db.commit()
     await db.refresh(business)
     
@@ -222,49 +243,69 @@ async def list_businesses(
     export_ready: Optional[bool] = Query(None),
     limit: int = Query(default=20, le=100),
     offset: int = Query(default=0),
+    cursor: Optional[str] = Query(None),
+    total_mode: str = Query(default="exact", pattern="^(exact|cached|approx)$"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Public business directory listing.
     
     - Only shows verified businesses
-    - Supports filtering and search
+    - Supports filtering and full-text search (ranked by relevance)
     - Returns obfuscated IDs
+    - `total_mode`: "exact" counts in SQL, "cached" reuses a recent count,
+      "approx" uses the planner estimate (cheap for deep pages)
+    - Pass `next_cursor` back as `cursor` for stable deep paging;
+      `offset` still works but is slower on deep pages. Cursors are not
+      available for search results, which are ordered by relevance.
     """
-    query = select(Business).where(Business.is_verified == True)
+    filters = [Business.is_verified == True]
     
     if category:
-        query = query.where(Business.category == sanitize_string(category))
+        filters.append(Business.category == sanitize_string(category))
     
     if province:
-        query = query.where(Business.province == sanitize_string(province))
+        filters.append(Business.province == sanitize_string(province))
     
     if export_ready is not None:
-        query = query.where(Business.export_ready == export_ready)
+        filters.append(Business.export_ready == export_ready)
     
+    relevance = None
     if search:
-        search_term = f"%{sanitize_string(search)}%"
-        query = query.where(
-            or_(
-                Business.name.ilike(search_term),
-                Business.description.ilike(search_term),
-                Business.tagline.ilike(search_term)
-            )
+        search_filter, relevance = business_search(
+            sanitize_string(search),
+            db.bind.dialect.name
         )
+        filters.append(search_filter)
+    
+    # Order by featured first, then search relevance (if any), then health score
+    ordering = [Business.is_featured.desc()]
+    if relevance is not None:
+        ordering.append(relevance.desc())
+    ordering.extend([Business.health_score.desc(), Business.id.desc()])
     
-    # Order by featured first, then health score
-    query = query.order_by(
-        Business.is_featured.desc(),
-        Business.health_score.desc()
-    ).offset(offset).limit(limit)
+    query = select(Business).where(*filters).order_by(*ordering).limit(limit)
+    
+    if cursor and relevance is None:
+        # Seek past the last row of the previous page
+        is_featured, health_score, last_id = decode_cursor(cursor, 3)
+        query = query.where(
+            tuple_(Business.is_featured, Business.health_score, Business.id)
+            < tuple_(bool(is_featured), health_score, last_id)
+        )
+    else:
+        query = query.offset(offset)
     
     result = await db.execute(query)
     businesses = result.scalars().all()
     
-    # Count total
-    count_query = select(Business).where(Business.is_verified == True)
-    count_result = await db.execute(count_query)
-    total = len(count_result.scalars().all())
+    next_cursor = None
+    if relevance is None and len(businesses) == limit:
+        last = businesses[-1]
+        next_cursor = encode_cursor(int(bool(last.is_featured)), last.health_score or 0, last.id)
+    
+    # Count total with the same filters as the page query
+    total = await _directory_total(db, filters, total_mode, (category, province, search, export_ready))
     
     return BusinessListResponse(
         businesses=[
@@ -283,7 +324,8 @@ async def list_businesses(
             )
             for b in businesses
         ],
-        total=total
+        total=total,
+        next_cursor=next_cursor
     )
 
 
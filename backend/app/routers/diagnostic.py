@@ -4,17 +4,17 @@ Uplokal Backend - Diagnostic Routes
 Business diagnostic questionnaire and AI analysis.
 """
 
-from typing import Dict, Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.business import Business
-from app.models.user import User
-from app.middleware.auth import get_current_user
+from app.middleware.auth import CurrentBusiness
 from app.services.ai_stubs import analyze_diagnostic
+from app.services.jobs import enqueue, job_accepted, job_handler, prefers_async
+from app.services.matching import record_match_change
 
 router = APIRouter()
 
@@ -37,6 +37,41 @@ class DiagnosticResult(BaseModel):
     export_readiness: Dict[str, Any]
 
 
+# =============================================================================
+# ANALYSIS
+# =============================================================================
+
+async def _apply_diagnostic(db: AsyncSession, business: Business, answers: Dict[str, Any]) -> DiagnosticResult:
+    """Run AI analysis and store answers and scores on the business."""
+    analysis = await analyze_diagnostic(answers)
+    
+    # Update business with scores
+    business.diagnostic_data = answers
+    business.health_score = analysis["health_score"]
+    business.marketing_score = analysis["scores"].get("marketing", 0)
+    business.finance_score = analysis["scores"].get("finance", 0)
+    business.legal_score = analysis["scores"].get("legal", 0)
+    record_match_change(db, business)
+    
+    return DiagnosticResult(
+        health_score=analysis["health_score"],
+        scores=analysis["scores"],
+        status=analysis["status"],
+        recommendations=analysis["recommendations"],
+        export_readiness=analysis["export_readiness"]
+    )
+
+
+@job_handler("diagnostic.analyze")
+async def run_diagnostic_job(db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Background version of `POST /submit`; the result is a DiagnosticResult."""
+    business = await db.get(Business, payload["business_id"])
+    if business is None:
+        raise LookupError("Business no longer exists")
+    result = await _apply_diagnostic(db, business, payload["answers"])
+    return result.model_dump()
+
+
 # =============================================================================
 # ROUTES
 # =============================================================================
@@ -44,67 +79,43 @@ class DiagnosticResult(BaseModel):
 @router.post("/submit", response_model=DiagnosticResult)
 async def submit_diagnostic(
     data: DiagnosticSubmission,
+    prefer: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    business: Business = Depends(CurrentBusiness(detail="Business profile required. Please create one first."))
 ):
     """
     Submit diagnostic questionnaire for AI analysis.
     
     - Stores answers in business profile
     - Returns AI-generated scores and recommendations
+    - With `Prefer: respond-async`, runs in the background instead and
+      returns 202 with a job to poll (`Idempotency-Key` makes retries safe)
     """
-    # Get user's business
-    result = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
-    )
-    business = result.scalar_one_or_none()
-    
-    if not business:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Business profile required. Please create one first."
+    if prefers_async(prefer):
+        job = await enqueue(
+            db,
+            "diagnostic.analyze",
+            {"business_id": business.id, "answers": data.answers},
+            owner_id=business.owner_id,
+            idempotency_key=idempotency_key
         )
+        return job_accepted(job)
     
-    # Run AI analysis
-    analysis = await analyze_diagnostic(data.answers)
-    
-    # Update business with scores
-    business.diagnostic_data = data.answers
-    business.health_score = analysis["health_score"]
-    business.marketing_score = analysis["scores"].get("marketing", 0)
-    business.finance_score = analysis["scores"].get("finance", 0)
-    business.legal_score = analysis["scores"].get("legal", 0)
-    
+    result = await _apply_diagnostic(db, business, data.answers)
     await db.commit()
     
-    return DiagnosticResult(
-        health_score=analysis["health_score"],
-        scores=analysis["scores"],
-        status=analysis["status"],
-        recommendations=analysis["recommendations"],
-        export_readiness=analysis["export_readiness"]
-    )
+    return result
 
 
 @router.get("/result", response_model=DiagnosticResult)
 async def get_diagnostic_result(
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    business: Business = Depends(CurrentBusiness(detail="Business profile not found"))
 ):
     """
     Get latest diagnostic result for current user.
     """
-    result = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
-    )
-    business = result.scalar_one_or_none()
-    
-    if not business:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Business profile not found"
-        )
-    
     if not business.diagnostic_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -2,15 +2,24 @@
 Uplokal Backend - Document Vault Routes
 =========================================
 Document upload, listing, download with signed URLs.
+
+Uploads go through the API (`POST /upload`) or directly to storage:
+`POST /uploads` returns an upload URL, the client sends the file there,
+and `POST /uploads/{upload_id}/complete` creates the document.
+
+PDFs and images get a small preview, rendered in the background after
+upload and served from `preview_url` (signed like downloads).
 """
 
-import os
-import uuid
-import aiofiles
+import hashlib
+import time
 from datetime import datetime
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, status
-from pydantic import BaseModel
+from functools import partial
+from typing import Dict, List, Optional
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, Header, HTTPException, UploadFile, File, Form, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -20,20 +29,40 @@ from app.models.document import Document, DocumentCategory
 from app.models.user import User
 from app.middleware.auth import get_current_user
 from app.middleware.sanitization import sanitize_filename
+from app.services.uploads import (
+    check_document_quota,
+    stream_to_storage,
+    StoredFile,
+    UploadIntent,
+    MB
+)
+from app.services.blob_store import new_blob_key, commit_blob, release_blob
+from app.services.storage import get_storage
+from app.services.counters import count
+from app.services.previews import (
+    is_previewable,
+    preview_key,
+    schedule_preview,
+    PREVIEW_MIME_TYPE
+)
+from app.utils.http_cache import etag_matches, if_range_allows, parse_range, content_range
 from app.services.encryption import (
     encode_id,
     decode_id,
     generate_signed_url,
     verify_signed_url,
-    get_signed_download_url
+    get_signed_download_url,
+    get_signed_preview_url,
+    FileEncryptor,
+    FileDecryptor,
+    is_encrypted_header,
+    decrypt_range,
+    HEADER_SIZE
 )
 
 router = APIRouter()
 settings = get_settings()
 
-# Ensure storage directory exists
-os.makedirs(settings.storage_path, exist_ok=True)
-
 
 # =============================================================================
 # SCHEMAS
@@ -47,6 +76,7 @@ class DocumentResponse(BaseModel):
     file_size: int
     created_at: datetime
     description: Optional[str]
+    preview_url: Optional[str] = None  # Signed; 404 until the preview is rendered
 
     class Config:
         from_attributes = True
@@ -64,6 +94,125 @@ class SignedUrlResponse(BaseModel):
     expires_in_seconds: int
 
 
+class UploadIntentRequest(BaseModel):
+    """File a client is about to upload directly."""
+    size: int = Field(..., gt=0)
+    sha256: str = Field(..., pattern="^[0-9a-f]{64}$")  # Hex digest of the file
+
+
+class UploadIntentResponse(BaseModel):
+    """Where to send the file, and the token to complete the upload with."""
+    upload_id: str
+    upload_url: str
+    method: str
+    headers: Dict[str, str]  # Send exactly these headers with the file
+    expires_in_seconds: int
+
+
+class UploadCompleteRequest(BaseModel):
+    """Document details for a finished direct upload."""
+    filename: str = Field(..., min_length=1, max_length=255)
+    mime_type: Optional[str] = Field(default=None, max_length=100)
+    category: str = "other"
+    description: str = ""
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def _content_disposition(filename: str) -> str:
+    """Attachment header, RFC 5987 encoded for non-ASCII names."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def _document_etag(document: Document, stored_size: int) -> str:
+    """
+    Strong ETag for a document's content.
+    
+    The plaintext SHA-256 when known; older rows fall back to a hash of
+    the stored object's key, size and last update.
+    """
+    if document.content_hash:
+        return f'"{document.content_hash}"'
+    fingerprint = f"{document.storage_path}-{stored_size}-{document.updated_at}"
+    return f'"{hashlib.sha256(fingerprint.encode()).hexdigest()}"'
+
+
+def _preview_url(document: Document) -> Optional[str]:
+    """Signed preview URL, for documents that get a preview."""
+    if not document.content_hash or not is_previewable(document.mime_type):
+        return None
+    return get_signed_preview_url(document.id)
+
+
+def _document_response(document: Document) -> DocumentResponse:
+    return DocumentResponse(
+        id=encode_id(document.id),
+        filename=document.original_filename,
+        category=document.category.value,
+        file_size=document.file_size,
+        created_at=document.created_at,
+        description=document.description,
+        preview_url=_preview_url(document)
+    )
+
+
+async def _create_document(
+    db: AsyncSession,
+    user: User,
+    blob,
+    stored: StoredFile,
+    filename: str,
+    mime_type: Optional[str],
+    category: str,
+    description: str
+) -> DocumentResponse:
+    """Record a document for a stored blob and return it."""
+    # Validate category
+    try:
+        doc_category = DocumentCategory(category)
+    except ValueError:
+        doc_category = DocumentCategory.OTHER
+    
+    document = Document(
+        owner_id=user.id,
+        blob_id=blob.id,
+        filename=blob.storage_path.rsplit("/", 1)[-1],
+        original_filename=sanitize_filename(filename),
+        mime_type=mime_type,
+        file_size=stored.size,
+        content_hash=stored.sha256,
+        storage_path=blob.storage_path,
+        storage_type=blob.storage_type,
+        category=doc_category,
+        description=description[:500] if description else None,
+        is_encrypted="true" if blob.is_encrypted else "false"
+    )
+    
+    db.add(document)
+    await db.commit()
+    await db.refresh(document)
+    
+    # Rendered in the background; the response doesn't wait for it
+    schedule_preview(blob.storage_type, blob.storage_path, stored.sha256, mime_type)
+    
+    return _document_response(document)
+
+
+def _get_upload_intent(upload_id: str) -> UploadIntent:
+    intent = UploadIntent.from_token(upload_id)
+    if intent is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found or expired"
+        )
+    return intent
+
+
 # =============================================================================
 # ROUTES
 # =============================================================================
@@ -80,8 +229,10 @@ async def upload_document(
     Upload a document to the vault.
     
     - Sanitizes filename
-    - Stores with unique UUID name
-    - Encrypts at rest (TODO: implement actual encryption)
+    - Enforces the plan's document count and file size limits
+    - Streams to storage in chunks, hashing as it goes
+    - Deduplicates by content: identical files share one stored blob
+    - Encrypts at rest (AES-256-GCM, per-file data key)
     - Returns obfuscated document ID
     """
     # Validate file
@@ -91,56 +242,183 @@ async def upload_document(
             detail="No file provided"
         )
     
-    # Sanitize filename
-    original_filename = sanitize_filename(file.filename)
+    # Plan limits: document count now, file size while streaming
+    max_file_bytes = await check_document_quota(db, user.id)
     
-    # Generate unique storage filename
-    file_ext = original_filename.rsplit(".", 1)[-1] if "." in original_filename else ""
-    storage_filename = f"{uuid.uuid4().hex}.{file_ext}" if file_ext else uuid.uuid4().hex
-    storage_path = os.path.join(settings.storage_path, storage_filename)
+    # Stream into storage, encrypting on the way; memory stays at one chunk
+    storage = get_storage()
+    key = new_blob_key()
+    stored = await stream_to_storage(file, storage, key, max_file_bytes, transform=FileEncryptor())
     
-    # Read file content
-    content = await file.read()
-    file_size = len(content)
+    # Attach to an existing blob with the same content, or keep the new one
+    try:
+        blob = await commit_blob(db, storage, key, stored, encrypted=True)
+    except BaseException:
+        await storage.delete(key)
+        raise
     
-    # TODO: Encrypt content before storing (at-rest encryption)
-    # encrypted_content = encrypt_file(content)
+    return await _create_document(
+        db, user, blob, stored, file.filename, file.content_type, category, description
+    )
+
+
+@router.post("/uploads", response_model=UploadIntentResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_intent(
+    data: UploadIntentRequest,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Start a direct upload.
     
-    # Save file
-    async with aiofiles.open(storage_path, "wb") as f:
-        await f.write(content)
+    - Checks the plan's document count and file size limits up front
+    - Returns a short-lived URL the file is sent to (`method` + `headers`):
+      a presigned storage URL when the backend supports it, otherwise
+      the API's own signed upload endpoint
+    - Finish with `POST /uploads/{upload_id}/complete`
+    """
+    max_file_bytes = await check_document_quota(db, user.id)
+    if data.size > max_file_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds your plan limit of {max_file_bytes // MB} MB"
+        )
     
-    # Validate category
-    try:
-        doc_category = DocumentCategory(category)
-    except ValueError:
-        doc_category = DocumentCategory.OTHER
+    storage = get_storage()
+    key = new_blob_key()
+    expiry_seconds = settings.signed_url_expiry_seconds
+    presigned = await storage.presign_upload(key, data.size, data.sha256, expiry_seconds)
     
-    # Create database record
-    document = Document(
+    upload_id = UploadIntent(
         owner_id=user.id,
-        filename=storage_filename,
-        original_filename=original_filename,
-        mime_type=file.content_type,
-        file_size=file_size,
-        storage_path=storage_path,
-        storage_type="local",
-        category=doc_category,
-        description=description[:500] if description else None,
-        is_encrypted="true"
+        key=key,
+        backend=storage.name,
+        size=data.size,
+        sha256=data.sha256,
+        direct=presigned is not None,
+        expires=int(time.time()) + expiry_seconds
+    ).to_token()
+    
+    if presigned is None:
+        query_params = generate_signed_url("upload", upload_id, expiry_seconds)
+        upload_url, method, headers = f"/api/documents/uploads/{upload_id}?{query_params}", "PUT", {}
+    else:
+        upload_url, method, headers = presigned.url, presigned.method, presigned.headers
+    
+    return UploadIntentResponse(
+        upload_id=upload_id,
+        upload_url=upload_url,
+        method=method,
+        headers=headers,
+        expires_in_seconds=expiry_seconds
     )
+
+
+@router.put("/uploads/{upload_id}")
+async def receive_upload(
+    upload_id: str,
+    request: Request,
+    expires: int = Query(...),
+    signature: str = Query(...)
+):
+    """
+    Upload endpoint for storage backends without presigned URLs
+    (no auth required if signature valid).
     
-    db.add(document)
-    await db.commit()
-    await db.refresh(document)
+    - The raw request body is the file
+    - Streamed to storage and encrypted at rest, like `POST /upload`
+    - Rejected unless it matches the declared size and hash
+    """
+    if not verify_signed_url("upload", upload_id, expires, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired upload link"
+        )
     
-    return DocumentResponse(
-        id=encode_id(document.id),
-        filename=document.original_filename,
-        category=document.category.value,
-        file_size=document.file_size,
-        created_at=document.created_at,
-        description=document.description
+    intent = _get_upload_intent(upload_id)
+    if intent.direct:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload this file to its storage URL"
+        )
+    
+    storage = get_storage(intent.backend)
+    await stream_to_storage(
+        request.stream(),
+        storage,
+        intent.key,
+        intent.size,
+        transform=FileEncryptor(),
+        expected=(intent.size, intent.sha256)
+    )
+    
+    return {"message": "File received", "success": True}
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
+async def complete_upload(
+    upload_id: str,
+    data: UploadCompleteRequest,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Finish a direct upload and create the document.
+    
+    - Verifies the stored object's size and SHA-256 against the intent
+      (from checksum metadata where the store enforces it)
+    - Deduplicates by content like `POST /upload`
+    - Returns obfuscated document ID
+    """
+    intent = _get_upload_intent(upload_id)
+    if intent.owner_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    # Completing the same upload twice would duplicate the document
+    result = await db.execute(
+        select(Document.id).where(Document.owner_id == user.id, Document.storage_path == intent.key)
+    )
+    if result.first() is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload already completed"
+        )
+    
+    await check_document_quota(db, user.id)
+    
+    storage = get_storage(intent.backend)
+    try:
+        if intent.direct:
+            # Bytes never passed through the API: check what landed
+            verified = await storage.verify_upload(intent.key, intent.size, intent.sha256)
+            header = await storage.read(intent.key, 0, HEADER_SIZE - 1)
+            verified = verified and not is_encrypted_header(header)
+        else:
+            # Already checked against the intent while being received
+            verified = True
+        stored_size = await storage.size(intent.key)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File has not been uploaded"
+        )
+    
+    if not verified:
+        await storage.delete(intent.key)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file does not match the declared size and hash"
+        )
+    
+    stored = StoredFile(size=intent.size, sha256=intent.sha256, stored_size=stored_size)
+    # Direct uploads are stored as sent (plaintext)
+    blob = await commit_blob(db, storage, intent.key, stored, encrypted=not intent.direct)
+    
+    return await _create_document(
+        db, user, blob, stored, data.filename, data.mime_type, data.category, data.description
     )
 
 
@@ -185,17 +463,7 @@ async def list_documents(
     total = len(count_result.scalars().all())
     
     return DocumentListResponse(
-        documents=[
-            DocumentResponse(
-                id=encode_id(doc.id),
-                filename=doc.original_filename,
-                category=doc.category.value,
-                file_size=doc.file_size,
-                created_at=doc.created_at,
-                description=doc.description
-            )
-            for doc in documents
-        ],
+        documents=[_document_response(doc) for doc in documents],
         total=total
     )
 
@@ -251,6 +519,9 @@ async def download_document(
     doc_hash: str,
     expires: int = Query(...),
     signature: str = Query(...),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -258,10 +529,12 @@ async def download_document(
     
     - Verifies signature
     - Checks expiration
-    - Returns file content
+    - Returns file content, decrypted on the fly
+    - ETag is the content hash; `If-None-Match` gives 304 Not Modified
+    - Single byte `Range` requests (honoring `If-Range`) give 206, and
+      only the encrypted segments covering the range are decrypted
+    - `access_count` is updated in batches, so it trails by a few seconds
     """
-    from fastapi.responses import FileResponse
-    
     # Verify signed URL
     if not verify_signed_url("document", doc_hash, expires, signature):
         raise HTTPException(
@@ -286,24 +559,130 @@ async def download_document(
         )
     
     # Check file exists
-    if not os.path.exists(document.storage_path):
+    storage = get_storage(document.storage_type)
+    try:
+        stored_size = await storage.size(document.storage_path)
+    except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found on storage"
         )
     
-    # Increment access count
-    document.access_count += 1
-    await db.commit()
+    etag = _document_etag(document, stored_size)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache"
+    }
     
-    # Return file
-    return FileResponse(
-        path=document.storage_path,
-        filename=document.original_filename,
-        media_type=document.mime_type or "application/octet-stream"
+    # Client already has this content
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    header = await storage.read(document.storage_path, 0, HEADER_SIZE - 1)
+    encrypted = is_encrypted_header(header)
+    size = FileDecryptor(header).plaintext_size(stored_size) if encrypted else stored_size
+    
+    byte_range = None
+    if if_range_allows(if_range, etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except HTTPException as exc:
+            exc.headers.update(headers)
+            raise
+    
+    # Count downloads, not every range request of a preview (buffered,
+    # once per signed link per dedupe window: retries and resumes of the
+    # same link are one download)
+    if byte_range is None or byte_range[0] == 0:
+        await count("document.downloads", document.id, viewer=f"link:{signature}")
+    
+    start, end = byte_range if byte_range else (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Disposition"] = _content_disposition(document.original_filename)
+    if byte_range:
+        headers["Content-Range"] = content_range(start, end, size)
+    
+    # Encrypted files are decrypted segment by segment while streaming;
+    # files stored before at-rest encryption are served as-is
+    read = partial(storage.get, document.storage_path)
+    if encrypted:
+        body = decrypt_range(read, stored_size, start, end, header=header)
+    else:
+        body = read(start, end)
+    
+    return StreamingResponse(
+        body,
+        status_code=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+        media_type=document.mime_type or "application/octet-stream",
+        headers=headers
     )
 
 
+@router.get("/preview/{doc_hash}")
+async def get_document_preview(
+    doc_hash: str,
+    expires: int = Query(...),
+    signature: str = Query(...),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Preview image of a document using a signed URL (no auth required if
+    signature valid).
+    
+    - JPEG, at most 480px on the longest edge
+    - 404 while the preview is still being rendered (it is queued again
+      if it was never generated)
+    """
+    # Verify signed URL
+    if not verify_signed_url("preview", doc_hash, expires, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired preview link"
+        )
+    
+    # Decode document ID
+    doc_id = decode_id(doc_hash)
+    if not doc_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    # Get document
+    document = await db.get(Document, doc_id)
+    if not document or not document.content_hash or not is_previewable(document.mime_type):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Preview not available"
+        )
+    
+    # Previews depend only on content, so the content hash identifies them
+    etag = f'"{document.content_hash}-preview"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    storage = get_storage(document.storage_type)
+    key = preview_key(document.content_hash)
+    try:
+        stored_size = await storage.size(key)
+    except FileNotFoundError:
+        schedule_preview(
+            document.storage_type, document.storage_path, document.content_hash, document.mime_type
+        )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Preview not ready yet",
+            headers={"Retry-After": "5"}
+        )
+    
+    # Previews are a few kilobytes: decrypted in one go
+    body = b"".join([chunk async for chunk in decrypt_range(partial(storage.get, key), stored_size)])
+    return Response(content=body, media_type=PREVIEW_MIME_TYPE, headers=headers)
+
+
 @router.delete("/{doc_hash}")
 async def delete_document(
     doc_hash: str,
@@ -314,7 +693,8 @@ async def delete_document(
     Delete a document from the vault.
     
     - Only owner can delete
-    - Removes from storage and database
+    - Removes from the database; the stored file goes with the last
+      document referencing its content
     """
     # Decode document ID
     doc_id = decode_id(doc_hash)
@@ -339,12 +719,22 @@ async def delete_document(
             detail="Access denied"
         )
     
-    # Delete file from storage
-    if os.path.exists(document.storage_path):
-        os.remove(document.storage_path)
-    
-    # Delete from database
+    # Delete from database, releasing the blob reference
     await db.delete(document)
+    await db.flush()
+    
+    if document.blob_id:
+        unused = await release_blob(db, document.blob_id)
+    else:
+        unused = (document.storage_type, document.storage_path)
     await db.commit()
     
+    # Delete file (and its preview) from storage once nothing references it
+    if unused:
+        storage_type, key = unused
+        storage = get_storage(storage_type)
+        await storage.delete(key)
+        if document.content_hash:
+            await storage.delete(preview_key(document.content_hash))
+    
     return {"message": "Document deleted successfully", "success": True}
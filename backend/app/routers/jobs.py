@@ -0,0 +1,72 @@
+"""
+Uplokal Backend - Job Status Routes
+=====================================
+Status and results of background jobs started with
+`Prefer: respond-async`.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models.job import Job, JobStatus
+from app.models.user import User
+from app.middleware.auth import get_current_user
+from app.services.encryption import encode_id, decode_id
+
+router = APIRouter()
+
+
+# =============================================================================
+# SCHEMAS
+# =============================================================================
+
+class JobResponse(BaseModel):
+    """Job status with obfuscated ID."""
+    id: str
+    name: str
+    status: str  # queued, running, succeeded, failed
+    attempts: int
+    result: Optional[Dict[str, Any]]  # Set once succeeded
+    error: Optional[str]  # Set once failed
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+
+# =============================================================================
+# ROUTES
+# =============================================================================
+
+@router.get("/{job_hash}", response_model=JobResponse)
+async def get_job(
+    job_hash: str,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Get a background job's status.
+
+    - Poll until `status` is `succeeded` (see `result`) or `failed`
+    - Only the user who started the job can see it
+    """
+    job_id = decode_id(job_hash)
+    job = await db.get(Job, job_id) if job_id else None
+    if not job or job.owner_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    return JobResponse(
+        id=encode_id(job.id),
+        name=job.name,
+        status=job.status.value,
+        attempts=job.attempts,
+        result=job.result if job.status == JobStatus.SUCCEEDED else None,
+        error=job.last_error if job.status == JobStatus.FAILED else None,
+        created_at=job.created_at,
+        finished_at=job.finished_at
+    )
@@ -4,23 +4,32 @@ Uplokal Backend - Messages Routes
 B2B messaging system.
 """
 
+import json
 from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy import select, or_, and_
+from sqlalchemy import select, update, or_, and_, case, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.message import Conversation, Message
 from app.models.business import Business
 from app.models.user import User
-from app.middleware.auth import get_current_user
+from app.middleware.auth import get_current_user, get_optional_business, CurrentBusiness
 from app.middleware.sanitization import sanitize_string
 from app.services.encryption import encode_id, decode_id
+from app.services.inbox import record_message, mark_conversation_read, unread_count_for
+from app.services.pubsub import get_hub, business_channel
+from app.utils.pagination import encode_cursor, decode_cursor, datetime_to_cursor, cursor_to_datetime
 
 router = APIRouter()
 
+# Realtime stream: idle keep-alive interval and client reconnect delay
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_RETRY_MS = 3000
+
 
 # =============================================================================
 # SCHEMAS
@@ -42,6 +51,11 @@ class MessageResponse(BaseModel):
     created_at: datetime
 
 
+class MarkReadRequest(BaseModel):
+    """Read watermark: everything up to this message is read."""
+    up_to: str  # Obfuscated message ID
+
+
 class ConversationResponse(BaseModel):
     """Conversation response."""
     id: str
@@ -52,6 +66,106 @@ class ConversationResponse(BaseModel):
     unread_count: int
 
 
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+async def _get_conversation_for_business(
+    db: AsyncSession,
+    conversation_hash: str,
+    business: Optional[Business]
+) -> Conversation:
+    """Load a conversation, checking the business participates in it."""
+    conv_id = decode_id(conversation_hash)
+    if not conv_id:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    conversation = await db.get(Conversation, conv_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    # Verify access
+    if not business or business.id not in [conversation.participant_1_id, conversation.participant_2_id]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return conversation
+
+
+async def _mark_messages_read(
+    db: AsyncSession,
+    conversation_id: int,
+    reader_id: int,
+    up_to_id: Optional[int] = None
+) -> List[int]:
+    """
+    Mark the other party's unread messages as read in a single UPDATE.
+    
+    Returns the IDs of the messages that changed.
+    """
+    conditions = [
+        Message.conversation_id == conversation_id,
+        Message.sender_id != reader_id,
+        Message.is_read == False
+    ]
+    if up_to_id is not None:
+        conditions.append(Message.id <= up_to_id)
+    
+    result = await db.execute(
+        update(Message)
+        .where(and_(*conditions))
+        .values(is_read=True, read_at=datetime.utcnow())
+        .returning(Message.id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalars().all()
+
+
+async def _publish_to_participants(conversation: Conversation, event: dict) -> None:
+    """Push a realtime event to both sides of a conversation."""
+    hub = get_hub()
+    for business_id in (conversation.participant_1_id, conversation.participant_2_id):
+        await hub.publish(business_channel(business_id), event)
+
+
+async def _publish_read_receipt(
+    conversation: Conversation,
+    reader_business_id: int,
+    read_ids: List[int]
+) -> None:
+    """Tell the other participant which of their messages were read."""
+    other_id = (
+        conversation.participant_2_id
+        if conversation.participant_1_id == reader_business_id
+        else conversation.participant_1_id
+    )
+    await get_hub().publish(business_channel(other_id), {
+        "type": "read",
+        "conversation_id": encode_id(conversation.id),
+        "message_ids": [encode_id(message_id) for message_id in read_ids]
+    })
+
+
+async def _message_sort_key(db: AsyncSession, conversation_id: int, message_hash: str):
+    """
+    Sort key (created_at, id) of an anchor message, as a SQL expression.
+    
+    404 if the anchor is not a message of this conversation (or was
+    deleted), rather than an empty page.
+    """
+    message_id = decode_id(message_hash)
+    anchor_created_at = None
+    if message_id:
+        result = await db.execute(
+            select(Message.created_at)
+            .where(and_(Message.id == message_id, Message.conversation_id == conversation_id))
+        )
+        anchor_created_at = result.scalar_one_or_none()
+    if anchor_created_at is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    
+    return tuple_(anchor_created_at, message_id)
+
+
 # =============================================================================
 # ROUTES
 # =============================================================================
@@ -60,21 +174,10 @@ class ConversationResponse(BaseModel):
 async def send_message(
     data: SendMessageRequest,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_current_user),
+    sender_business: Business = Depends(CurrentBusiness(detail="Business profile required to send messages"))
 ):
     """Send a message to another business."""
-    # Get sender's business
-    result = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
-    )
-    sender_business = result.scalar_one_or_none()
-    
-    if not sender_business:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Business profile required to send messages"
-        )
-    
     # Get recipient business
     recipient_id = decode_id(data.recipient_id)
     if not recipient_id:
@@ -125,8 +228,21 @@ async def send_message(
     
     db.add(message)
     conversation.last_message_at = datetime.utcnow()
+    record_message(conversation, recipient_business.id, user.id, message.content)
     await db.commit()
     
+    await _publish_to_participants(conversation, {
+        "type": "message",
+        "conversation_id": encode_id(conversation.id),
+        "message": MessageResponse(
+            id=encode_id(message.id),
+            sender_id=encode_id(message.sender_id),
+            content=message.content,
+            is_read=False,
+            created_at=message.created_at
+        ).model_dump(mode="json")
+    })
+    
     return {
         "message": "Message sent successfully",
         "conversation_id": encode_id(conversation.id),
@@ -136,113 +252,167 @@ async def send_message(
 
 @router.get("/conversations", response_model=List[ConversationResponse])
 async def list_conversations(
+    response: Response,
+    limit: int = Query(default=50, le=100),
+    cursor: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    business: Optional[Business] = Depends(get_optional_business)
 ):
-    """List all conversations for current user."""
-    # Get user's business
-    result = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
-    )
-    business = result.scalar_one_or_none()
+    """
+    List conversations for current user, most recent first.
     
+    - Reads the denormalized inbox snapshot on each conversation,
+      joined to the other party's name, in a single query
+    - Next page cursor is returned in the `X-Next-Cursor` header
+    """
     if not business:
         return []
     
-    # Get conversations
-    result = await db.execute(
-        select(Conversation).where(
-            or_(
-                Conversation.participant_1_id == business.id,
-                Conversation.participant_2_id == business.id
-            )
-        ).order_by(Conversation.last_message_at.desc())
+    # Get one page of conversations with the other party's name
+    other_party_id = case(
+        (Conversation.participant_1_id == business.id, Conversation.participant_2_id),
+        else_=Conversation.participant_1_id
     )
-    conversations = result.scalars().all()
+    query = select(Conversation, Business.name).outerjoin(
+        Business, Business.id == other_party_id
+    ).where(
+        or_(
+            Conversation.participant_1_id == business.id,
+            Conversation.participant_2_id == business.id
+        )
+    ).order_by(Conversation.last_message_at.desc(), Conversation.id.desc()).limit(limit)
     
-    response = []
-    for conv in conversations:
-        # Determine other party
-        other_id = conv.participant_2_id if conv.participant_1_id == business.id else conv.participant_1_id
-        other_business = await db.get(Business, other_id)
-        
-        # Get last message
-        msg_result = await db.execute(
-            select(Message)
-            .where(Message.conversation_id == conv.id)
-            .order_by(Message.created_at.desc())
-            .limit(1)
+    if cursor:
+        last_message_at, last_id = decode_cursor(cursor, 2)
+        query = query.where(
+            tuple_(Conversation.last_message_at, Conversation.id)
+            < tuple_(cursor_to_datetime(last_message_at), last_id)
         )
-        last_msg = msg_result.scalar_one_or_none()
-        
-        # Count unread
-        unread_result = await db.execute(
-            select(Message).where(
-                and_(
-                    Message.conversation_id == conv.id,
-                    Message.sender_id != user.id,
-                    Message.is_read == False
-                )
-            )
+    
+    result = await db.execute(query)
+    rows = result.all()
+    
+    if len(rows) == limit:
+        last_conv = rows[-1][0]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            datetime_to_cursor(last_conv.last_message_at),
+            last_conv.id
         )
-        unread_count = len(unread_result.scalars().all())
+    
+    response_items = []
+    for conv, other_name in rows:
+        # Determine other party
+        other_id = conv.participant_2_id if conv.participant_1_id == business.id else conv.participant_1_id
         
-        response.append(ConversationResponse(
+        response_items.append(ConversationResponse(
             id=encode_id(conv.id),
             other_party={
-                "id": encode_id(other_business.id) if other_business else None,
-                "name": other_business.name if other_business else "Unknown"
+                "id": encode_id(other_id) if other_name is not None else None,
+                "name": other_name if other_name is not None else "Unknown"
             },
             subject=conv.subject,
-            last_message=last_msg.content[:100] if last_msg else None,
+            last_message=conv.last_message_preview,
             last_message_at=conv.last_message_at,
-            unread_count=unread_count
+            unread_count=unread_count_for(conv, business.id)
         ))
     
-    return response
+    return response_items
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    business: Business = Depends(CurrentBusiness(detail="Business profile required to receive messages"))
+):
+    """
+    Server-Sent Events stream of realtime events for the current business.
+    
+    - `message`: a new message in one of the business's conversations
+    - `read`: the other party read some of your messages
+    - `resync`: events were dropped; refetch conversations over REST
+    """
+    business_id = business.id
+    
+    # Release the database connection, the stream may stay open for hours
+    await db.commit()
+    
+    async def event_stream():
+        hub = get_hub()
+        subscription = await hub.subscribe(business_channel(business_id))
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            await hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/{conversation_hash}", response_model=List[MessageResponse])
 async def get_conversation_messages(
     conversation_hash: str,
     limit: int = Query(default=50, le=100),
+    before: Optional[str] = Query(None),
+    after: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_current_user),
+    business: Optional[Business] = Depends(get_optional_business)
 ):
-    """Get messages in a conversation."""
-    conv_id = decode_id(conversation_hash)
-    if not conv_id:
-        raise HTTPException(status_code=404, detail="Conversation not found")
+    """
+    Get messages in a conversation, oldest first.
     
-    conversation = await db.get(Conversation, conv_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
+    - Without `before`/`after`: the latest `limit` messages
+    - `before`: message ID; the `limit` messages just older than it
+    - `after`: message ID; the `limit` messages just newer than it
+    - Marks all messages from the other party as read in one statement
+    """
+    if before and after:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either before or after, not both"
+        )
     
-    # Verify access
-    result = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
-    )
-    business = result.scalar_one_or_none()
+    conversation = await _get_conversation_for_business(db, conversation_hash, business)
     
-    if not business or business.id not in [conversation.participant_1_id, conversation.participant_2_id]:
-        raise HTTPException(status_code=403, detail="Access denied")
+    # Resolve the anchor first, so a bad one 404s before anything is marked read
+    anchor = await _message_sort_key(db, conversation.id, after or before) if after or before else None
     
-    # Get messages
-    result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == conv_id)
-        .order_by(Message.created_at.desc())
-        .limit(limit)
-    )
-    messages = result.scalars().all()
+    # Mark as read before loading, so the page reflects the new state
+    read_ids = await _mark_messages_read(db, conversation.id, user.id)
+    if read_ids:
+        mark_conversation_read(conversation, business.id, len(read_ids))
+    await db.commit()
     
-    # Mark as read
-    for msg in messages:
-        if msg.sender_id != user.id and not msg.is_read:
-            msg.is_read = True
-            msg.read_at = datetime.utcnow()
+    if read_ids:
+        await _publish_read_receipt(conversation, business.id, read_ids)
     
-    await db.commit()
+    # Seek on (created_at, id) from the anchor message; plain columns, no ORM loading
+    columns = (Message.id, Message.sender_id, Message.content, Message.is_read, Message.created_at)
+    sort_key = tuple_(Message.created_at, Message.id)
+    query = select(*columns).where(Message.conversation_id == conversation.id)
+    
+    if after:
+        query = query.where(
+            sort_key > anchor
+        ).order_by(Message.created_at, Message.id).limit(limit)
+    else:
+        if before:
+            query = query.where(sort_key < anchor)
+        # Newest `limit` rows, returned oldest first
+        page = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit).subquery()
+        query = select(page).order_by(page.c.created_at, page.c.id)
+    
+    result = await db.execute(query)
     
     return [
         MessageResponse(
@@ -252,5 +422,35 @@ async def get_conversation_messages(
             is_read=m.is_read,
             created_at=m.created_at
         )
-        for m in reversed(messages)
+        for m in result
     ]
+
+
+@router.post("/{conversation_hash}/read")
+async def mark_messages_read(
+    conversation_hash: str,
+    data: MarkReadRequest,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+    business: Optional[Business] = Depends(get_optional_business)
+):
+    """
+    Acknowledge messages up to and including `up_to` as read.
+    
+    Lets clients clear unread state without re-fetching the conversation.
+    """
+    conversation = await _get_conversation_for_business(db, conversation_hash, business)
+    
+    up_to_id = decode_id(data.up_to)
+    if not up_to_id:
+        raise HTTPException(status_code=404, detail="Message not found")
+    
+    read_ids = await _mark_messages_read(db, conversation.id, user.id, up_to_id)
+    if read_ids:
+        mark_conversation_read(conversation, business.id, len(read_ids))
+    await db.commit()
+    
+    if read_ids:
+        await _publish_read_receipt(conversation, business.id, read_ids)
+    
+    return {"message": "Messages marked as read", "read_count": len(read_ids)}
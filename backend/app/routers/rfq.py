@@ -5,20 +5,33 @@ Request for Quotation management and B2B matching.
 """
 
 from datetime import datetime
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from pydantic import BaseModel, Field
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.models.rfq import RFQ, RFQResponse, RFQStatus, RFQResponseStatus
+from app.models.rfq import RFQ, RFQStatus, RFQResponseStatus
+from app.models.rfq import RFQResponse as RFQResponseModel
 from app.models.business import Business
 from app.models.user import User
-from app.middleware.auth import get_current_user
+from app.middleware.auth import get_current_business, get_optional_business, get_current_user_optional, resolve_business
 from app.middleware.sanitization import sanitize_dict
 from app.services.encryption import encode_id, decode_id
-from app.services.ai_stubs import match_b2b, generate_rfq_suggestions
+from app.services.counters import count
+from app.services.jobs import enqueue, job_handler, take_queued_jobs
+from app.services.matching import match_b2b
+from app.services.rfq_matching import (
+    RFQ_MATCH_BATCH,
+    SUGGESTION_REFRESH_BATCH,
+    generate_rfq_suggestions,
+    match_rfqs,
+    refresh_business_suggestions,
+    remove_rfq_suggestions
+)
+from app.utils.pagination import encode_cursor, decode_cursor, datetime_to_cursor, cursor_to_datetime
 
 router = APIRouter()
 
@@ -33,10 +46,20 @@ class RFQCreateRequest(BaseModel):
     description: Optional[str] = None
     category: Optional[str] = None
     quantity: Optional[str] = None
+    unit: Optional[str] = Field(None, max_length=50)
+    specifications: Optional[Dict[str, Any]] = None
     budget_min: Optional[float] = None
     budget_max: Optional[float] = None
     currency: str = "USD"
     deadline: Optional[datetime] = None
+    origin_countries: Optional[List[str]] = None
+    delivery_location: Optional[str] = Field(None, max_length=255)
+    publish: bool = False  # Open it right away instead of saving a draft
+
+
+class RFQStatusUpdateRequest(BaseModel):
+    """Move an RFQ on from draft/open."""
+    status: RFQStatus
 
 
 class RFQResponse(BaseModel):
@@ -55,10 +78,47 @@ class RFQResponse(BaseModel):
         from_attributes = True
 
 
+class RFQDetailResponse(RFQResponse):
+    """Full RFQ, with its view and response counts (updated every few seconds)."""
+    unit: Optional[str]
+    specifications: Optional[Dict[str, Any]]
+    origin_countries: Optional[List[str]]
+    delivery_location: Optional[str]
+    view_count: int
+    response_count: int
+
+
+class RFQQuoteRequest(BaseModel):
+    """Supplier's quote for an RFQ."""
+    proposed_price: Optional[float] = Field(None, ge=0)
+    currency: str = Field("USD", min_length=3, max_length=3)
+    lead_time_days: Optional[int] = Field(None, ge=0)
+    message: Optional[str] = Field(None, max_length=5000)
+
+
 class RFQListResponse(BaseModel):
     """List of RFQs."""
     rfqs: List[RFQResponse]
     total: int
+    next_cursor: Optional[str] = None  # Pass as `cursor` to get the next page
+
+
+class RFQSuggestion(BaseModel):
+    """Suggested RFQ for a supplier."""
+    rfq_id: str
+    title: str
+    buyer: str
+    quantity: Optional[str]
+    budget_range: Optional[str]
+    match_score: int
+    match_reasons: List[str]
+    deadline: Optional[str]
+
+
+class RFQSuggestionListResponse(BaseModel):
+    """Page of suggested RFQs."""
+    suggestions: List[RFQSuggestion]
+    next_cursor: Optional[str] = None  # Pass as `cursor` to get the next page
 
 
 class MatchResult(BaseModel):
@@ -71,6 +131,54 @@ class MatchResult(BaseModel):
     match_reasons: List[str]
 
 
+# =============================================================================
+# SUGGESTION FEEDS
+# =============================================================================
+
+# Allowed status changes through PATCH /{rfq_hash}/status (drafts open via /publish)
+STATUS_TRANSITIONS = {
+    RFQStatus.DRAFT: {RFQStatus.CANCELLED},
+    RFQStatus.OPEN: {RFQStatus.IN_PROGRESS, RFQStatus.CLOSED, RFQStatus.CANCELLED},
+    RFQStatus.IN_PROGRESS: {RFQStatus.CLOSED, RFQStatus.CANCELLED},
+}
+
+
+async def _publish(db: AsyncSession, rfq: RFQ, business: Business) -> None:
+    """Open an RFQ and queue its supplier matching; commits."""
+    rfq.status = RFQStatus.OPEN
+    await db.flush()
+    await enqueue(db, "rfq.match", {"rfq_id": rfq.id}, owner_id=business.owner_id)
+
+
+@job_handler("rfq.match")
+async def run_rfq_match_job(db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Store supplier matches for a published RFQ, and for any others queued."""
+    payloads = [payload, *await take_queued_jobs(db, "rfq.match", RFQ_MATCH_BATCH - 1)]
+    rfq_ids = sorted({p["rfq_id"] for p in payloads})
+    matches = await match_rfqs(db, rfq_ids)
+    return {"rfqs": len(rfq_ids), "matches": matches}
+
+
+@job_handler("rfq.refresh_suggestions")
+async def run_suggestion_refresh_job(db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Rescore a changed business against open RFQs, with any others queued."""
+    payloads = [payload, *await take_queued_jobs(db, "rfq.refresh_suggestions", SUGGESTION_REFRESH_BATCH - 1)]
+    business_ids = sorted({p["business_id"] for p in payloads})
+    suggestions = await refresh_business_suggestions(db, business_ids)
+    return {"businesses": len(business_ids), "suggestions": suggestions}
+
+
+async def _get_own_rfq(db: AsyncSession, rfq_hash: str, business: Business) -> RFQ:
+    rfq_id = decode_id(rfq_hash)
+    rfq = await db.get(RFQ, rfq_id) if rfq_id else None
+    if not rfq or rfq.business_id != business.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="RFQ not found"
+        )
+    return rfq
+
+
 # =============================================================================
 # ROUTES
 # =============================================================================
@@ -79,21 +187,14 @@ class MatchResult(BaseModel):
 async def create_rfq(
     data: RFQCreateRequest,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    business: Business = Depends(get_current_business)
 ):
-    """Create a new Request for Quotation."""
-    # Get user's business
-    result = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
-    )
-    business = result.scalar_one_or_none()
-    
-    if not business:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Business profile required"
-        )
+    """
+    Create a new Request for Quotation.
     
+    - Saved as a draft unless `publish` is set; publishing matches
+      suppliers to it in the background
+    """
     clean_data = sanitize_dict(data.model_dump(exclude_unset=True))
     
     rfq = RFQ(
@@ -102,15 +203,22 @@ async def create_rfq(
         description=clean_data.get("description"),
         category=clean_data.get("category"),
         quantity=clean_data.get("quantity"),
+        unit=clean_data.get("unit"),
+        specifications=clean_data.get("specifications"),
         budget_min=clean_data.get("budget_min"),
         budget_max=clean_data.get("budget_max"),
         currency=clean_data.get("currency", "USD"),
         deadline=clean_data.get("deadline"),
+        origin_countries=clean_data.get("origin_countries"),
+        delivery_location=clean_data.get("delivery_location"),
         status=RFQStatus.DRAFT
     )
     
     db.add(rfq)
-    await db.commit()
+    if data.publish:
+        await _publish(db, rfq, business)
+    else:
+        await db.commit()
     await db.refresh(rfq)
     
     budget_range = None
@@ -131,19 +239,37 @@ async def list_rfqs(
     category: Optional[str] = Query(None),
     limit: int = Query(default=20, le=100),
     offset: int = Query(default=0),
+    cursor: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db)
 ):
-    """List open RFQs (public)."""
+    """
+    List open RFQs (public).
+    
+    - Pass `next_cursor` back as `cursor` for stable deep paging;
+      `offset` still works but is slower on deep pages
+    """
     query = select(RFQ).where(RFQ.status == RFQStatus.OPEN)
     
     if category:
         query = query.where(RFQ.category == category)
     
-    query = query.order_by(RFQ.created_at.desc()).offset(offset).limit(limit)
+    query = query.order_by(RFQ.created_at.desc(), RFQ.id.desc()).limit(limit)
+    
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, 2)
+        query = query.where(
+            tuple_(RFQ.created_at, RFQ.id) < tuple_(cursor_to_datetime(created_at), last_id)
+        )
+    else:
+        query = query.offset(offset)
     
     result = await db.execute(query)
     rfqs = result.scalars().all()
     
+    next_cursor = None
+    if len(rfqs) == limit:
+        next_cursor = encode_cursor(datetime_to_cursor(rfqs[-1].created_at), rfqs[-1].id)
+    
     return RFQListResponse(
         rfqs=[
             RFQResponse(
@@ -159,21 +285,17 @@ async def list_rfqs(
             )
             for r in rfqs
         ],
-        total=len(rfqs)
+        total=len(rfqs),
+        next_cursor=next_cursor
     )
 
 
 @router.get("/my-rfqs", response_model=RFQListResponse)
 async def list_my_rfqs(
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    business: Optional[Business] = Depends(get_optional_business)
 ):
     """List current user's RFQs."""
-    result = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
-    )
-    business = result.scalar_one_or_none()
-    
     if not business:
         return RFQListResponse(rfqs=[], total=0)
     
@@ -203,53 +325,221 @@ async def list_my_rfqs(
 
 @router.get("/matches", response_model=List[MatchResult])
 async def get_matches(
+    limit: int = Query(default=10, ge=1, le=50),
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    business: Business = Depends(get_current_business)
 ):
-    """Get AI-powered B2B matches for current business."""
-    result = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
+    """
+    Get B2B matches for current business.
+    
+    - Verified businesses ranked by category, location, export markets,
+      certifications, size and diagnostic scores
+    """
+    matches = await match_b2b(db, business, limit)
+    
+    return [MatchResult(**m) for m in matches]
+
+
+@router.get("/suggestions", response_model=RFQSuggestionListResponse)
+async def get_rfq_suggestions(
+    limit: int = Query(default=10, ge=1, le=50),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    business: Business = Depends(get_current_business)
+):
+    """
+    Get suggested RFQs for current business.
+    
+    - Open RFQs from this business's suggestion feed, best match first;
+      the feed is updated as RFQs open and close and as the profile changes
+    - Pass `next_cursor` back as `cursor` for the next page
+    """
+    suggestions, next_cursor = await generate_rfq_suggestions(db, business, limit, cursor)
+    
+    return RFQSuggestionListResponse(
+        suggestions=[RFQSuggestion(**s) for s in suggestions],
+        next_cursor=next_cursor
     )
-    business = result.scalar_one_or_none()
+
+
+@router.post("/{rfq_hash}/publish")
+async def publish_rfq(
+    rfq_hash: str,
+    db: AsyncSession = Depends(get_db),
+    business: Business = Depends(get_current_business)
+):
+    """Open a draft RFQ; suppliers are matched to it in the background."""
+    rfq = await _get_own_rfq(db, rfq_hash, business)
     
-    if not business:
+    if rfq.status != RFQStatus.DRAFT:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Business profile required"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only draft RFQs can be published"
         )
     
-    # Get AI matches
-    matches = await match_b2b({
-        "id": business.id,
-        "name": business.name,
-        "category": business.category,
-        "province": business.province
-    })
+    await _publish(db, rfq, business)
     
-    return [MatchResult(**m) for m in matches]
+    return {
+        "id": encode_id(rfq.id),
+        "status": RFQStatus.OPEN.value,
+        "message": "RFQ published successfully"
+    }
 
 
-@router.get("/suggestions")
-async def get_rfq_suggestions(
+@router.patch("/{rfq_hash}/status")
+async def update_rfq_status(
+    rfq_hash: str,
+    data: RFQStatusUpdateRequest,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    business: Business = Depends(get_current_business)
 ):
-    """Get AI-suggested RFQs for current business."""
-    result = await db.execute(
-        select(Business).where(Business.owner_id == user.id)
+    """
+    Move an RFQ on: in progress, closed or cancelled.
+    
+    - An RFQ that is no longer open leaves every supplier's suggestions
+    """
+    rfq = await _get_own_rfq(db, rfq_hash, business)
+    
+    if data.status not in STATUS_TRANSITIONS.get(rfq.status, set()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot change RFQ status from {rfq.status.value} to {data.status.value}"
+        )
+    
+    if rfq.status == RFQStatus.OPEN:
+        await remove_rfq_suggestions(db, rfq.id)
+    rfq.status = data.status
+    await db.commit()
+    
+    return {
+        "id": encode_id(rfq.id),
+        "status": rfq.status.value,
+        "message": "RFQ status updated"
+    }
+
+
+@router.get("/{rfq_hash}", response_model=RFQDetailResponse)
+async def get_rfq(
+    rfq_hash: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: Optional[User] = Depends(get_current_user_optional)
+):
+    """
+    Get an RFQ (public once published; drafts and cancelled RFQs only
+    for their owner).
+    
+    - Counts a view once per user (or client IP) per dedupe window;
+      the owner's own views are not counted
+    """
+    rfq_id = decode_id(rfq_hash)
+    rfq = await db.get(RFQ, rfq_id) if rfq_id else None
+    business = await resolve_business(request, db) if user else None
+    is_owner = rfq is not None and business is not None and rfq.business_id == business.id
+    
+    if not rfq or (rfq.status in (RFQStatus.DRAFT, RFQStatus.CANCELLED) and not is_owner):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="RFQ not found"
+        )
+    
+    if not is_owner:
+        # Anonymous viewers by client IP: needs the proxy's forwarded
+        # address trusted (FORWARDED_ALLOW_IPS, see .env.example)
+        viewer = f"user:{user.id}" if user else f"ip:{request.client.host if request.client else ''}"
+        await count("rfq.views", rfq.id, viewer=viewer)
+    
+    return RFQDetailResponse(
+        id=encode_id(rfq.id),
+        title=rfq.title,
+        description=rfq.description,
+        category=rfq.category,
+        quantity=rfq.quantity,
+        unit=rfq.unit,
+        specifications=rfq.specifications,
+        origin_countries=rfq.origin_countries,
+        delivery_location=rfq.delivery_location,
+        budget_range=f"${rfq.budget_min:,.0f} - ${rfq.budget_max:,.0f}" if rfq.budget_min else None,
+        status=rfq.status.value,
+        deadline=rfq.deadline,
+        created_at=rfq.created_at,
+        view_count=rfq.view_count or 0,
+        response_count=rfq.response_count or 0
     )
-    business = result.scalar_one_or_none()
+
+
+@router.post("/{rfq_hash}/responses", status_code=status.HTTP_201_CREATED)
+async def respond_to_rfq(
+    rfq_hash: str,
+    data: RFQQuoteRequest,
+    db: AsyncSession = Depends(get_db),
+    business: Business = Depends(get_current_business)
+):
+    """
+    Send a quote for an open RFQ (one per supplier).
     
-    if not business:
+    - The RFQ's `response_count` is updated in batches, so it trails
+      by a few seconds
+    """
+    rfq_id = decode_id(rfq_hash)
+    rfq = await db.get(RFQ, rfq_id) if rfq_id else None
+    if not rfq or rfq.status == RFQStatus.DRAFT:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Business profile required"
+            detail="RFQ not found"
         )
     
-    suggestions = await generate_rfq_suggestions({
-        "id": business.id,
-        "name": business.name,
-        "category": business.category
-    })
+    if rfq.business_id == business.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot respond to your own RFQ"
+        )
     
-    return {"suggestions": suggestions}
+    if rfq.status != RFQStatus.OPEN:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="RFQ is no longer open"
+        )
+    
+    existing = await db.execute(
+        select(RFQResponseModel.id).where(
+            RFQResponseModel.rfq_id == rfq.id,
+            RFQResponseModel.responder_id == business.id
+        )
+    )
+    if existing.first():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="You have already responded to this RFQ"
+        )
+    
+    clean_data = sanitize_dict(data.model_dump(exclude_unset=True))
+    response = RFQResponseModel(
+        rfq_id=rfq.id,
+        responder_id=business.id,
+        proposed_price=clean_data.get("proposed_price"),
+        currency=clean_data.get("currency", "USD"),
+        lead_time_days=clean_data.get("lead_time_days"),
+        message=clean_data.get("message"),
+        status=RFQResponseStatus.PENDING
+    )
+    try:
+        async with db.begin_nested():
+            db.add(response)
+    except IntegrityError:
+        # Another submission from this supplier won the race
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="You have already responded to this RFQ"
+        )
+    await db.commit()
+    
+    # After the commit, so a failed insert is never counted
+    await count("rfq.responses", rfq.id)
+    
+    return {
+        "id": encode_id(response.id),
+        "rfq_id": encode_id(rfq.id),
+        "status": RFQResponseStatus.PENDING.value,
+        "message": "Response sent successfully"
+    }
@@ -5,8 +5,8 @@ Subscription plans and user subscription management.
 """
 
 from datetime import datetime, timedelta
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -21,6 +21,7 @@ from app.models.subscription import (
 )
 from app.middleware.auth import get_current_user
 from app.services.encryption import encode_id
+from app.services.jobs import enqueue, job_accepted, job_handler, prefers_async
 
 router = APIRouter()
 
@@ -63,6 +64,42 @@ class SubscribeRequest(BaseModel):
     billing_cycle: str = "monthly"  # "monthly" or "yearly"
 
 
+# =============================================================================
+# JOBS
+# =============================================================================
+
+@job_handler("subscription.create_payment")
+async def run_create_payment_job(db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Background Midtrans Snap transaction for `POST /subscribe`.
+    
+    Gateway errors raise, so the job is retried with backoff; the result
+    matches the synchronous response.
+    """
+    from app.services.payment import create_subscription_transaction
+    
+    payment_result = await create_subscription_transaction(
+        user_id=payload["user_id"],
+        user_email=payload["user_email"],
+        user_name=payload["user_name"],
+        plan_name=payload["plan_name"],
+        amount=payload["amount"],
+        billing_cycle=payload["billing_cycle"]
+    )
+    if not payment_result["success"]:
+        raise RuntimeError(f"Payment creation failed: {payment_result.get('error')}")
+    
+    return {
+        "success": True,
+        "requires_payment": True,
+        "snap_token": payment_result["token"],
+        "redirect_url": payment_result["redirect_url"],
+        "order_id": payment_result["order_id"],
+        "amount": payload["amount"],
+        "plan_name": payload["plan_name"]
+    }
+
+
 # =============================================================================
 # ROUTES
 # =============================================================================
@@ -150,6 +187,8 @@ async def get_my_subscription(
 @router.post("/subscribe")
 async def subscribe_to_plan(
     data: SubscribeRequest,
+    prefer: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
@@ -157,6 +196,9 @@ async def subscribe_to_plan(
     Subscribe to a plan - creates Midtrans payment.
     
     Returns Midtrans Snap token for payment popup.
+    
+    With `Prefer: respond-async`, paid plans return 202 with a job whose
+    result is this same response (`Idempotency-Key` makes retries safe).
     """
     from app.services.payment import create_subscription_transaction
     from app.config import get_settings
@@ -223,6 +265,23 @@ async def subscribe_to_plan(
     # Determine amount
     amount = plan.price_yearly if data.billing_cycle == "yearly" else plan.price_monthly
     
+    if prefers_async(prefer):
+        job = await enqueue(
+            db,
+            "subscription.create_payment",
+            {
+                "user_id": user.id,
+                "user_email": user.email,
+                "user_name": user.full_name or "User",
+                "plan_name": plan.name,
+                "amount": amount,
+                "billing_cycle": data.billing_cycle
+            },
+            owner_id=user.id,
+            idempotency_key=idempotency_key
+        )
+        return job_accepted(job)
+    
     # Create Midtrans transaction
     payment_result = await create_subscription_transaction(
         user_id=user.id,
@@ -11,6 +11,8 @@ from app.services.encryption import (
 from app.services.auth import (
     hash_password,
     verify_password,
+    hash_password_async,
+    verify_and_update_password,
     create_access_token,
     decode_access_token
 )
@@ -24,6 +26,8 @@ __all__ = [
     "verify_signed_url",
     "hash_password",
     "verify_password",
+    "hash_password_async",
+    "verify_and_update_password",
     "create_access_token",
     "decode_access_token"
 ]
@@ -5,7 +5,7 @@ Placeholder implementations for AI features.
 Replace these with actual AI/ML model integrations.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any
 
 
 async def analyze_diagnostic(questionnaire_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -117,99 +117,3 @@ async def predict_finance(
         }
     }
 
-
-async def match_b2b(
-    business_profile: Dict[str, Any],
-    rfq_data: Dict[str, Any] = None,
-    limit: int = 10
-) -> List[Dict[str, Any]]:
-    """
-    B2B Matchmaking Algorithm.
-    
-    Matches businesses based on compatibility scores considering:
-    - Product category alignment
-    - Geographic proximity
-    - Business size compatibility
-    - Export/import preferences
-    
-    TODO: Integrate with actual matching algorithm
-    
-    Args:
-        business_profile: The business looking for matches
-        rfq_data: Optional RFQ to match against
-        limit: Maximum number of matches to return
-    
-    Returns:
-        List of matched businesses with compatibility scores
-    """
-    # Stub implementation
-    return [
-        {
-            "business_id": "XyZ7kL9m",
-            "name": "Singapore Interiors Pte Ltd",
-            "category": "Furniture & Interior",
-            "location": "Singapore",
-            "compatibility_score": 92,
-            "match_reasons": [
-                "Kategori produk sesuai",
-                "Volume order cocok",
-                "Sudah pernah import dari Indonesia"
-            ]
-        },
-        {
-            "business_id": "AbC3dE4f",
-            "name": "Malaysia Craft Hub",
-            "category": "Handicraft & Artisan",
-            "location": "Kuala Lumpur, Malaysia",
-            "compatibility_score": 87,
-            "match_reasons": [
-                "Mencari produk kulit",
-                "Lokasi strategis untuk shipping"
-            ]
-        },
-        {
-            "business_id": "GhI5jK6l",
-            "name": "Thai Home Decor Co.",
-            "category": "Home & Living",
-            "location": "Bangkok, Thailand",
-            "compatibility_score": 79,
-            "match_reasons": [
-                "Ekspansi ke produk Indonesia",
-                "Budget sesuai range harga"
-            ]
-        }
-    ]
-
-
-async def generate_rfq_suggestions(
-    business_profile: Dict[str, Any]
-) -> List[Dict[str, Any]]:
-    """
-    Generate relevant RFQ suggestions for a business.
-    
-    Based on business profile and capabilities, suggest RFQs
-    that would be good fits.
-    
-    TODO: Integrate with recommendation algorithm
-    """
-    # Stub implementation
-    return [
-        {
-            "rfq_id": "RfQ1mN2o",
-            "title": "Leather Bags for European Market",
-            "buyer": "Euro Trade GmbH",
-            "quantity": "500 pieces",
-            "budget_range": "$15,000 - $25,000",
-            "match_score": 94,
-            "deadline": "2026-03-15"
-        },
-        {
-            "rfq_id": "RfQ3pQ4r",
-            "title": "Handcrafted Wallets Bulk Order",
-            "buyer": "US Accessories Inc",
-            "quantity": "1000 pieces",
-            "budget_range": "$8,000 - $12,000",
-            "match_score": 88,
-            "deadline": "2026-02-28"
-        }
-    ]
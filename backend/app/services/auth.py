@@ -2,11 +2,22 @@
 Uplokal Backend - Authentication Service
 ==========================================
 JWT token management and password hashing.
+
+Request handlers hash and verify passwords with the async functions,
+which run bcrypt (~250 ms of CPU per call) on a bounded thread pool
+instead of the event loop. bcrypt releases the GIL, so the pool uses
+real cores while other requests keep being served.
 """
 
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
+from fastapi import HTTPException, status
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
@@ -14,8 +25,15 @@ from app.config import get_settings
 
 settings = get_settings()
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context. Hashes at any other cost are flagged for
+# update, so changing BCRYPT_ROUNDS re-hashes passwords as users log in.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds
+)
 
 
 # =============================================================================
@@ -42,6 +60,127 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class PasswordHasher:
+    """
+    bcrypt on a fixed-size thread pool with a bounded backlog.
+
+    When `max_pending` calls are already running or waiting, new ones are
+    refused with 503 instead of queueing for seconds, so a login storm
+    cannot build an unbounded backlog.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        # Metrics
+        self.completed = 0
+        self.rejected = 0
+        self.peak_pending = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(pwd_context.verify_and_update, password, hashed)
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many sign-in requests, please retry shortly",
+                    headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+            self.peak_pending = max(self.peak_pending, self._pending)
+
+        queued_at = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - queued_at, time.perf_counter() - started
+
+        # Released when the work actually ends, even if the request is cancelled
+        future = self._executor.submit(timed)
+        future.add_done_callback(self._release)
+        result, waited, ran = await asyncio.wrap_future(future)
+
+        self.completed += 1
+        self.wait_seconds += waited
+        self.run_seconds += ran
+        return result
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool metrics, for the admin metrics endpoint."""
+        pending = self._pending
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "running": min(pending, self.workers),
+            "queued": max(pending - self.workers, 0),
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+            "avg_run_ms": round(self.run_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+            "bcrypt_rounds": settings.bcrypt_rounds
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get the process-wide password hasher, created on first use."""
+    global _hasher
+    if _hasher is None:
+        workers = settings.password_hash_workers or os.cpu_count() or 1
+        _hasher = PasswordHasher(workers, settings.password_hash_max_pending or workers * 8)
+    return _hasher
+
+
+def close_password_hasher() -> None:
+    """Stop the hashing pool on shutdown."""
+    global _hasher
+    if _hasher is not None:
+        _hasher.close()
+        _hasher = None
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password off the event loop; raises 503 when the pool is saturated."""
+    return await get_password_hasher().hash(password)
+
+
+async def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password off the event loop.
+    
+    Returns:
+        (valid, new_hash) - new_hash is set when the stored hash uses an
+        outdated cost and should be replaced
+    """
+    return await get_password_hasher().verify_and_update(plain_password, hashed_password)
+
+
 # =============================================================================
 # JWT TOKEN MANAGEMENT
 # =============================================================================
@@ -0,0 +1,112 @@
+"""
+Uplokal Backend - Content-Addressed Blob Store
+===============================================
+Deduplicated storage for the document vault.
+
+Uploads are streamed to a fresh storage key while their SHA-256 is
+computed, then either attached to an existing `Blob` with the same
+content and encryption at rest (and the new object deleted) or recorded
+as a new blob. Encrypted API uploads and plaintext direct uploads of
+the same file are separate blobs, so a document's `is_encrypted` always
+matches its object. Blobs
+are reference counted; the object is only removed when the last
+document pointing at it is deleted.
+
+Each blob row owns its own object (keys are random), so a blob being
+deleted never races with a new upload of the same content.
+"""
+
+import uuid
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document import Blob
+from app.services.storage import StorageBackend
+from app.services.uploads import StoredFile
+
+BLOB_PREFIX = "blobs"
+
+
+def new_blob_key() -> str:
+    """Fresh storage key for an upload, before it is deduplicated."""
+    name = uuid.uuid4().hex
+    return f"{BLOB_PREFIX}/{name[:2]}/{name}"
+
+
+async def acquire_blob(db: AsyncSession, content_hash: str, encrypted: bool) -> Optional[Blob]:
+    """Add a reference to the blob with this content and encryption, if one exists."""
+    result = await db.execute(
+        update(Blob)
+        .where(Blob.content_hash == content_hash, Blob.is_encrypted == encrypted)
+        .values(ref_count=Blob.ref_count + 1)
+        .returning(Blob)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+
+async def commit_blob(
+    db: AsyncSession,
+    storage: StorageBackend,
+    key: str,
+    stored: StoredFile,
+    encrypted: bool
+) -> Blob:
+    """
+    Turn a freshly stored object into a referenced blob.
+
+    Reuses an existing blob with the same content and encryption
+    (deleting the new object) or records the object as a new blob. The
+    caller commits the session.
+    """
+    blob = await acquire_blob(db, stored.sha256, encrypted)
+    if blob is not None:
+        # A replayed direct-upload completion finds the blob it created
+        if blob.storage_path != key:
+            await storage.delete(key)
+        return blob
+
+    blob = Blob(
+        content_hash=stored.sha256,
+        size=stored.size,
+        stored_size=stored.stored_size,
+        storage_path=key,
+        storage_type=storage.name,
+        is_encrypted=encrypted,
+        ref_count=1
+    )
+    try:
+        async with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        # The same content was stored concurrently; share that blob
+        blob = await acquire_blob(db, stored.sha256, encrypted)
+        if blob.storage_path != key:
+            await storage.delete(key)
+
+    return blob
+
+
+async def release_blob(db: AsyncSession, blob_id: int) -> Optional[Tuple[str, str]]:
+    """
+    Drop one reference to a blob.
+
+    Flush the referencing document's deletion first. If this was the
+    last reference the blob row is deleted and its (storage_type, key)
+    returned, to be deleted from storage once the transaction commits.
+    """
+    result = await db.execute(
+        update(Blob)
+        .where(Blob.id == blob_id)
+        .values(ref_count=Blob.ref_count - 1)
+        .returning(Blob.ref_count, Blob.storage_type, Blob.storage_path)
+    )
+    row = result.first()
+    if row is None or row.ref_count > 0:
+        return None
+
+    await db.execute(delete(Blob).where(Blob.id == blob_id, Blob.ref_count <= 0))
+    return row.storage_type, row.storage_path
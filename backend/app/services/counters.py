@@ -0,0 +1,283 @@
+"""
+Uplokal Backend - Buffered Counters
+====================================
+View, response and download counters that don't write a row per hit.
+
+`count()` only adds to a buffer: in-process by default, or a Redis hash
+shared by every worker with COUNTER_BACKEND=redis. A background task
+flushes the buffer every COUNTER_FLUSH_SECONDS with one batched
+
+    UPDATE <table> SET <column> = <column> + :n WHERE id = :id
+
+per counter, so increments from concurrent requests and processes add up
+in the database instead of overwriting each other (a read-modify-write
+through the ORM loses them).
+
+Views count once per viewer (user, or client IP) and downloads once
+per signed link, per object within COUNTER_DEDUPE_SECONDS, so refreshes
+and range requests do not inflate them.
+
+Counts in the database trail the real ones by up to one flush interval.
+With the in-process buffer, a crash loses the increments not yet
+flushed. The Redis buffer keeps them until a flush commits, but a crash
+between the database commit and the Redis subtraction (`_flushed`)
+leaves that batch pending, and it is counted again by the next flush.
+
+Serverless hosts run without a lifespan, so api/index.py flushes after
+every request (`flush_counters`) instead of relying on the flusher.
+"""
+
+import asyncio
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+
+from app.config import get_settings
+from app.database import async_session_maker
+from app.models.document import Document
+from app.models.rfq import RFQ
+from app.services.cache import TTLCache
+
+settings = get_settings()
+
+# Counter name -> (model, integer column)
+COUNTERS = {
+    "rfq.views": (RFQ, "view_count"),
+    "rfq.responses": (RFQ, "response_count"),
+    "document.downloads": (Document, "access_count"),
+}
+
+# Buffer flush interval, in seconds
+COUNTER_FLUSH_SECONDS = 5.0
+
+# A viewer counts once per object within this many seconds
+COUNTER_DEDUPE_SECONDS = 30 * 60
+COUNTER_DEDUPE_MAXSIZE = 100_000
+
+# Redis keys (COUNTER_BACKEND=redis)
+REDIS_PENDING_KEY = "uplokal:counters:pending"
+REDIS_SEEN_PREFIX = "uplokal:counters:seen:"
+REDIS_FLUSH_LOCK_KEY = "uplokal:counters:flush-lock"
+REDIS_FLUSH_LOCK_SECONDS = 60  # Far above a flush; a dead flusher's lock expires
+
+# Release the flush lock only if this process still holds it
+REDIS_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Subtract flushed amounts, dropping fields that reach zero
+REDIS_SUBTRACT_SCRIPT = """
+for i = 1, #ARGV, 2 do
+    if redis.call('HINCRBY', KEYS[1], ARGV[i], -tonumber(ARGV[i + 1])) <= 0 then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+"""
+
+Pending = Dict[Tuple[str, int], int]
+
+
+async def apply_counts(pending: Pending) -> None:
+    """Add buffered counts to the database in one transaction."""
+    by_counter: Dict[str, Dict[int, int]] = defaultdict(dict)
+    for (name, object_id), n in pending.items():
+        if n > 0 and name in COUNTERS:
+            by_counter[name][object_id] = n
+
+    async with async_session_maker() as db:
+        for name, counts in by_counter.items():
+            model, column = COUNTERS[name]
+            table = model.__table__
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("object_id"))
+                .values({column: table.c[column] + bindparam("n")})
+            )
+            # Same row order in every process, so concurrent flushes can't deadlock
+            await db.execute(stmt, [{"object_id": i, "n": counts[i]} for i in sorted(counts)])
+        await db.commit()
+
+
+class CounterBuffer:
+    """In-process buffer, flushed by a background task."""
+
+    def __init__(self):
+        self._pending: Pending = defaultdict(int)
+        self._seen = TTLCache(maxsize=COUNTER_DEDUPE_MAXSIZE, ttl=COUNTER_DEDUPE_SECONDS)
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    async def count(self, name: str, object_id: int, n: int = 1, viewer: Any = None) -> bool:
+        """
+        Add `n` to a counter; with a `viewer`, only their first hit per
+        dedupe window counts.
+
+        Returns:
+            True if counted
+        """
+        if viewer is not None and not await self._first_hit(f"{name}:{object_id}:{viewer}"):
+            return False
+        await self._add(name, object_id, n)
+        self._start()
+        return True
+
+    async def _first_hit(self, key: str) -> bool:
+        if self._seen.get(key):
+            return False
+        self._seen.set(key, True)
+        return True
+
+    async def _add(self, name: str, object_id: int, n: int) -> None:
+        self._pending[(name, object_id)] += n
+
+    async def _take(self) -> Pending:
+        pending, self._pending = self._pending, defaultdict(int)
+        return pending
+
+    async def _flushed(self, pending: Pending) -> None:
+        pass
+
+    async def _failed(self, pending: Pending) -> None:
+        # Keep them for the next flush
+        for key, n in pending.items():
+            self._pending[key] += n
+
+    def _start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(COUNTER_FLUSH_SECONDS)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Counter flush failed: {e}")
+
+    async def flush(self) -> int:
+        """Write buffered counts to the database. Returns how many counters changed."""
+        async with self._flush_lock:
+            pending = await self._take()
+            if not pending:
+                return 0
+            try:
+                await apply_counts(pending)
+            except BaseException:
+                # Including cancellation: the taken batch must not be dropped
+                await self._failed(pending)
+                raise
+            await self._flushed(pending)
+            return len(pending)
+
+    async def close(self) -> None:
+        """Stop the flusher and write what is left."""
+        if self._task is not None:
+            # Let an in-flight flush finish, then stop the flusher between flushes
+            async with self._flush_lock:
+                self._task.cancel()
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Final counter flush failed: {e}")
+
+
+class RedisCounterBuffer(CounterBuffer):
+    """
+    Buffer in a Redis hash shared by all workers.
+
+    One process flushes at a time (a Redis lock). Flushed amounts are
+    subtracted after the database commits, so hits that arrive during a
+    flush stay pending.
+    """
+
+    def __init__(self, redis_url: str):
+        super().__init__()
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(redis_url)
+        self._lock_token: Optional[str] = None
+
+    async def _first_hit(self, key: str) -> bool:
+        return bool(await self._redis.set(REDIS_SEEN_PREFIX + key, 1, nx=True, ex=COUNTER_DEDUPE_SECONDS))
+
+    async def _add(self, name: str, object_id: int, n: int) -> None:
+        await self._redis.hincrby(REDIS_PENDING_KEY, f"{name}:{object_id}", n)
+
+    async def _take(self) -> Pending:
+        token = uuid.uuid4().hex
+        if not await self._redis.set(REDIS_FLUSH_LOCK_KEY, token, nx=True, ex=REDIS_FLUSH_LOCK_SECONDS):
+            return {}  # Another worker is flushing
+        self._lock_token = token
+        pending = {}
+        for field, n in (await self._redis.hgetall(REDIS_PENDING_KEY)).items():
+            name, _, object_id = field.decode().rpartition(":")
+            pending[(name, int(object_id))] = int(n)
+        if not pending:
+            await self._release()
+        return pending
+
+    async def _release(self) -> None:
+        # Token-checked: a lock that expired and was taken by another worker stays theirs
+        token, self._lock_token = self._lock_token, None
+        if token is not None:
+            await self._redis.eval(REDIS_RELEASE_SCRIPT, 1, REDIS_FLUSH_LOCK_KEY, token)
+
+    async def _flushed(self, pending: Pending) -> None:
+        args = [a for (name, object_id), n in pending.items() for a in (f"{name}:{object_id}", n)]
+        await self._redis.eval(REDIS_SUBTRACT_SCRIPT, 1, REDIS_PENDING_KEY, *args)
+        await self._release()
+
+    async def _failed(self, pending: Pending) -> None:
+        # Still pending in Redis
+        await self._release()
+
+    async def close(self) -> None:
+        await super().close()
+        await self._redis.aclose()
+
+
+_buffer: Optional[CounterBuffer] = None
+
+
+def get_counters() -> CounterBuffer:
+    """Get the process-wide counter buffer, created on first use."""
+    global _buffer
+    if _buffer is None:
+        if settings.counter_backend == "redis":
+            _buffer = RedisCounterBuffer(settings.redis_url)
+        else:
+            _buffer = CounterBuffer()
+    return _buffer
+
+
+async def count(name: str, object_id: int, n: int = 1, viewer: Any = None) -> bool:
+    """Add to a counter in COUNTERS (see `CounterBuffer.count`)."""
+    return await get_counters().count(name, object_id, n, viewer)
+
+
+async def flush_counters() -> None:
+    """
+    Flush the buffer now. For hosts without a lifespan (serverless), where
+    the background flusher is frozen between requests and never shut down.
+    """
+    if _buffer is not None:
+        try:
+            await _buffer.flush()
+        except Exception as e:
+            print(f"Counter flush failed: {e}")
+
+
+async def close_counters() -> None:
+    """Flush and stop the counters on shutdown."""
+    global _buffer
+    if _buffer is not None:
+        await _buffer.close()
+        _buffer = None
@@ -1,7 +1,8 @@
 """
 Uplokal Backend - Encryption Service
 ======================================
-Provides ID obfuscation (Hashids), AES-256 encryption, and signed URLs.
+Provides ID obfuscation (Hashids), AES-256 encryption (parameters and
+streaming file encryption), and signed URLs.
 """
 
 import base64
@@ -10,7 +11,7 @@ import hmac
 import json
 import secrets
 import time
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Optional
 
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from hashids import Hashids
@@ -214,3 +215,212 @@ def get_signed_download_url(document_id: int, expiry_minutes: int = 30) -> str:
     doc_hash = encode_id(document_id)
     query = generate_signed_url("document", doc_hash, expiry_minutes * 60)
     return f"/api/documents/download/{doc_hash}?{query}"
+
+
+def get_signed_preview_url(document_id: int, expiry_minutes: int = 30) -> str:
+    """
+    Signed URL of a document's preview image, like get_signed_download_url.
+    
+    Returns:
+        Full URL path: /api/documents/preview/{hash}?expires=...&signature=...
+    """
+    doc_hash = encode_id(document_id)
+    query = generate_signed_url("preview", doc_hash, expiry_minutes * 60)
+    return f"/api/documents/preview/{doc_hash}?{query}"
+
+
+# =============================================================================
+# AES-256-GCM - Streaming File Encryption (Document Vault)
+# =============================================================================
+#
+# Segmented AEAD format (STREAM construction), so files are encrypted and
+# decrypted in O(segment) memory and any byte range can be decrypted
+# without touching the rest of the file:
+#
+#   header   = MAGIC | version (1) | segment size (4) | nonce prefix (7)
+#              | wrapped data key (12-byte nonce + 32-byte key + 16-byte tag)
+#   segments = AES-GCM(data key, nonce = prefix | counter (4) | last flag (1),
+#                      aad = header) of each SEGMENT_SIZE plaintext slice
+#
+# Every segment but the last holds exactly SEGMENT_SIZE plaintext bytes.
+# The last-segment flag stops truncation; the counter stops reordering.
+# Each file gets its own random data key, wrapped by the master AES key.
+
+FILE_MAGIC = b"UPLK"
+FILE_FORMAT_VERSION = 1
+SEGMENT_SIZE = 64 * 1024
+TAG_SIZE = 16
+_NONCE_PREFIX_SIZE = 7
+_WRAPPED_KEY_SIZE = 12 + 32 + TAG_SIZE
+HEADER_SIZE = len(FILE_MAGIC) + 1 + 4 + _NONCE_PREFIX_SIZE + _WRAPPED_KEY_SIZE
+
+
+def _segment_nonce(prefix: bytes, index: int, last: bool) -> bytes:
+    return prefix + index.to_bytes(4, "big") + (b"\x01" if last else b"\x00")
+
+
+class FileEncryptor:
+    """
+    Incremental encryptor for the segmented file format.
+    
+    Usage:
+        encryptor = FileEncryptor()
+        out.write(encryptor.update(chunk))  # any chunk sizes
+        out.write(encryptor.finalize())
+    """
+    
+    def __init__(self, segment_size: int = SEGMENT_SIZE):
+        data_key = AESGCM.generate_key(bit_length=256)
+        self._nonce_prefix = secrets.token_bytes(_NONCE_PREFIX_SIZE)
+        self._segment_size = segment_size
+        
+        prefix = (
+            FILE_MAGIC
+            + bytes([FILE_FORMAT_VERSION])
+            + segment_size.to_bytes(4, "big")
+            + self._nonce_prefix
+        )
+        wrap_nonce = secrets.token_bytes(12)
+        wrapped_key = AESGCM(_aes_key).encrypt(wrap_nonce, data_key, prefix)
+        self.header = prefix + wrap_nonce + wrapped_key
+        
+        self._aesgcm = AESGCM(data_key)
+        self._buffer = b""
+        self._index = 0
+        self._header_written = False
+    
+    def _seal(self, plaintext: bytes, last: bool) -> bytes:
+        nonce = _segment_nonce(self._nonce_prefix, self._index, last)
+        self._index += 1
+        return self._aesgcm.encrypt(nonce, plaintext, self.header)
+    
+    def _start(self) -> list:
+        if self._header_written:
+            return []
+        self._header_written = True
+        return [self.header]
+    
+    def update(self, chunk: bytes) -> bytes:
+        """Encrypt as many full segments as are available."""
+        out = self._start()
+        data = self._buffer + chunk if self._buffer else bytes(chunk)
+        
+        # Keep at least one byte back: only finalize() knows the last segment
+        size = self._segment_size
+        offset = 0
+        while len(data) - offset > size:
+            out.append(self._seal(data[offset:offset + size], last=False))
+            offset += size
+        self._buffer = data[offset:]
+        
+        return b"".join(out)
+    
+    def finalize(self) -> bytes:
+        """Encrypt the final (possibly empty) segment."""
+        out = self._start()
+        out.append(self._seal(self._buffer, last=True))
+        self._buffer = b""
+        return b"".join(out)
+
+
+class FileDecryptor:
+    """Decrypts individual segments of an encrypted file."""
+    
+    def __init__(self, header: bytes):
+        if len(header) != HEADER_SIZE or not header.startswith(FILE_MAGIC):
+            raise ValueError("Not an encrypted vault file")
+        if header[len(FILE_MAGIC)] != FILE_FORMAT_VERSION:
+            raise ValueError("Unsupported encrypted file version")
+        
+        offset = len(FILE_MAGIC) + 1
+        self.segment_size = int.from_bytes(header[offset:offset + 4], "big")
+        offset += 4
+        self._nonce_prefix = header[offset:offset + _NONCE_PREFIX_SIZE]
+        offset += _NONCE_PREFIX_SIZE
+        
+        wrap_nonce = header[offset:offset + 12]
+        data_key = AESGCM(_aes_key).decrypt(wrap_nonce, header[offset + 12:], header[:offset])
+        
+        self.header = header
+        self._aesgcm = AESGCM(data_key)
+    
+    @property
+    def stored_segment_size(self) -> int:
+        return self.segment_size + TAG_SIZE
+    
+    def segment_count(self, stored_size: int) -> int:
+        """Number of segments in a file of `stored_size` bytes."""
+        body = stored_size - HEADER_SIZE
+        return max(1, -(-body // self.stored_segment_size))
+    
+    def plaintext_size(self, stored_size: int) -> int:
+        """Plaintext length of a file of `stored_size` bytes."""
+        return stored_size - HEADER_SIZE - self.segment_count(stored_size) * TAG_SIZE
+    
+    def decrypt_segment(self, index: int, data: bytes, last: bool) -> bytes:
+        """Decrypt one segment; raises InvalidTag if tampered or truncated."""
+        nonce = _segment_nonce(self._nonce_prefix, index, last)
+        return self._aesgcm.decrypt(nonce, data, self.header)
+
+
+def is_encrypted_header(header: bytes) -> bool:
+    """Whether the first bytes of a stored object are the encrypted format."""
+    return header.startswith(FILE_MAGIC)
+
+
+async def decrypt_range(
+    read: Callable[[int, int], AsyncIterator[bytes]],
+    stored_size: int,
+    start: int = 0,
+    end: Optional[int] = None,
+    header: Optional[bytes] = None
+) -> AsyncIterator[bytes]:
+    """
+    Stream decrypted plaintext bytes [start, end] (inclusive) of a stored object.
+    
+    `read(first, last)` streams stored bytes [first, last] from wherever
+    the object lives (local file, S3, ...). Only the segments overlapping
+    the range are read and decrypted. `end=None` means to the end.
+    Pass `header` if it was already read.
+    """
+    if header is None:
+        header = b"".join([chunk async for chunk in read(0, HEADER_SIZE - 1)])
+    decryptor = FileDecryptor(header)
+    
+    size = decryptor.plaintext_size(stored_size)
+    if end is None or end >= size:
+        end = size - 1
+    if start > end:
+        return
+    
+    segment_size = decryptor.segment_size
+    stored_segment_size = decryptor.stored_segment_size
+    last_index = decryptor.segment_count(stored_size) - 1
+    first = start // segment_size
+    last = end // segment_size
+    
+    stored_start = HEADER_SIZE + first * stored_segment_size
+    stored_end = min(HEADER_SIZE + (last + 1) * stored_segment_size, stored_size) - 1
+    
+    buffer = b""
+    index = first
+    async for chunk in read(stored_start, stored_end):
+        buffer += chunk
+        while index <= last:
+            # The final segment of the object may be short
+            if index == last_index:
+                length = stored_size - HEADER_SIZE - index * stored_segment_size
+            else:
+                length = stored_segment_size
+            if len(buffer) < length:
+                break
+            
+            plaintext = decryptor.decrypt_segment(index, buffer[:length], index == last_index)
+            buffer = buffer[length:]
+            
+            segment_start = index * segment_size
+            yield plaintext[max(start - segment_start, 0):end - segment_start + 1]
+            index += 1
+    
+    if index <= last:
+        raise ValueError("Encrypted object is truncated")
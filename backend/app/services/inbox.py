@@ -0,0 +1,138 @@
+"""
+Uplokal Backend - Inbox Service
+================================
+Maintains the denormalized inbox snapshot on `Conversation`
+(per-participant unread counters, last message preview and sender).
+
+The snapshot is updated in the same transaction as the message write,
+and can be rebuilt from the `messages` table with
+`reconcile_conversation_counters` if it ever drifts.
+"""
+
+from sqlalchemy import and_, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.business import Business
+from app.models.message import Conversation, Message, PREVIEW_LENGTH
+
+
+def record_message(
+    conversation: Conversation,
+    recipient_business_id: int,
+    sender_user_id: int,
+    content: str
+) -> None:
+    """
+    Update the inbox snapshot for a newly sent message.
+
+    The recipient's counter is incremented with a SQL expression
+    (`unread_count = unread_count + 1`) so concurrent sends never lose
+    an update.
+    """
+    if conversation.participant_1_id == recipient_business_id:
+        conversation.unread_count_1 = Conversation.unread_count_1 + 1
+    else:
+        conversation.unread_count_2 = Conversation.unread_count_2 + 1
+
+    conversation.last_message_preview = content[:PREVIEW_LENGTH]
+    conversation.last_sender_id = sender_user_id
+
+
+def mark_conversation_read(
+    conversation: Conversation,
+    reader_business_id: int,
+    read_count: int
+) -> None:
+    """
+    Update the reader's unread counter after `read_count` messages were
+    marked read.
+
+    The counter is decremented in SQL (never below zero) rather than
+    reset, so a message sent concurrently stays counted as unread.
+    """
+    if conversation.participant_1_id == reader_business_id:
+        column, attr = Conversation.unread_count_1, "unread_count_1"
+    else:
+        column, attr = Conversation.unread_count_2, "unread_count_2"
+
+    setattr(conversation, attr, case((column > read_count, column - read_count), else_=0))
+
+
+def unread_count_for(conversation: Conversation, business_id: int) -> int:
+    """Get the unread counter belonging to a participant."""
+    if conversation.participant_1_id == business_id:
+        return conversation.unread_count_1 or 0
+    return conversation.unread_count_2 or 0
+
+
+def _unread_subquery(participant_column):
+    """Correlated count of messages the given participant has not read."""
+    return (
+        select(func.count(Message.id))
+        .join(Business, Business.id == participant_column)
+        .where(
+            and_(
+                Message.conversation_id == Conversation.id,
+                Message.sender_id != Business.owner_id,
+                Message.is_read == False
+            )
+        )
+        .scalar_subquery()
+    )
+
+
+async def reconcile_conversation_counters(
+    db: AsyncSession,
+    batch_size: int = 500
+) -> int:
+    """
+    Rebuild every conversation's inbox snapshot from `messages`.
+
+    Works through conversations in id order, one set-based UPDATE and
+    commit per batch, so it can run against a live database.
+
+    Returns:
+        Number of conversations reconciled
+    """
+    latest = (
+        select(Message)
+        .where(Message.conversation_id == Conversation.id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(1)
+    )
+
+    values = {
+        "unread_count_1": _unread_subquery(Conversation.participant_1_id),
+        "unread_count_2": _unread_subquery(Conversation.participant_2_id),
+        "last_message_preview": (
+            latest.with_only_columns(func.substr(Message.content, 1, PREVIEW_LENGTH))
+            .scalar_subquery()
+        ),
+        "last_sender_id": latest.with_only_columns(Message.sender_id).scalar_subquery(),
+    }
+
+    reconciled = 0
+    last_id = 0
+    while True:
+        result = await db.execute(
+            select(Conversation.id)
+            .where(Conversation.id > last_id)
+            .order_by(Conversation.id)
+            .limit(batch_size)
+        )
+        batch_ids = result.scalars().all()
+        if not batch_ids:
+            break
+
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id.in_(batch_ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        reconciled += len(batch_ids)
+        last_id = batch_ids[-1]
+
+    return reconciled
@@ -0,0 +1,407 @@
+"""
+Uplokal Backend - Background Jobs
+==================================
+Durable job queue for slow side effects, so request latency does not
+depend on third-party services.
+
+- Jobs are rows in the `jobs` table (Postgres is the source of truth).
+  Workers claim due jobs with `FOR UPDATE SKIP LOCKED`, run the
+  registered handler, and record the result in the same transaction as
+  the handler's own writes.
+- Failures are retried with exponential backoff and jitter until
+  `max_attempts`. Workers renew the lease of a running job every
+  JOB_HEARTBEAT_SECONDS; a worker that dies mid-job loses it after
+  JOB_LEASE_SECONDS and the job is run again.
+- Handlers that work in batches can take more queued jobs of their own
+  name into the same transaction (`take_queued_jobs`).
+- Enqueueing with an idempotency key returns the existing job for that
+  key instead of starting another one.
+- JOB_BACKEND=redis adds a Redis wake-up list, so idle workers start new
+  jobs immediately instead of on their next poll.
+
+Endpoints opt in per request with `Prefer: respond-async` (RFC 7240) and
+answer 202 with the job's status URL (`GET /api/jobs/{id}`).
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.job import Job, JobStatus
+from app.services.encryption import encode_id
+
+settings = get_settings()
+
+# A running job whose worker has been silent this long is run again
+JOB_LEASE_SECONDS = 300
+
+# How often a worker renews the lease of each job it is running
+JOB_HEARTBEAT_SECONDS = 60
+
+# Retry delay: base * 2^(attempt - 1), capped, with +/-20% jitter
+JOB_BACKOFF_BASE_SECONDS = 5
+JOB_BACKOFF_MAX_SECONDS = 3600
+
+# Finished jobs are kept this long for status polling, then deleted
+JOB_RETENTION = timedelta(days=7)
+
+# Redis list idle workers block on (JOB_BACKEND=redis)
+REDIS_WAKE_KEY = "uplokal:jobs:wake"
+
+JobHandler = Callable[[AsyncSession, Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(name: str):
+    """
+    Register an async handler for jobs called `name`.
+
+    The handler gets a database session and the job payload, and returns
+    a JSON-serializable result (or None). Its writes are committed with
+    the job's success; raising rolls them back and schedules a retry.
+    """
+    def register(handler: JobHandler) -> JobHandler:
+        _handlers[name] = handler
+        return handler
+    return register
+
+
+def get_job_handler(name: str) -> Optional[JobHandler]:
+    return _handlers.get(name)
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before the next attempt after `attempts` failures."""
+    delay = min(JOB_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), JOB_BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+# =============================================================================
+# ENQUEUE
+# =============================================================================
+
+async def enqueue(
+    db: AsyncSession,
+    name: str,
+    payload: Dict[str, Any],
+    owner_id: Optional[int] = None,
+    idempotency_key: Optional[str] = None,
+    max_attempts: int = 5
+) -> Job:
+    """
+    Add a job to the queue and commit the session.
+
+    With an `idempotency_key` (scoped to the job name and owner), a job
+    already enqueued under that key is returned instead.
+    """
+    if idempotency_key:
+        idempotency_key = f"{name}:{owner_id or ''}:{idempotency_key}"[:255]
+        existing = await _get_by_idempotency_key(db, idempotency_key)
+        if existing is not None:
+            return existing
+
+    job = Job(
+        name=name,
+        payload=payload,
+        owner_id=owner_id,
+        idempotency_key=idempotency_key,
+        max_attempts=max_attempts,
+        status=JobStatus.QUEUED,
+        run_at=datetime.utcnow()
+    )
+    try:
+        async with db.begin_nested():
+            db.add(job)
+    except IntegrityError:
+        # Same key enqueued concurrently
+        return await _get_by_idempotency_key(db, idempotency_key)
+
+    await db.commit()
+    await get_notifier().notify()
+    return job
+
+
+def add_job(db: AsyncSession, name: str, payload: Dict[str, Any], owner_id: Optional[int] = None) -> Job:
+    """
+    Add a job to the caller's transaction, without committing.
+
+    The job only exists if the caller's writes commit. No wake-up is
+    sent; workers pick it up on their next poll.
+    """
+    job = Job(name=name, payload=payload, owner_id=owner_id, status=JobStatus.QUEUED, run_at=datetime.utcnow())
+    db.add(job)
+    return job
+
+
+async def _get_by_idempotency_key(db: AsyncSession, key: str) -> Optional[Job]:
+    result = await db.execute(select(Job).where(Job.idempotency_key == key))
+    return result.scalar_one_or_none()
+
+
+def prefers_async(prefer: Optional[str]) -> bool:
+    """Whether a `Prefer` request header asks for an asynchronous response."""
+    if not prefer:
+        return False
+    return any(token.strip().lower() == "respond-async" for token in prefer.split(","))
+
+
+def job_accepted(job: Job) -> JSONResponse:
+    """202 Accepted response pointing at a job's status URL."""
+    status_url = f"/api/jobs/{encode_id(job.id)}"
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"job_id": encode_id(job.id), "status": job.status.value, "status_url": status_url},
+        headers={"Location": status_url, "Preference-Applied": "respond-async"}
+    )
+
+
+# =============================================================================
+# WORKER SIDE
+# =============================================================================
+
+async def claim_jobs(db: AsyncSession, worker_id: str, limit: int) -> List[Job]:
+    """
+    Lease up to `limit` due jobs to a worker and commit.
+
+    SKIP LOCKED lets concurrent workers claim disjoint jobs without
+    waiting on each other.
+    """
+    due = (
+        select(Job.id)
+        .where(Job.status == JobStatus.QUEUED, Job.run_at <= datetime.utcnow())
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(Job)
+        .where(Job.id.in_(due.scalar_subquery()))
+        .values(
+            status=JobStatus.RUNNING,
+            attempts=Job.attempts + 1,
+            locked_by=worker_id,
+            locked_at=datetime.utcnow()
+        )
+        .returning(Job)
+        .execution_options(populate_existing=True)
+    )
+    jobs = list(result.scalars().all())
+    await db.commit()
+    return jobs
+
+
+async def take_queued_jobs(db: AsyncSession, name: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    Take up to `limit` more due jobs called `name` into a running handler.
+
+    For handlers that work better in batches: the taken jobs are marked
+    succeeded in the handler's transaction, so they commit with its
+    writes (or are released again if it fails). Returns their payloads;
+    the caller does not commit.
+    """
+    if limit <= 0:
+        return []
+    due = (
+        select(Job.id)
+        .where(Job.name == name, Job.status == JobStatus.QUEUED, Job.run_at <= datetime.utcnow())
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(Job)
+        .where(Job.id.in_(due.scalar_subquery()))
+        .values(
+            status=JobStatus.SUCCEEDED,
+            attempts=Job.attempts + 1,
+            result={"batched": True},
+            last_error=None,
+            finished_at=datetime.utcnow()
+        )
+        .returning(Job.payload)
+    )
+    return [payload or {} for payload in result.scalars().all()]
+
+
+def _leased(job: Job, worker_id: str) -> tuple:
+    """Conditions for `job` still being run by `worker_id`."""
+    return (Job.id == job.id, Job.status == JobStatus.RUNNING, Job.locked_by == worker_id)
+
+
+async def renew_lease(db: AsyncSession, job: Job, worker_id: str) -> bool:
+    """
+    Extend a running job's lease and commit.
+
+    Returns:
+        False if the worker no longer holds the lease
+    """
+    result = await db.execute(
+        update(Job).where(*_leased(job, worker_id)).values(locked_at=datetime.utcnow())
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def complete_job(db: AsyncSession, job: Job, worker_id: str, result: Optional[Dict[str, Any]]) -> bool:
+    """
+    Mark a job succeeded (with the handler's writes) and commit.
+
+    Returns:
+        False if the worker lost the lease (the job was requeued and may
+        be running elsewhere); the handler's writes are rolled back
+    """
+    updated = await db.execute(
+        update(Job)
+        .where(*_leased(job, worker_id))
+        .values(
+            status=JobStatus.SUCCEEDED,
+            result=result,
+            last_error=None,
+            locked_by=None,
+            locked_at=None,
+            finished_at=datetime.utcnow()
+        )
+    )
+    if updated.rowcount == 0:
+        await db.rollback()
+        return False
+    await db.commit()
+    return True
+
+
+async def fail_job(db: AsyncSession, job: Job, worker_id: str, error: str) -> Optional[bool]:
+    """
+    Record a failed attempt and commit: retry later, or give up.
+
+    Returns:
+        True if the job will be retried, False if not, None if the
+        worker lost the lease (nothing is recorded)
+    """
+    retry = job.attempts < job.max_attempts
+    values = {"last_error": error[:5000], "locked_by": None, "locked_at": None}
+    if retry:
+        values.update(
+            status=JobStatus.QUEUED,
+            run_at=datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))
+        )
+    else:
+        values.update(status=JobStatus.FAILED, finished_at=datetime.utcnow())
+
+    updated = await db.execute(update(Job).where(*_leased(job, worker_id)).values(**values))
+    if updated.rowcount == 0:
+        await db.rollback()
+        return None
+    await db.commit()
+    return retry
+
+
+async def requeue_expired_leases(db: AsyncSession) -> int:
+    """Put jobs held by dead workers back in the queue. Returns how many."""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS)
+    expired = (Job.status == JobStatus.RUNNING, Job.locked_at < cutoff)
+
+    # A job that keeps taking its worker down must not loop forever
+    await db.execute(
+        update(Job)
+        .where(*expired, Job.attempts >= Job.max_attempts)
+        .values(
+            status=JobStatus.FAILED,
+            last_error="Worker lease expired",
+            locked_by=None,
+            locked_at=None,
+            finished_at=datetime.utcnow()
+        )
+    )
+    result = await db.execute(
+        update(Job)
+        .where(*expired)
+        .values(status=JobStatus.QUEUED, locked_by=None, locked_at=None, run_at=datetime.utcnow())
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def prune_finished_jobs(db: AsyncSession) -> int:
+    """Delete finished jobs past their retention. Returns how many."""
+    result = await db.execute(
+        delete(Job).where(
+            Job.status.in_([JobStatus.SUCCEEDED, JobStatus.FAILED]),
+            Job.finished_at < datetime.utcnow() - JOB_RETENTION
+        )
+    )
+    await db.commit()
+    return result.rowcount
+
+
+# =============================================================================
+# WAKE-UPS
+# =============================================================================
+
+class JobNotifier:
+    """Wake-ups between API and workers; the default just polls."""
+
+    async def notify(self) -> None:
+        pass
+
+    async def wait(self, timeout: float) -> None:
+        """Return when a job may be available, or after `timeout` seconds."""
+        await asyncio.sleep(timeout)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisJobNotifier(JobNotifier):
+    """Wake-ups through a Redis list; jobs themselves stay in Postgres."""
+
+    def __init__(self, redis_url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(redis_url)
+
+    async def notify(self) -> None:
+        try:
+            await self._redis.rpush(REDIS_WAKE_KEY, 1)
+        except Exception:
+            # Workers still find the job on their next poll
+            pass
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await self._redis.blpop([REDIS_WAKE_KEY], timeout=timeout)
+        except Exception:
+            await super().wait(timeout)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+_notifier: Optional[JobNotifier] = None
+
+
+def get_notifier() -> JobNotifier:
+    """Get the process-wide notifier, created on first use."""
+    global _notifier
+    if _notifier is None:
+        if settings.job_backend == "redis":
+            _notifier = RedisJobNotifier(settings.redis_url)
+        else:
+            _notifier = JobNotifier()
+    return _notifier
+
+
+async def close_jobs() -> None:
+    """Close the notifier on shutdown."""
+    global _notifier
+    if _notifier is not None:
+        await _notifier.close()
+        _notifier = None
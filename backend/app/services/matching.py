@@ -0,0 +1,818 @@
+"""
+Uplokal Backend - B2B Matchmaking
+==================================
+Scores verified businesses as partners for a business profile.
+
+Every verified business is encoded once into NumPy feature arrays
+(category, province/city, export countries, certifications, size band,
+diagnostic scores) held in a process-wide MatchIndex. A blocking index
+on (category, province) picks candidates in the same category, nearest
+provinces first, so each request scores a few thousand rows in one
+vectorized pass instead of the whole table.
+
+The index stays fresh incrementally: writes that touch matching fields
+add a `match_index_changes` row in the same transaction, and each
+process tails that feed, re-encoding only the businesses it names. Full
+rebuilds happen periodically to compact, or on demand
+(rebuild_match_index.py).
+
+Compatibility is a weighted sum of per-feature scores in [0, 1]:
+
+- category        same category
+- location        same city > same province > nearer provinces
+- export          share of the profile's export countries the partner also serves
+- certifications  partner's certifications, and overlap with the profile's
+- size            closeness of employee-count bands (BPS micro/small/medium/large)
+- diagnostic      partner's diagnostic health scores
+"""
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, inspect, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+from app.models.business import Business
+from app.models.matching import MatchIndexChange
+from app.services.encryption import encode_id
+from app.services.jobs import add_job
+
+# Feature weights (sum to 1)
+WEIGHTS = {
+    "category": 0.30,
+    "location": 0.20,
+    "export": 0.20,
+    "certifications": 0.10,
+    "size": 0.10,
+    "diagnostic": 0.10,
+}
+
+# Most candidates scored per request, taken from the nearest provinces first
+MAX_CANDIDATES = 5000
+
+# Distance (km) at which the province part of the location score halves
+LOCATION_HALF_DISTANCE_KM = 400
+
+# Change feed: poll interval (seconds) and most entries applied per poll
+MATCH_FEED_POLL_SECONDS = 1.0
+MATCH_FEED_BATCH = 1000
+
+# Feed ids skipped by a poll may belong to transactions still committing;
+# they are looked for again for this long (seconds)
+MATCH_FEED_GAP_SECONDS = 30
+
+# Full rebuild (compaction) at least this often (seconds), or sooner
+# once this many rows are dead
+MATCH_INDEX_REBUILD_SECONDS = 6 * 3600
+COMPACTION_DEAD_SHARE = 0.25
+COMPACTION_MIN_DEAD = 1000
+
+# Feed entries are deleted after this long
+MATCH_FEED_RETENTION = timedelta(days=1)
+
+# Employee-count band lower bounds (BPS: mikro, kecil, menengah, besar)
+SIZE_BANDS = (1, 5, 20, 100)
+
+# Approximate province centroids (lat, lon), for distance between provinces
+PROVINCE_CENTROIDS = {
+    "aceh": (4.7, 96.7),
+    "sumatera utara": (2.1, 99.5),
+    "sumatera barat": (-0.7, 100.8),
+    "riau": (0.3, 101.7),
+    "kepulauan riau": (1.0, 104.5),
+    "jambi": (-1.6, 103.6),
+    "sumatera selatan": (-3.3, 104.0),
+    "kepulauan bangka belitung": (-2.7, 106.4),
+    "bengkulu": (-3.8, 102.3),
+    "lampung": (-4.6, 105.4),
+    "dki jakarta": (-6.2, 106.8),
+    "jawa barat": (-6.9, 107.6),
+    "banten": (-6.4, 106.1),
+    "jawa tengah": (-7.2, 110.1),
+    "di yogyakarta": (-7.8, 110.4),
+    "jawa timur": (-7.5, 112.2),
+    "bali": (-8.4, 115.2),
+    "nusa tenggara barat": (-8.6, 117.4),
+    "nusa tenggara timur": (-8.7, 121.1),
+    "kalimantan barat": (-0.3, 111.5),
+    "kalimantan tengah": (-1.7, 113.4),
+    "kalimantan selatan": (-3.1, 115.3),
+    "kalimantan timur": (0.5, 116.4),
+    "kalimantan utara": (3.1, 116.0),
+    "sulawesi utara": (0.6, 124.0),
+    "gorontalo": (0.7, 122.4),
+    "sulawesi tengah": (-1.4, 121.4),
+    "sulawesi barat": (-2.8, 119.2),
+    "sulawesi selatan": (-3.7, 120.0),
+    "sulawesi tenggara": (-4.1, 122.2),
+    "maluku": (-3.2, 130.1),
+    "maluku utara": (1.6, 127.8),
+    "papua": (-2.5, 140.7),
+    "papua barat": (-1.3, 133.2),
+    "papua barat daya": (-0.9, 131.3),
+    "papua tengah": (-3.4, 135.5),
+    "papua pegunungan": (-4.1, 138.9),
+    "papua selatan": (-7.0, 139.5),
+}
+
+PROVINCE_ALIASES = {
+    "ntb": "nusa tenggara barat",
+    "ntt": "nusa tenggara timur",
+    "bangka belitung": "kepulauan bangka belitung",
+    "jakarta": "dki jakarta",
+    "yogyakarta": "di yogyakarta",
+    "diy": "di yogyakarta",
+    "daerah istimewa yogyakarta": "di yogyakarta",
+}
+
+# Columns the index is built from; changes to these (or to is_verified)
+# are recorded in the change feed
+INDEX_COLUMNS = (
+    Business.id,
+    Business.category,
+    Business.province,
+    Business.city,
+    Business.export_countries,
+    Business.certifications,
+    Business.employee_count,
+    Business.health_score,
+    Business.marketing_score,
+    Business.finance_score,
+    Business.legal_score,
+    Business.export_ready,
+)
+MATCH_FIELDS = [column.key for column in INDEX_COLUMNS[1:]] + ["is_verified"]
+
+
+# =============================================================================
+# FEATURE ENCODING
+# =============================================================================
+
+def normalize_name(value: Any) -> Optional[str]:
+    """Lowercase, single-spaced form of a name, or None if empty."""
+    if not isinstance(value, str):
+        return None
+    value = " ".join(value.split()).lower()
+    return value or None
+
+
+def normalize_province(value: Any) -> Optional[str]:
+    value = normalize_name(value)
+    return PROVINCE_ALIASES.get(value, value)
+
+
+def normalize_names(values: Any) -> Dict[str, str]:
+    """Normalized -> display form of a JSON list of names."""
+    if not isinstance(values, list):
+        return {}
+    return {key: str(v).strip() for v in values if (key := normalize_name(v))}
+
+
+def size_band(employee_count: Optional[int]) -> int:
+    """Employee-count band 0-3, or -1 if unknown."""
+    if not employee_count or employee_count < 1:
+        return -1
+    return sum(employee_count >= bound for bound in SIZE_BANDS) - 1
+
+
+def diagnostic_score(health, marketing, finance, legal) -> float:
+    """Diagnostic scores (0-100) as one value in [0, 1]."""
+    parts = [s or 0 for s in (marketing, finance, legal)]
+    return ((health or 0) * 0.5 + sum(parts) / len(parts) * 0.5) / 100
+
+
+@dataclass
+class MatchProfile:
+    """A business profile encoded for matching."""
+    business_id: Optional[int]
+    category: Optional[str]
+    province: Optional[str]
+    city: Optional[str]
+    countries: Dict[str, str] = field(default_factory=dict)
+    certifications: Dict[str, str] = field(default_factory=dict)
+    size_band: int = -1
+
+    @classmethod
+    def from_business(cls, business: Business) -> "MatchProfile":
+        return cls(
+            business_id=business.id,
+            category=normalize_name(business.category),
+            province=normalize_province(business.province),
+            city=normalize_name(business.city),
+            countries=normalize_names(business.export_countries),
+            certifications=normalize_names(business.certifications),
+            size_band=size_band(business.employee_count)
+        )
+
+
+@dataclass
+class MatchHit:
+    business_id: int
+    score: int  # 0-100
+    reasons: List[str]
+
+
+class _Vocabulary:
+    """Stable codes for normalized names, keeping a display form."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def add(self, key: Optional[str], display: Optional[str] = None) -> int:
+        if key is None:
+            return -1
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.names)
+            self.names.append(display or key)
+        return code
+
+    def get(self, key: Optional[str]) -> int:
+        return self.codes.get(key, -1) if key is not None else -1
+
+    def __len__(self):
+        return len(self.names)
+
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+# Per-row arrays: name -> (dtype, value for an empty row)
+ROW_ARRAYS = {
+    "business_ids": (np.int64, 0),
+    "category": (np.int32, -1),
+    "province": (np.int32, -1),
+    "city": (np.int32, -1),
+    "size_band": (np.int8, -1),
+    "diagnostic": (np.float32, 0),
+    "export_ready": (bool, False),
+    "cert_count": (np.float32, 0),
+    "alive": (bool, False),
+}
+
+
+class MatchIndex:
+    """
+    Feature arrays of all verified businesses, with a blocking index.
+
+    Updates are append-only: a changed business gets a new row and its
+    old row is marked dead, so existing blocks are never rewritten. Dead
+    rows are dropped when the index is rebuilt.
+    """
+
+    def __init__(self, rows: Sequence[Tuple], change_id: int = 0):
+        self.categories = _Vocabulary()
+        self.provinces = _Vocabulary()
+        self.cities = _Vocabulary()
+        self.countries = _Vocabulary()
+        self.certifications = _Vocabulary()
+
+        for province in PROVINCE_CENTROIDS:
+            self.provinces.add(province)
+
+        self.position: Dict[int, int] = {}  # business_id -> live row
+        self.dead_rows = 0
+        self.change_id = change_id  # Last change feed entry reflected
+        self._size = 0
+        self._capacity = 0
+        self._grow(len(rows))
+
+        country_cells: List[Tuple[int, int]] = []
+        cert_cells: List[Tuple[int, int]] = []
+        for i, row in enumerate(rows):
+            countries, certs = self._encode(i, row)
+            country_cells.extend((i, c) for c in countries)
+            cert_cells.extend((i, c) for c in certs)
+        n = self._size = len(rows)
+
+        # Multi-hot membership matrices
+        self.country_matrix = _multi_hot(self._capacity, len(self.countries), country_cells)
+        self.cert_matrix = _multi_hot(self._capacity, len(self.certifications), cert_cells)
+
+        self.distance_km = _distance_matrix(self.provinces.names)
+
+        # Blocking index: category -> province -> row positions
+        self.blocks: Dict[int, Dict[int, np.ndarray]] = {}
+        self.by_province: Dict[int, np.ndarray] = {}
+        if n:
+            width = len(self.provinces) + 1
+            keys = self.category[:n].astype(np.int64) * width + (self.province[:n] + 1)
+            order = np.argsort(keys, kind="stable")
+            unique, starts = np.unique(keys[order], return_index=True)
+            for key, rows_ in zip(unique, np.split(order, starts[1:])):
+                category, province = divmod(int(key), width)
+                self.blocks.setdefault(category, {})[province - 1] = rows_
+            order = np.argsort(self.province[:n], kind="stable")
+            unique, starts = np.unique(self.province[:n][order], return_index=True)
+            for province, rows_ in zip(unique, np.split(order, starts[1:])):
+                self.by_province[int(province)] = rows_
+
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self.position)
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self.dead_rows > max(COMPACTION_MIN_DEAD, len(self) * COMPACTION_DEAD_SHARE)
+
+    def _encode(self, i: int, row: Tuple) -> Tuple[List[int], List[int]]:
+        """Write one business into row `i`; returns its country and certification codes."""
+        (business_id, category, province, city, export_countries, certifications,
+         employees, health, marketing, finance, legal, export_ready) = row
+        self.business_ids[i] = business_id
+        self.category[i] = self.categories.add(normalize_name(category), category)
+        self.province[i] = self.provinces.add(normalize_province(province), province)
+        self.city[i] = self.cities.add(normalize_name(city), city)
+        self.size_band[i] = size_band(employees)
+        self.diagnostic[i] = diagnostic_score(health, marketing, finance, legal)
+        self.export_ready[i] = bool(export_ready)
+        self.alive[i] = True
+        self.position[business_id] = i
+
+        countries = [self.countries.add(key, display) for key, display in normalize_names(export_countries).items()]
+        certs = [self.certifications.add(key, display) for key, display in normalize_names(certifications).items()]
+        self.cert_count[i] = len(certs)
+        return countries, certs
+
+    def _grow(self, capacity: int) -> None:
+        if capacity <= self._capacity:
+            return
+        capacity = max(capacity, self._capacity * 2, 1024)
+        for name, (dtype, empty) in ROW_ARRAYS.items():
+            grown = np.full(capacity, empty, dtype=dtype)
+            if self._size:
+                grown[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, grown)
+        for name in ("country_matrix", "cert_matrix"):
+            matrix = getattr(self, name, None)
+            if matrix is not None:
+                grown = np.zeros((capacity, matrix.shape[1]), dtype=np.uint8)
+                grown[:self._size] = matrix[:self._size]
+                setattr(self, name, grown)
+        self._capacity = capacity
+
+    def _widen(self, name: str, width: int) -> None:
+        matrix = getattr(self, name)
+        if width > matrix.shape[1]:
+            grown = np.zeros((self._capacity, max(width, matrix.shape[1] * 2)), dtype=np.uint8)
+            grown[:, :matrix.shape[1]] = matrix
+            setattr(self, name, grown)
+
+    # -------------------------------------------------------------------------
+    # Incremental updates
+
+    def upsert(self, row: Tuple) -> None:
+        """Add or replace one business (a row of INDEX_COLUMNS)."""
+        self.remove(row[0])
+        i = self._size
+        self._grow(i + 1)
+        provinces = len(self.provinces)
+
+        countries, certs = self._encode(i, row)
+        self._size += 1
+        self._widen("country_matrix", len(self.countries))
+        self._widen("cert_matrix", len(self.certifications))
+        self.country_matrix[i, countries] = 1
+        self.cert_matrix[i, certs] = 1
+        if len(self.provinces) != provinces:
+            self.distance_km = _distance_matrix(self.provinces.names)
+
+        category, province = int(self.category[i]), int(self.province[i])
+        blocks = self.blocks.setdefault(category, {})
+        blocks[province] = np.append(blocks.get(province, np.zeros(0, dtype=np.int64)), i)
+        self.by_province[province] = np.append(self.by_province.get(province, np.zeros(0, dtype=np.int64)), i)
+
+    def remove(self, business_id: int) -> None:
+        """Drop a business (no longer verified, or deleted)."""
+        i = self.position.pop(business_id, None)
+        if i is not None:
+            self.alive[i] = False
+            self.dead_rows += 1
+
+    # -------------------------------------------------------------------------
+    # Matching
+
+    def live_rows(self, category: Optional[str] = None) -> np.ndarray:
+        """Positions of every live row, or of those in one (normalized) category."""
+        if category is None:
+            return np.flatnonzero(self.alive[:self._size])
+        code = self.categories.get(category)
+        # -1 (not in the index) would be the block of uncategorized businesses
+        blocks = self.blocks.get(code, {}) if code >= 0 else {}
+        if not blocks:
+            return np.zeros(0, dtype=np.int64)
+        rows = np.concatenate(list(blocks.values()))
+        return np.sort(rows[self.alive[rows]])
+
+    def candidates(self, profile: MatchProfile) -> np.ndarray:
+        """Row positions to score: same category, nearest provinces first."""
+        category = self.categories.get(profile.category)
+        province = self.provinces.get(profile.province)
+
+        if category < 0:
+            # No (known) category: nearby businesses of any category
+            rows = self.by_province.get(province) if province >= 0 else None
+            if rows is None:
+                return np.zeros(0, dtype=np.int64)
+            return rows[self.alive[rows]][:MAX_CANDIDATES]
+
+        blocks = self.blocks.get(category, {})
+        parts, total = [], 0
+        for p in self._provinces_by_distance(province):
+            rows = blocks.get(p)
+            if rows is None:
+                continue
+            parts.append(rows)
+            total += len(rows)
+            if total >= MAX_CANDIDATES:
+                break
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        rows = np.concatenate(parts)
+        return rows[self.alive[rows]][:MAX_CANDIDATES]
+
+    def _provinces_by_distance(self, province: int) -> Iterable[int]:
+        if province < 0:
+            return [*range(len(self.provinces)), -1]
+        distances = self.distance_km[province]
+        order = np.argsort(np.where(np.isnan(distances), np.inf, distances), kind="stable")
+        return [*order.tolist(), -1]
+
+    def score(self, profile: MatchProfile, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """Per-feature scores in [0, 1] for candidate rows, plus `total`."""
+        category = self.categories.get(profile.category)
+        province = self.provinces.get(profile.province)
+        city = self.cities.get(profile.city)
+
+        parts: Dict[str, np.ndarray] = {}
+        parts["category"] = (self.category[rows] == category).astype(np.float32) if category >= 0 \
+            else np.zeros(len(rows), dtype=np.float32)
+
+        cand_province = self.province[rows]
+        if province >= 0:
+            distance = self.distance_km[province, np.maximum(cand_province, 0)]
+            nearby = 0.7 * np.exp2(-np.nan_to_num(distance, nan=np.inf) / LOCATION_HALF_DISTANCE_KM)
+            location = np.where(cand_province == province, 0.8, np.where(cand_province < 0, 0.2, nearby))
+            if city >= 0:
+                location = np.where(self.city[rows] == city, 1.0, location)
+        else:
+            location = np.full(len(rows), 0.2)
+        parts["location"] = location.astype(np.float32)
+
+        countries = [c for c in (self.countries.get(k) for k in profile.countries) if c >= 0]
+        if profile.countries:
+            overlap = self.country_matrix[np.ix_(rows, countries)].sum(axis=1) if countries else 0
+            parts["export"] = (np.zeros(len(rows)) + overlap / len(profile.countries)).astype(np.float32)
+        else:
+            parts["export"] = self.export_ready[rows] * np.float32(0.5)
+
+        held = np.minimum(self.cert_count[rows] / 3, 1)
+        certs = [c for c in (self.certifications.get(k) for k in profile.certifications) if c >= 0]
+        if profile.certifications:
+            shared = self.cert_matrix[np.ix_(rows, certs)].sum(axis=1) if certs else 0
+            parts["certifications"] = (0.5 * held + 0.5 * shared / len(profile.certifications)).astype(np.float32)
+        else:
+            parts["certifications"] = held
+
+        cand_band = self.size_band[rows]
+        if profile.size_band >= 0:
+            band_gap = np.abs(cand_band.astype(np.float32) - profile.size_band)
+            parts["size"] = np.where(cand_band >= 0, 1 - band_gap / 3, 0.5).astype(np.float32)
+        else:
+            parts["size"] = np.full(len(rows), 0.5, dtype=np.float32)
+
+        parts["diagnostic"] = self.diagnostic[rows]
+
+        total = np.zeros(len(rows), dtype=np.float32)
+        for name, weight in WEIGHTS.items():
+            total += weight * parts[name]
+        parts["total"] = total
+        return parts
+
+    def match(self, profile: MatchProfile, limit: int = 10) -> List[MatchHit]:
+        """Best `limit` partners for a profile, best first."""
+        rows = self.candidates(profile)
+        if profile.business_id is not None:
+            rows = rows[self.business_ids[rows] != profile.business_id]
+        if not len(rows) or limit <= 0:
+            return []
+
+        parts = self.score(profile, rows)
+        total = parts["total"]
+        if len(rows) > limit:
+            top = np.argpartition(-total, limit)[:limit]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-total[top], kind="stable")]
+
+        return [
+            MatchHit(
+                business_id=int(self.business_ids[rows[i]]),
+                score=int(round(float(total[i]) * 100)),
+                reasons=self._reasons(profile, int(rows[i]), {k: float(v[i]) for k, v in parts.items()})
+            )
+            for i in top
+        ]
+
+    def _reasons(self, profile: MatchProfile, row: int, parts: Dict[str, float]) -> List[str]:
+        reasons = []
+        if parts["category"] >= 1:
+            reasons.append("Kategori produk sesuai")
+        if parts["location"] >= 1:
+            reasons.append("Berada di kota yang sama")
+        elif parts["location"] >= 0.8:
+            reasons.append("Berada di provinsi yang sama")
+        elif parts["location"] >= 0.35:
+            reasons.append("Lokasi berdekatan untuk pengiriman")
+        shared = [
+            profile.countries[key] for key in profile.countries
+            if (code := self.countries.get(key)) >= 0 and self.country_matrix[row, code]
+        ]
+        if shared:
+            reasons.append(f"Pasar ekspor sama: {', '.join(shared[:3])}")
+        elif self.export_ready[row]:
+            reasons.append("Siap ekspor")
+        if self.cert_count[row]:
+            certs = np.flatnonzero(self.cert_matrix[row])[:3]
+            reasons.append(f"Bersertifikat: {', '.join(self.certifications.names[c] for c in certs)}")
+        if parts["size"] >= 1 and profile.size_band >= 0:
+            reasons.append("Skala usaha sebanding")
+        if parts["diagnostic"] >= 0.75:
+            reasons.append("Skor kesehatan bisnis tinggi")
+        return reasons
+
+
+def _multi_hot(n: int, width: int, cells: List[Tuple[int, int]]) -> np.ndarray:
+    matrix = np.zeros((n, max(width, 1)), dtype=np.uint8)
+    if cells:
+        rows, cols = np.array(cells, dtype=np.int64).T
+        matrix[rows, cols] = 1
+    return matrix
+
+
+def _distance_matrix(provinces: List[str]) -> np.ndarray:
+    """Great-circle km between province centroids (NaN if unknown)."""
+    coords = np.array(
+        [PROVINCE_CENTROIDS.get(p, (math.nan, math.nan)) for p in provinces], dtype=np.float64
+    ).reshape(-1, 2)
+    lat, lon = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    return (2 * 6371 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))).astype(np.float32)
+
+
+# =============================================================================
+# CHANGE FEED
+# =============================================================================
+
+def record_match_change(db: AsyncSession, business: Business) -> None:
+    """
+    Queue a business for a match index refresh, if a matching field changed.
+
+    An existing business also gets its suggested RFQs recomputed (see
+    app/services/rfq_matching.py); a new one is unverified, so has none.
+    Call before committing: both commit with the change.
+    """
+    state = inspect(business)
+    if state.persistent and not any(state.attrs[name].history.has_changes() for name in MATCH_FIELDS):
+        return
+    db.add(MatchIndexChange(business=business))
+    if state.persistent:
+        add_job(db, "rfq.refresh_suggestions", {"business_id": business.id}, owner_id=business.owner_id)
+
+
+async def request_match_index_rebuild(db: AsyncSession) -> None:
+    """Ask every process to rebuild its whole index, and commit."""
+    db.add(MatchIndexChange(business_id=None))
+    await db.commit()
+
+
+async def build_match_index(db: AsyncSession) -> MatchIndex:
+    """
+    Encode all verified businesses (the CPU part runs off the event loop).
+
+    The index's feed position stops short of recent entries, which may
+    still have uncommitted neighbours; re-applying them is harmless.
+    """
+    recent = datetime.utcnow() - timedelta(seconds=MATCH_FEED_GAP_SECONDS)
+    change_id = await db.scalar(
+        select(func.max(MatchIndexChange.id)).where(MatchIndexChange.created_at < recent)
+    )
+    result = await db.execute(select(*INDEX_COLUMNS).where(Business.is_verified == True))
+    rows = [tuple(row) for row in result.all()]
+    return await asyncio.to_thread(MatchIndex, rows, change_id or 0)
+
+
+class MatchIndexUpdater:
+    """
+    Owns the process-wide index and keeps it fresh from the change feed.
+
+    Feed ids are assigned before commit, so a poll can see id 12 before
+    id 11 commits; skipped ids are remembered and looked for again for
+    MATCH_FEED_GAP_SECONDS.
+    """
+
+    def __init__(self):
+        self.index: Optional[MatchIndex] = None
+        self._build_lock = asyncio.Lock()
+        self._update_lock = asyncio.Lock()  # One feed reader at a time
+        self._task: Optional[asyncio.Task] = None
+        self._gaps: Dict[int, float] = {}  # Skipped feed id -> when first skipped
+        self._rebuilt_for = 0  # Last rebuild request served; a rebuild rewinds past it
+
+        # Metrics
+        self.fresh_until: Optional[datetime] = None  # Changes made before this are applied
+        self.applied = 0
+        self.rebuilds = 0
+
+    async def get_index(self, db: AsyncSession) -> MatchIndex:
+        if self.index is None:
+            async with self._build_lock:
+                if self.index is None:
+                    await self._rebuild(db)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self.index
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(MATCH_FEED_POLL_SECONDS)
+            try:
+                async with self._update_lock, async_session_maker() as db:
+                    index = self.index
+                    if index.needs_compaction or time.time() - index.built_at > MATCH_INDEX_REBUILD_SECONDS:
+                        await self._rebuild(db)
+                        await self._prune(db)
+                    else:
+                        await self.apply_changes(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Match index update failed: {e}")
+
+    async def catch_up(self, db: AsyncSession) -> MatchIndex:
+        """The index with every feed entry committed so far applied."""
+        await self.get_index(db)
+        async with self._update_lock:
+            while await self.apply_changes(db) == MATCH_FEED_BATCH:
+                pass
+        return self.index
+
+    async def _rebuild(self, db: AsyncSession) -> None:
+        started = datetime.utcnow() - timedelta(seconds=MATCH_FEED_GAP_SECONDS)
+        self.index = await build_match_index(db)
+        self._gaps.clear()
+        self.fresh_until = started
+        self.rebuilds += 1
+
+    async def _prune(self, db: AsyncSession) -> None:
+        await db.execute(
+            delete(MatchIndexChange).where(MatchIndexChange.created_at < datetime.utcnow() - MATCH_FEED_RETENTION)
+        )
+        await db.commit()
+
+    async def apply_changes(self, db: AsyncSession) -> int:
+        """Apply new feed entries to the index. Returns how many."""
+        index = self.index
+        polled_at = datetime.utcnow()
+        now = time.monotonic()
+        self._gaps = {i: t for i, t in self._gaps.items() if now - t < MATCH_FEED_GAP_SECONDS}
+
+        newer = MatchIndexChange.id > index.change_id
+        result = await db.execute(
+            select(MatchIndexChange.id, MatchIndexChange.business_id, MatchIndexChange.created_at)
+            .where(or_(newer, MatchIndexChange.id.in_(list(self._gaps))) if self._gaps else newer)
+            .order_by(MatchIndexChange.id)
+            .limit(MATCH_FEED_BATCH)
+        )
+        changes = result.all()
+        if not changes:
+            self.fresh_until = polled_at
+            return 0
+
+        requests = [change_id for change_id, business_id, _ in changes
+                    if business_id is None and change_id > self._rebuilt_for]
+        if requests:
+            await self._rebuild(db)
+            self._rebuilt_for = max(requests)
+            return len(changes)
+
+        business_ids = {business_id for _, business_id, _ in changes}
+        result = await db.execute(
+            select(*INDEX_COLUMNS, Business.is_verified).where(Business.id.in_(business_ids))
+        )
+        for row in result.all():
+            business_ids.discard(row[0])
+            if row[-1]:
+                index.upsert(tuple(row[:-1]))
+            else:
+                index.remove(row[0])
+        for business_id in business_ids:  # Deleted
+            index.remove(business_id)
+
+        for change_id, _, _ in changes:
+            self._gaps.pop(change_id, None)
+            if change_id > index.change_id:
+                if change_id - index.change_id <= MATCH_FEED_BATCH:
+                    for skipped in range(index.change_id + 1, change_id):
+                        self._gaps.setdefault(skipped, now)
+                index.change_id = change_id
+
+        self.applied += len(changes)
+        self.fresh_until = polled_at if len(changes) < MATCH_FEED_BATCH else changes[-1][2]
+        return len(changes)
+
+    def stats(self) -> Dict[str, Any]:
+        """Index metrics, for the admin metrics endpoint."""
+        if self.index is None:
+            return {"built": False}
+        lag = (datetime.utcnow() - self.fresh_until).total_seconds() if self.fresh_until else None
+        return {
+            "built": True,
+            "businesses": len(self.index),
+            "dead_rows": self.index.dead_rows,
+            "built_at": datetime.utcfromtimestamp(self.index.built_at).isoformat(),
+            "change_id": self.index.change_id,
+            "freshness_lag_seconds": round(max(lag, 0), 3) if lag is not None else None,
+            "changes_applied": self.applied,
+            "rebuilds": self.rebuilds
+        }
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+_updater: Optional[MatchIndexUpdater] = None
+
+
+def get_match_updater() -> MatchIndexUpdater:
+    """Get the process-wide index owner, created on first use."""
+    global _updater
+    if _updater is None:
+        _updater = MatchIndexUpdater()
+    return _updater
+
+
+async def get_match_index(db: AsyncSession) -> MatchIndex:
+    """Get the process-wide index, built on first use and then kept fresh."""
+    return await get_match_updater().get_index(db)
+
+
+async def close_matching() -> None:
+    """Stop the index updater on shutdown."""
+    global _updater
+    if _updater is not None:
+        await _updater.close()
+        _updater = None
+
+
+async def match_b2b(db: AsyncSession, business: Business, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    B2B matchmaking: best verified partners for a business.
+
+    Returns:
+        List of matched businesses with compatibility scores and reasons,
+        best first
+    """
+    index = await get_match_index(db)
+    # Over-fetch a little: businesses unverified since the build are dropped
+    hits = index.match(MatchProfile.from_business(business), limit + 5)
+    if not hits:
+        return []
+
+    result = await db.execute(
+        select(Business).where(
+            Business.id.in_([hit.business_id for hit in hits]),
+            Business.is_verified == True
+        )
+    )
+    businesses = {b.id: b for b in result.scalars().all()}
+
+    matches = []
+    for hit in hits:
+        partner = businesses.get(hit.business_id)
+        if partner is None:
+            continue
+        matches.append({
+            "business_id": encode_id(partner.id),
+            "name": partner.name,
+            "category": partner.category or "",
+            "location": ", ".join(filter(None, [partner.city, partner.province])),
+            "compatibility_score": hit.score,
+            "match_reasons": hit.reasons
+        })
+        if len(matches) == limit:
+            break
+    return matches
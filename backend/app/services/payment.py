@@ -2,34 +2,218 @@
 Uplokal Backend - Midtrans Payment Service
 ============================================
 Integration with Midtrans payment gateway.
+
+Gateway calls go through one pooled async HTTP client with timeouts,
+retries for transient failures and a circuit breaker, so a slow or
+failing gateway never blocks the event loop or piles up requests.
 """
 
+import asyncio
+import random
+import time
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
-import midtransclient
+
+import httpx
 
 from app.config import get_settings
 
 settings = get_settings()
 
+# Snap (checkout) and Core API hosts; MIDTRANS_BASE_URL overrides both,
+# e.g. to point at fake_midtrans.py
+SNAP_URLS = {True: "https://app.midtrans.com", False: "https://app.sandbox.midtrans.com"}
+API_URLS = {True: "https://api.midtrans.com", False: "https://api.sandbox.midtrans.com"}
+
+# Gateway calls: bounded waits on one pooled client
+MIDTRANS_TIMEOUT = httpx.Timeout(10.0, connect=3.0, pool=5.0)
+MIDTRANS_MAX_CONNECTIONS = 50
+
+# Transient failures are retried with backoff: base * 2^attempt, +/-20% jitter
+MIDTRANS_RETRIES = 2
+MIDTRANS_BACKOFF_SECONDS = 0.2
+
+# Responses that mean the gateway did not process the request
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+# After this many consecutive gateway failures, fail fast for a while
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
 
-def _get_snap_client():
-    """Get Midtrans Snap client."""
-    return midtransclient.Snap(
-        is_production=settings.midtrans_is_production,
-        server_key=settings.midtrans_server_key,
-        client_key=settings.midtrans_client_key
-    )
 
+class MidtransError(Exception):
+    """Midtrans rejected a request or could not be reached."""
 
-def _get_core_client():
-    """Get Midtrans Core API client."""
-    return midtransclient.CoreApi(
-        is_production=settings.midtrans_is_production,
-        server_key=settings.midtrans_server_key,
-        client_key=settings.midtrans_client_key
-    )
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Open after `threshold` failures in a row: calls fail immediately for
+    `reset_seconds`, then one trial call decides whether to close again.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if self._trial_running or time.monotonic() - self._opened_at < self.reset_seconds:
+            return False
+        self._trial_running = True
+        return True
+
+    def cancel_trial(self) -> None:
+        """Give up a trial call that never reached the gateway."""
+        self._trial_running = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._trial_running or self._failures >= self.threshold:
+            self._opened_at = time.monotonic()
+        self._trial_running = False
+
+
+class MidtransClient:
+    """
+    Async Midtrans Snap and Core API client on one pooled connection.
+
+    Requests never block the event loop. Connection failures and
+    "not processed" statuses are retried; a read timeout is only retried
+    for reads, since a transaction may already exist at the gateway.
+    """
+
+    def __init__(self, server_key: str, is_production: bool, base_url: Optional[str] = None):
+        self.snap_url = (base_url or SNAP_URLS[is_production]).rstrip("/")
+        self.api_url = (base_url or API_URLS[is_production]).rstrip("/")
+        self.breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+        self._client = httpx.AsyncClient(
+            auth=(server_key, ""),
+            headers={"Accept": "application/json"},
+            limits=httpx.Limits(
+                max_connections=MIDTRANS_MAX_CONNECTIONS,
+                max_keepalive_connections=MIDTRANS_MAX_CONNECTIONS
+            ),
+            timeout=MIDTRANS_TIMEOUT
+        )
+
+    async def create_snap_transaction(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a Snap checkout; returns `token` and `redirect_url`."""
+        return await self._request("POST", f"{self.snap_url}/snap/v1/transactions", json=params)
+
+    async def transaction_status(self, order_id: str) -> Dict[str, Any]:
+        """Current status of a transaction."""
+        return await self._request("GET", f"{self.api_url}/v2/{order_id}/status", idempotent=True)
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        json: Optional[Dict[str, Any]] = None,
+        idempotent: bool = False
+    ) -> Dict[str, Any]:
+        for attempt in range(MIDTRANS_RETRIES + 1):
+            if not self.breaker.allow():
+                raise MidtransError("Payment gateway unavailable, try again later", 503)
+
+            try:
+                response = await self._client.request(method, url, json=json)
+            except httpx.PoolTimeout:
+                # Our own connection limit, not a gateway failure
+                self.breaker.cancel_trial()
+                raise MidtransError("Payment gateway busy, try again later", 503)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                # Never reached the gateway: always safe to retry
+                self.breaker.record_failure()
+                error, retryable = MidtransError(f"Payment gateway unreachable: {e!r}", 503), True
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                error, retryable = MidtransError(f"Payment gateway error: {e!r}", 504), idempotent
+            except BaseException:
+                # Cancelled, or failed some other way: settle a trial call
+                # so the breaker can try again later
+                self.breaker.cancel_trial()
+                raise
+            else:
+                if response.status_code >= 500 or response.status_code == 429:
+                    self.breaker.record_failure()
+                    error = MidtransError(
+                        f"Payment gateway returned {response.status_code}", response.status_code
+                    )
+                    retryable = idempotent or response.status_code in RETRYABLE_STATUS
+                else:
+                    self.breaker.record_success()
+                    return _parse_response(response)
+
+            if not retryable or attempt == MIDTRANS_RETRIES:
+                raise error
+            await asyncio.sleep(MIDTRANS_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.8, 1.2))
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def _parse_response(response: httpx.Response) -> Dict[str, Any]:
+    """JSON body of a gateway response, raising on API errors."""
+    try:
+        body = response.json()
+    except ValueError:
+        raise MidtransError(f"Invalid gateway response ({response.status_code})", response.status_code)
+
+    if response.status_code >= 400:
+        messages = body.get("error_messages") or [body.get("status_message") or "Request rejected"]
+        raise MidtransError(f"Midtrans error {response.status_code}: {'; '.join(messages)}", response.status_code)
+
+    # Core API reports errors in the body (except 407, expired transaction)
+    body_status = str(body.get("status_code", "200"))
+    if body_status.isdigit() and int(body_status) >= 400 and body_status != "407":
+        raise MidtransError(
+            f"Midtrans error {body_status}: {body.get('status_message', 'Request rejected')}",
+            int(body_status)
+        )
+    return body
+
+
+_client: Optional[MidtransClient] = None
+
+
+def get_midtrans_client() -> MidtransClient:
+    """Get the process-wide Midtrans client, created on first use."""
+    global _client
+    if _client is None:
+        _client = MidtransClient(
+            settings.midtrans_server_key or "",
+            settings.midtrans_is_production,
+            settings.midtrans_base_url
+        )
+    return _client
+
+
+async def close_midtrans() -> None:
+    """Close the pooled Midtrans connection on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
 
 
 def generate_order_id() -> str:
@@ -61,7 +245,6 @@ async def create_subscription_transaction(
     Returns:
         Dict with token, redirect_url, and order_id
     """
-    snap = _get_snap_client()
     order_id = generate_order_id()
     
     transaction_params = {
@@ -95,7 +278,7 @@ async def create_subscription_transaction(
     }
     
     try:
-        snap_response = snap.create_transaction(transaction_params)
+        snap_response = await get_midtrans_client().create_snap_transaction(transaction_params)
         return {
             "success": True,
             "token": snap_response.get("token"),
@@ -135,10 +318,8 @@ async def get_transaction_status(order_id: str) -> Dict[str, Any]:
     
     Returns transaction status details.
     """
-    core = _get_core_client()
-    
     try:
-        status = core.transactions.status(order_id)
+        status = await get_midtrans_client().transaction_status(order_id)
         return {
             "success": True,
             "status": status
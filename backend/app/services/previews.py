@@ -0,0 +1,245 @@
+"""
+Uplokal Backend - Document Previews
+====================================
+Small JPEG previews for the document vault, so the UI can show
+thumbnails without downloading whole files: the first page of PDFs,
+downscaled images for photos.
+
+Previews are generated in the background after upload. Jobs go on a
+bounded queue drained by a few worker tasks; rendering runs in a thread
+pool of the same size (Pillow releases the GIL; pdfium is not
+thread-safe, so PDF pages render one at a time), so uploads return
+immediately and preview work never takes more than PREVIEW_WORKERS
+threads. If the queue is full the job is dropped, and queued again the
+first time its preview is requested.
+
+Previews are keyed by content hash, so deduplicated blobs share one,
+and stored encrypted in the same backend as their document.
+"""
+
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Optional, Set
+
+from app.config import get_settings
+from app.services.encryption import (
+    FileEncryptor,
+    is_encrypted_header,
+    decrypt_range,
+    HEADER_SIZE
+)
+from app.services.storage import get_storage
+
+settings = get_settings()
+
+# Longest edge of a preview, in pixels
+PREVIEW_SIZE = 480
+
+PREVIEW_JPEG_QUALITY = 80
+
+PREVIEW_MIME_TYPE = "image/jpeg"
+
+# Pending jobs per process before new ones are dropped
+PREVIEW_QUEUE_SIZE = 256
+
+# Larger sources are not previewed (they are read fully into memory)
+MAX_PREVIEW_SOURCE_BYTES = 50 * 1024 * 1024
+
+PDF_MIME_TYPES = {"application/pdf"}
+IMAGE_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp", "image/tiff"}
+
+
+def is_previewable(mime_type: Optional[str]) -> bool:
+    """Whether documents of this type get a preview."""
+    return mime_type in PDF_MIME_TYPES or mime_type in IMAGE_MIME_TYPES
+
+
+def preview_key(content_hash: str) -> str:
+    """Storage key of the preview for a blob's content."""
+    return f"previews/{content_hash[:2]}/{content_hash}.jpg"
+
+
+@dataclass(frozen=True)
+class PreviewJob:
+    """Everything needed to render one preview, without a DB session."""
+    storage_type: str
+    storage_path: str
+    content_hash: str
+    mime_type: str
+
+
+# =============================================================================
+# RENDERING
+# =============================================================================
+
+# PDFium keeps global state and must not be entered from two threads
+_pdfium_lock = threading.Lock()
+
+
+def _render_pdf(data: bytes):
+    import pypdfium2 as pdfium
+
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(data)
+        try:
+            page = pdf[0]
+            width, height = page.get_size()
+            # Render straight at preview size instead of full resolution
+            bitmap = page.render(scale=PREVIEW_SIZE / max(width, height))
+            # Copied out of the bitmap's buffer, which closes with the document
+            return bitmap.to_pil().copy()
+        finally:
+            pdf.close()
+
+
+def _render_image(data: bytes):
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    # JPEG decoders can downscale while decoding, far cheaper than resizing
+    image.draft("RGB", (PREVIEW_SIZE, PREVIEW_SIZE))
+    return ImageOps.exif_transpose(image)
+
+
+def render_preview(data: bytes, mime_type: str) -> bytes:
+    """
+    Render a JPEG preview of a document's plaintext.
+
+    CPU-bound; run it in a worker thread.
+    """
+    image = _render_pdf(data) if mime_type in PDF_MIME_TYPES else _render_image(data)
+    image.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=PREVIEW_JPEG_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+class PreviewPipeline:
+    """Bounded background queue of preview jobs for one process."""
+
+    def __init__(self, workers: int):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=PREVIEW_QUEUE_SIZE)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preview")
+        self._workers_count = workers
+        self._workers: Set[asyncio.Task] = set()
+        self._pending: Set[str] = set()
+
+    def schedule(self, job: PreviewJob) -> bool:
+        """Queue a job without blocking. Returns False if it was dropped."""
+        if job.content_hash in self._pending:
+            return True
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return False
+
+        self._pending.add(job.content_hash)
+        if not self._workers:
+            for _ in range(self._workers_count):
+                self._workers.add(asyncio.create_task(self._work()))
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self.generate(job)
+            except Exception as e:
+                print(f"Preview generation failed for {job.content_hash}: {e}")
+            finally:
+                self._pending.discard(job.content_hash)
+                self._queue.task_done()
+
+    async def generate(self, job: PreviewJob) -> bool:
+        """
+        Render and store one preview, unless it already exists.
+
+        Returns:
+            True if a preview is stored
+        """
+        storage = get_storage(job.storage_type)
+        key = preview_key(job.content_hash)
+        try:
+            await storage.size(key)
+            return True
+        except FileNotFoundError:
+            pass
+
+        stored_size = await storage.size(job.storage_path)
+        if stored_size > MAX_PREVIEW_SOURCE_BYTES:
+            return False
+
+        header = await storage.read(job.storage_path, 0, HEADER_SIZE - 1)
+        read = partial(storage.get, job.storage_path)
+        if is_encrypted_header(header):
+            chunks = decrypt_range(read, stored_size, header=header)
+        else:
+            chunks = read()
+        data = b"".join([chunk async for chunk in chunks])
+
+        loop = asyncio.get_running_loop()
+        preview = await loop.run_in_executor(self._executor, render_preview, data, job.mime_type)
+
+        encryptor = FileEncryptor()
+
+        async def sealed():
+            yield encryptor.update(preview)
+            yield encryptor.finalize()
+
+        await storage.put(key, sealed())
+        return True
+
+    async def drain(self) -> None:
+        """Wait until every queued job has finished (benchmarks, tests)."""
+        await self._queue.join()
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pipeline: Optional[PreviewPipeline] = None
+
+
+def get_preview_pipeline() -> PreviewPipeline:
+    """Get the process-wide preview pipeline, created on first use."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = PreviewPipeline(settings.preview_workers)
+    return _pipeline
+
+
+def schedule_preview(
+    storage_type: str,
+    storage_path: str,
+    content_hash: Optional[str],
+    mime_type: Optional[str]
+) -> bool:
+    """Queue a preview for a stored document if its type has one."""
+    if not content_hash or not is_previewable(mime_type):
+        return False
+    return get_preview_pipeline().schedule(
+        PreviewJob(storage_type, storage_path, content_hash, mime_type)
+    )
+
+
+async def close_previews() -> None:
+    """Stop preview workers on shutdown."""
+    global _pipeline
+    if _pipeline is not None:
+        await _pipeline.close()
+        _pipeline = None
@@ -0,0 +1,231 @@
+"""
+Uplokal Backend - Request Principal Cache
+==========================================
+Caches the authenticated user (and the id of the business they own) so
+`get_current_user` does not hit the database on every request.
+
+Two tiers:
+- In-process TTL+LRU cache (short TTL)
+- Redis (optional, CACHE_BACKEND=redis), shared by all workers
+
+Entries must be invalidated whenever the user row or their business
+ownership changes (see `invalidate_principal`). Invalidations are
+broadcast on the realtime hub, so with REALTIME_BACKEND=redis every
+worker drops its in-process copy at once.
+
+A deactivated or demoted user must not keep access on another worker,
+so the in-process tier is only used when invalidations reach every
+worker: REALTIME_BACKEND=redis, or a single worker (WEB_CONCURRENCY=1,
+set explicitly). Otherwise users come from the shared Redis tier
+(invalidated centrally) or, without CACHE_BACKEND=redis, from the
+database on every request.
+
+A cached user is an identity, not a full row: columns in
+EXCLUDED_COLUMNS are not in the snapshot. User.password_hash is
+raiseload-deferred, so code that needs it loads the user itself with
+undefer() rather than reading it from `get_current_user`.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from sqlalchemy import DateTime
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.config import get_settings
+from app.models.user import User
+from app.services.cache import TTLCache
+from app.services.pubsub import get_hub
+
+settings = get_settings()
+
+# In-process tier: short TTL bounds staleness across workers
+PRINCIPAL_LOCAL_TTL_SECONDS = 30
+PRINCIPAL_LOCAL_MAXSIZE = 10_000
+
+# Redis tier
+PRINCIPAL_REDIS_TTL_SECONDS = 300
+REDIS_KEY_PREFIX = "uplokal:principal:"
+
+# Realtime hub channel carrying invalidations to every worker
+INVALIDATION_CHANNEL = "principal-invalidations"
+
+# Never cached, so credentials don't end up in Redis
+EXCLUDED_COLUMNS = {"password_hash"}
+
+_local = TTLCache(maxsize=PRINCIPAL_LOCAL_MAXSIZE, ttl=PRINCIPAL_LOCAL_TTL_SECONDS)
+_redis = None
+_listener: Optional[asyncio.Task] = None
+
+
+def _local_enabled() -> bool:
+    """Whether the in-process tier can hear every invalidation."""
+    # An unknown worker count may be many: fail closed
+    return settings.realtime_backend == "redis" or settings.web_concurrency == 1
+
+
+def _get_redis():
+    """Lazily create the Redis client when the Redis tier is enabled."""
+    global _redis
+    if _redis is None and settings.cache_backend == "redis":
+        import redis.asyncio as redis
+
+        _redis = redis.from_url(settings.redis_url)
+    return _redis
+
+
+# =============================================================================
+# SNAPSHOTS
+# =============================================================================
+
+def _cached_columns():
+    return [
+        column for column in User.__table__.columns
+        if column.key not in EXCLUDED_COLUMNS
+    ]
+
+
+def make_snapshot(user: User, business_id: Optional[int]) -> Dict[str, Any]:
+    """Capture a user's column values and owned business id."""
+    snapshot = {column.key: getattr(user, column.key) for column in _cached_columns()}
+    snapshot["business_id"] = business_id
+    return snapshot
+
+
+def user_from_snapshot(snapshot: Dict[str, Any]) -> User:
+    """
+    Rebuild a detached `User` from a snapshot.
+
+    Merge it into the request session with `db.merge(user, load=False)`
+    to get a persistent instance without a query.
+    """
+    user = User(**{column.key: snapshot[column.key] for column in _cached_columns()})
+    make_transient_to_detached(user)
+    return user
+
+
+def _dumps(snapshot: Dict[str, Any]) -> str:
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime)
+        else value.value if isinstance(value, Enum)
+        else value
+        for key, value in snapshot.items()
+    })
+
+
+def _loads(raw: str) -> Dict[str, Any]:
+    snapshot = json.loads(raw)
+    for column in _cached_columns():
+        value = snapshot.get(column.key)
+        if value is None:
+            continue
+        if isinstance(column.type, DateTime):
+            snapshot[column.key] = datetime.fromisoformat(value)
+        elif getattr(column.type, "enum_class", None) is not None:
+            snapshot[column.key] = column.type.enum_class(value)
+    return snapshot
+
+
+# =============================================================================
+# CACHE OPERATIONS
+# =============================================================================
+
+async def _listen_for_invalidations() -> None:
+    """Drop in-process entries invalidated by any worker."""
+    hub = get_hub()
+    subscription = await hub.subscribe(INVALIDATION_CHANNEL)
+    try:
+        while True:
+            event = await subscription.get()
+            if event is None:
+                continue
+            if event.get("type") == "invalidate":
+                _local.delete(event["user_id"])
+            else:
+                # Missed invalidations (resync): start over
+                _local.clear()
+    finally:
+        await hub.unsubscribe(subscription)
+
+
+def _start_listener() -> None:
+    global _listener
+    if settings.realtime_backend == "redis" and (_listener is None or _listener.done()):
+        _listener = asyncio.create_task(_listen_for_invalidations())
+
+
+async def get_principal(user_id: int) -> Optional[Dict[str, Any]]:
+    """Get a cached principal snapshot, or None on a miss."""
+    local = _local_enabled()
+    if local:
+        _start_listener()
+        snapshot = _local.get(user_id)
+        if snapshot is not None:
+            return snapshot
+
+    redis = _get_redis()
+    if redis is None:
+        return None
+
+    try:
+        raw = await redis.get(f"{REDIS_KEY_PREFIX}{user_id}")
+    except Exception:
+        # Redis is only a cache; fall back to the database
+        return None
+    if raw is None:
+        return None
+
+    snapshot = _loads(raw)
+    if local:
+        _local.set(user_id, snapshot)
+    return snapshot
+
+
+async def set_principal(user_id: int, snapshot: Dict[str, Any]) -> None:
+    """Store a principal snapshot in every tier."""
+    if _local_enabled():
+        _local.set(user_id, snapshot)
+
+    redis = _get_redis()
+    if redis is not None:
+        try:
+            await redis.set(f"{REDIS_KEY_PREFIX}{user_id}", _dumps(snapshot), ex=PRINCIPAL_REDIS_TTL_SECONDS)
+        except Exception:
+            pass
+
+
+async def invalidate_principal(user_id: int) -> None:
+    """
+    Drop a cached principal.
+
+    Call after changing a user's row (role, active flag, profile) or
+    their business ownership. Other workers are told through the hub.
+    """
+    _local.delete(user_id)
+
+    redis = _get_redis()
+    if redis is not None:
+        try:
+            await redis.delete(f"{REDIS_KEY_PREFIX}{user_id}")
+        except Exception:
+            pass
+
+    if settings.realtime_backend == "redis":
+        try:
+            await get_hub().publish(INVALIDATION_CHANNEL, {"type": "invalidate", "user_id": user_id})
+        except Exception as e:
+            print(f"Principal invalidation broadcast failed: {e}")
+
+
+async def close_principal_cache() -> None:
+    """Stop the invalidation listener and close Redis on shutdown."""
+    global _listener, _redis
+    if _listener is not None:
+        _listener.cancel()
+        _listener = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -0,0 +1,158 @@
+"""
+Uplokal Backend - Realtime Pub/Sub Hub
+=======================================
+Fan-out of realtime events (new messages, read receipts) to connected
+clients.
+
+The hub is in-process by default. Set REALTIME_BACKEND=redis to relay
+events through Redis (settings.redis_url) so every worker sees every
+event.
+
+Each subscriber gets a bounded queue. If a client cannot keep up, its
+backlog is dropped and replaced by a single {"type": "resync"} event,
+telling the client to refetch over REST. A slow client never blocks
+publishers or other subscribers.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional, Set
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Events buffered per connection before it is asked to resync
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Redis channel prefix, so realtime events don't collide with other keys
+REDIS_CHANNEL_PREFIX = "uplokal:realtime:"
+
+
+def business_channel(business_id: int) -> str:
+    """Channel carrying events for one business."""
+    return f"business:{business_id}"
+
+
+class Subscription:
+    """A single connection's view of one channel."""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Queue an event without blocking; resync on overflow."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for the next event, or return None after `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessHub:
+    """Pub/sub hub for a single worker process."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    async def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(channel)
+        self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.channel)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.channel]
+
+    async def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        self._fan_out(channel, event)
+
+    def _fan_out(self, channel: str, event: Dict[str, Any]) -> None:
+        for subscription in list(self._subscribers.get(channel, ())):
+            subscription.deliver(event)
+
+    async def close(self) -> None:
+        self._subscribers.clear()
+
+
+class RedisHub(InProcessHub):
+    """
+    Pub/sub hub relayed through Redis.
+
+    Publishes go to Redis; one listener task per process receives
+    them and fans out to local subscribers.
+    """
+
+    def __init__(self, redis_url: str):
+        super().__init__()
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(redis_url)
+        self._listener: Optional[asyncio.Task] = None
+
+    async def subscribe(self, channel: str) -> Subscription:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return await super().subscribe(channel)
+
+    async def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        await self._redis.publish(REDIS_CHANNEL_PREFIX + channel, json.dumps(event, default=str))
+
+    async def _listen(self) -> None:
+        pubsub = self._redis.pubsub()
+        await pubsub.psubscribe(REDIS_CHANNEL_PREFIX + "*")
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "pmessage":
+                    continue
+                # One bad message must not stop delivery for the whole process
+                try:
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    self._fan_out(channel[len(REDIS_CHANNEL_PREFIX):], json.loads(message["data"]))
+                except Exception as e:
+                    print(f"Dropped realtime message on {message.get('channel')!r}: {e}")
+        finally:
+            await pubsub.aclose()
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        await self._redis.aclose()
+        await super().close()
+
+
+_hub: Optional[InProcessHub] = None
+
+
+def get_hub() -> InProcessHub:
+    """Get the process-wide hub, created on first use."""
+    global _hub
+    if _hub is None:
+        if settings.realtime_backend == "redis":
+            _hub = RedisHub(settings.redis_url)
+        else:
+            _hub = InProcessHub()
+    return _hub
+
+
+async def close_hub() -> None:
+    """Close the hub on shutdown."""
+    global _hub
+    if _hub is not None:
+        await _hub.close()
+        _hub = None
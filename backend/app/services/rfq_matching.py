@@ -0,0 +1,564 @@
+"""
+Uplokal Backend - RFQ Supplier Matching
+========================================
+Per-business feeds of suggested RFQs, materialized in `rfq_matches`.
+
+The feed is kept current incrementally instead of being computed on
+read:
+
+- Publishing an RFQ enqueues an `rfq.match` job that adds it to the
+  feeds of its best RFQ_MATCH_LIMIT suppliers.
+- A profile change that affects matching (app/services/matching.py
+  `record_match_change`) enqueues `rfq.refresh_suggestions`, which
+  rescores that business against the open RFQs.
+- An RFQ leaving OPEN is removed from every feed in the same
+  transaction; the worker's sweeper also prunes entries of closed or
+  expired (past `deadline`) RFQs.
+
+Jobs take other queued jobs of their kind (up to RFQ_MATCH_BATCH /
+SUGGESTION_REFRESH_BATCH) and score the whole burst at once against a
+MatchIndex: one (RFQs x suppliers) score matrix per category instead of
+a query per RFQ. Reading a feed is one indexed, keyset-paged query.
+
+A supplier's fit is a weighted sum of per-feature scores in [0, 1]:
+
+- category        the RFQ's category (suppliers in other categories are not eligible)
+- specifications  certifications named in the specifications that the supplier holds
+- origin          supplier's province among the preferred origins
+- delivery        nearness to a domestic delivery location, or exports
+                  to the delivery country
+- budget          order value against the supplier's size band
+- diagnostic      supplier's diagnostic health scores
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.business import Business
+from app.models.rfq import RFQ, RFQMatch, RFQStatus
+from app.services.encryption import encode_id
+from app.services.matching import (
+    LOCATION_HALF_DISTANCE_KM,
+    PROVINCE_CENTROIDS,
+    SIZE_BANDS,
+    MatchHit,
+    MatchIndex,
+    get_match_index,
+    get_match_updater,
+    normalize_name,
+    normalize_names,
+    normalize_province,
+)
+from app.utils.pagination import encode_cursor, decode_cursor
+
+# Feature weights (sum to 1)
+RFQ_WEIGHTS = {
+    "category": 0.30,
+    "specifications": 0.20,
+    "origin": 0.10,
+    "delivery": 0.15,
+    "budget": 0.10,
+    "diagnostic": 0.15,
+}
+
+# Suppliers matched to a newly published RFQ, and the lowest score
+# (0-100) worth a feed entry
+RFQ_MATCH_LIMIT = 50
+RFQ_MATCH_MIN_SCORE = 40
+
+# Feed entries kept per business when its profile changes
+SUGGESTIONS_PER_BUSINESS = 100
+
+# Most RFQs matched, or businesses refreshed, by one job
+RFQ_MATCH_BATCH = 64
+SUGGESTION_REFRESH_BATCH = 200
+
+# Most closed or expired RFQs swept out of the feeds per sweep
+SWEEP_BATCH = 500
+
+# Score matrix size limit (RFQs x suppliers) per vectorized pass
+SCORE_CELLS = 2_000_000
+
+# Rough USD rates, only for sizing an order against supplier bands
+BUDGET_USD_RATES = {
+    "USD": 1.0,
+    "IDR": 1 / 16000,
+    "EUR": 1.08,
+    "GBP": 1.27,
+    "SGD": 0.74,
+    "MYR": 0.21,
+    "AUD": 0.65,
+    "JPY": 0.0067,
+    "CNY": 0.14,
+}
+
+# Order value (USD) band lower bounds, aligned with the supplier size bands
+ORDER_VALUE_BANDS = (10_000, 50_000, 250_000)
+
+INDONESIA = {"indonesia", "id", "idn", "ri"}
+
+# Specification keys whose values list required certifications
+CERTIFICATION_KEYS = {"certification", "certifications", "sertifikasi", "sertifikat"}
+
+
+# =============================================================================
+# RFQ ENCODING
+# =============================================================================
+
+def _words(value: str) -> str:
+    """Lowercase alphanumeric words, space-padded for whole-word search."""
+    return f" {' '.join(re.findall(r'[0-9a-z]+', value.lower()))} "
+
+
+def _spec_strings(value: Any) -> List[str]:
+    """All keys and values of a specifications JSON, as strings."""
+    if isinstance(value, dict):
+        return [s for k, v in value.items() for s in [str(k), *_spec_strings(v)]]
+    if isinstance(value, list):
+        return [s for item in value for s in _spec_strings(item)]
+    return [str(value)] if value is not None else []
+
+
+def order_band(budget_min, budget_max, currency: Optional[str]) -> int:
+    """Order value band 0-3 (like supplier size bands), or -1 if unknown."""
+    value = budget_max or budget_min
+    rate = BUDGET_USD_RATES.get((currency or "USD").upper())
+    if not value or rate is None:
+        return -1
+    return sum(float(value) * rate >= bound for bound in ORDER_VALUE_BANDS)
+
+
+@dataclass
+class RFQProfile:
+    """An RFQ encoded for supplier matching."""
+    rfq_id: int
+    buyer_id: int  # The RFQ's own business is never matched
+    category: Optional[str]
+    certifications: Dict[str, str] = field(default_factory=dict)  # Named under a certification key
+    spec_text: str = " "
+    origin_provinces: Set[str] = field(default_factory=set)
+    origin_indonesia: bool = False
+    origin_foreign_only: bool = False  # Only other countries preferred: no supplier fits
+    delivery: List[str] = field(default_factory=list)  # Location parts, most specific first
+    order_band: int = -1
+
+    @classmethod
+    def from_rfq(cls, rfq: RFQ) -> "RFQProfile":
+        specs = rfq.specifications or {}
+        certifications: Dict[str, str] = {}
+        if isinstance(specs, dict):
+            for key, value in specs.items():
+                if normalize_name(key) in CERTIFICATION_KEYS:
+                    certifications.update(normalize_names(value if isinstance(value, list) else [value]))
+
+        origins = normalize_names(rfq.origin_countries)
+        provinces = {p for p in map(normalize_province, origins) if p in PROVINCE_CENTROIDS}
+        indonesia = any(o in INDONESIA for o in origins)
+
+        return cls(
+            rfq_id=rfq.id,
+            buyer_id=rfq.business_id,
+            category=normalize_name(rfq.category),
+            certifications=certifications,
+            spec_text=_words(" ".join(_spec_strings(specs))),
+            origin_provinces=provinces,
+            origin_indonesia=indonesia,
+            origin_foreign_only=bool(origins) and not provinces and not indonesia,
+            delivery=[p for p in map(normalize_name, (rfq.delivery_location or "").split(",")) if p],
+            order_band=order_band(rfq.budget_min, rfq.budget_max, rfq.currency)
+        )
+
+
+@dataclass
+class _Delivery:
+    """A delivery location resolved against an index's vocabularies."""
+    province: int = -1
+    city: int = -1
+    country: int = -1
+    foreign: bool = False
+
+
+def _resolve_delivery(index: MatchIndex, parts: List[str]) -> _Delivery:
+    if not parts:
+        return _Delivery()
+    for part in reversed(parts):
+        province = normalize_province(part)
+        if province in PROVINCE_CENTROIDS:
+            return _Delivery(province=index.provinces.get(province), city=index.cities.get(parts[0]))
+    if any(part in INDONESIA for part in parts):
+        return _Delivery(city=index.cities.get(parts[0]))
+    country = index.countries.get(parts[-1])
+    if country >= 0:
+        return _Delivery(country=country, foreign=True)
+    city = index.cities.get(parts[0])
+    if city >= 0:
+        return _Delivery(city=city)
+    # Unknown place: abroad if it names a country ("Hamburg, Germany")
+    return _Delivery(foreign=len(parts) > 1)
+
+
+def _requested_certifications(index: MatchIndex, profile: RFQProfile) -> Dict[str, int]:
+    """Certifications an RFQ asks for -> index code (-1 if nobody holds it)."""
+    requested = {key: index.certifications.get(key) for key in profile.certifications}
+    for key, code in index.certifications.codes.items():
+        if key not in requested and _words(key) in profile.spec_text:
+            requested[key] = code
+    return requested
+
+
+# =============================================================================
+# SCORING
+# =============================================================================
+
+def score_rfqs(
+    index: MatchIndex,
+    profiles: Sequence[RFQProfile],
+    limit: int = RFQ_MATCH_LIMIT,
+    only: Optional[Sequence[int]] = None
+) -> List[List[MatchHit]]:
+    """
+    Best suppliers for each RFQ, best first; `only` limits the suppliers
+    to some index rows.
+
+    RFQs are grouped by category and each group is scored against its
+    suppliers as one matrix (split to keep it under SCORE_CELLS).
+    """
+    hits: List[List[MatchHit]] = [[] for _ in profiles]
+    groups: Dict[Optional[str], List[int]] = {}
+    for i, profile in enumerate(profiles):
+        if not profile.origin_foreign_only:
+            groups.setdefault(profile.category, []).append(i)
+
+    for category, members in groups.items():
+        rows = index.live_rows(category)
+        if only is not None:
+            rows = np.intersect1d(rows, only)
+        if not len(rows):
+            continue
+        step = max(1, SCORE_CELLS // len(rows))
+        for start in range(0, len(members), step):
+            chunk = members[start:start + step]
+            for i, chunk_hits in zip(chunk, _score_group(index, [profiles[i] for i in chunk], rows, limit)):
+                hits[i] = chunk_hits
+    return hits
+
+
+def _score_group(index: MatchIndex, profiles: List[RFQProfile], rows: np.ndarray, limit: int) -> List[List[MatchHit]]:
+    """
+    Score RFQs of one category against its supplier rows as (R, N) matrices.
+
+    Features that depend on a small code (province, size band) are
+    scored per code first, then gathered for every supplier.
+    """
+    r, n = len(profiles), len(rows)
+    province = index.province[rows] + 1  # 0 = unknown
+    provinces = len(index.provinces)
+    parts: Dict[str, np.ndarray] = {}
+
+    parts["category"] = np.full((1, 1), 1.0 if profiles[0].category else 0.0, dtype=np.float32)
+
+    # Specifications: share of the requested certifications held
+    requested = [_requested_certifications(index, p) for p in profiles]
+    held = np.minimum(index.cert_count[rows] / 3, 1).astype(np.float32)[None, :]
+    asking = [i for i, certs in enumerate(requested) if certs]
+    if asking:
+        wanted = np.zeros((len(asking), len(index.certifications)), dtype=np.float32)
+        counts = np.zeros((len(asking), 1), dtype=np.float32)
+        for j, i in enumerate(asking):
+            wanted[j, [c for c in requested[i].values() if c >= 0]] = 1
+            counts[j] = len(requested[i])
+        shared = wanted @ index.cert_matrix[rows, :wanted.shape[1]].T.astype(np.float32)
+        specifications = np.repeat(held, r, axis=0)
+        specifications[asking] = 0.25 * held + 0.75 * shared / counts
+        parts["specifications"] = specifications
+    else:
+        parts["specifications"] = held
+
+    # Origin: preferred provinces first, then anywhere in Indonesia
+    origin = np.empty((r, provinces + 1), dtype=np.float32)
+    for i, p in enumerate(profiles):
+        if p.origin_provinces:
+            origin[i] = 0.6 if p.origin_indonesia else 0.3
+            origin[i, [index.provinces.get(name) + 1 for name in p.origin_provinces]] = 1.0
+        else:
+            origin[i] = 1.0 if p.origin_indonesia else 0.5
+    parts["origin"] = origin[:, province]
+
+    # Delivery: distance to a domestic destination, or exports to a foreign one
+    targets = [_resolve_delivery(index, p.delivery) for p in profiles]
+    nearness = np.full((r, provinces + 1), 0.5, dtype=np.float32)
+    for i, t in enumerate(targets):
+        if t.province >= 0:
+            distance = np.nan_to_num(index.distance_km[t.province], nan=np.inf)
+            nearness[i, 1:] = 0.7 * np.exp2(-distance / LOCATION_HALF_DISTANCE_KM)
+            nearness[i, 1 + t.province] = 0.8
+            nearness[i, 0] = 0.2
+    delivery = nearness[:, province]
+    exporter = np.where(index.export_ready[rows], np.float32(0.6), np.float32(0.1))
+    for i, t in enumerate(targets):
+        if t.foreign:
+            delivery[i] = exporter if t.country < 0 else np.where(index.country_matrix[rows, t.country], 1.0, exporter)
+        elif t.city >= 0:
+            delivery[i, index.city[rows] == t.city] = 1.0
+    parts["delivery"] = delivery
+
+    # Budget: suppliers too small for the order score lower than larger ones
+    fit = np.full((r, len(SIZE_BANDS) + 1), 0.5, dtype=np.float32)
+    bands = np.arange(len(SIZE_BANDS))
+    for i, p in enumerate(profiles):
+        if p.order_band >= 0:
+            gap = p.order_band - bands
+            fit[i, 1:] = np.where(gap > 0, 1 - gap / 3, 1 + gap / 6)
+    parts["budget"] = fit[:, index.size_band[rows] + 1]
+
+    parts["diagnostic"] = index.diagnostic[rows][None, :]
+
+    total = np.zeros((r, n), dtype=np.float32)
+    for name, weight in RFQ_WEIGHTS.items():
+        total += np.float32(weight) * parts[name]
+    buyers = np.array([[p.buyer_id] for p in profiles])
+    total[index.business_ids[rows][None, :] == buyers] = -1
+
+    # Top `limit` per RFQ
+    k = min(limit, n)
+    top = np.argpartition(-total, k - 1, axis=1)[:, :k] if n > k else np.tile(np.arange(n), (r, 1))
+    order = np.argsort(-np.take_along_axis(total, top, axis=1), axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    picked = np.arange(r)[:, None], top
+    scores = np.rint(total[picked] * 100).astype(int)
+    values = {name: np.broadcast_to(matrix, (r, n))[picked].tolist() for name, matrix in parts.items()}
+
+    results = []
+    for i, profile in enumerate(profiles):
+        hits = []
+        for j in range(k):
+            if scores[i, j] < RFQ_MATCH_MIN_SCORE:
+                break
+            row = int(rows[top[i, j]])
+            hits.append(MatchHit(
+                business_id=int(index.business_ids[row]),
+                score=int(scores[i, j]),
+                reasons=_reasons(index, profile, requested[i], targets[i], row,
+                                 {name: v[i][j] for name, v in values.items()})
+            ))
+        results.append(hits)
+    return results
+
+
+def _reasons(
+    index: MatchIndex,
+    profile: RFQProfile,
+    requested: Dict[str, int],
+    target: _Delivery,
+    row: int,
+    parts: Dict[str, float]
+) -> List[str]:
+    reasons = []
+    if parts["category"] >= 1:
+        reasons.append("Kategori sesuai permintaan")
+    held = [index.certifications.names[c] for c in requested.values() if c >= 0 and index.cert_matrix[row, c]]
+    if held:
+        reasons.append(f"Memiliki sertifikasi yang diminta: {', '.join(held[:3])}")
+    if profile.origin_provinces and parts["origin"] >= 1:
+        reasons.append("Berasal dari daerah yang diminta")
+    if target.foreign:
+        if target.country >= 0 and index.country_matrix[row, target.country]:
+            reasons.append(f"Berpengalaman ekspor ke {index.countries.names[target.country]}")
+        elif index.export_ready[row]:
+            reasons.append("Siap ekspor")
+    elif parts["delivery"] >= 1:
+        reasons.append("Berada di kota tujuan pengiriman")
+    elif parts["delivery"] >= 0.8:
+        reasons.append("Berada di provinsi tujuan pengiriman")
+    elif parts["delivery"] >= 0.35 and target.province >= 0:
+        reasons.append("Dekat dengan lokasi pengiriman")
+    if parts["budget"] >= 1 and profile.order_band >= 0:
+        reasons.append("Skala usaha sesuai nilai pesanan")
+    if parts["diagnostic"] >= 0.75:
+        reasons.append("Skor kesehatan bisnis tinggi")
+    return reasons
+
+
+# =============================================================================
+# SUGGESTION FEED
+# =============================================================================
+
+async def _store_matches(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """
+    Write feed entries, replacing any already there for the same pair.
+
+    `match_rfqs` and `refresh_business_suggestions` can run at once (an
+    RFQ published while a supplier is refreshed) and store the same
+    (rfq_id, business_id); an upsert keeps them from failing each other.
+    """
+    stmt = insert(RFQMatch)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[RFQMatch.rfq_id, RFQMatch.business_id],
+            set_={
+                "score": stmt.excluded.score,
+                "reasons": stmt.excluded.reasons,
+                "created_at": stmt.excluded.created_at,
+            }
+        ),
+        rows
+    )
+
+
+async def match_rfqs(db: AsyncSession, rfq_ids: Sequence[int]) -> int:
+    """
+    Replace the feed entries of these RFQs (if still open) with their
+    best suppliers.
+
+    Does not commit. Returns how many entries were stored.
+    """
+    await db.execute(delete(RFQMatch).where(RFQMatch.rfq_id.in_(rfq_ids)))
+    result = await db.execute(select(RFQ).where(RFQ.id.in_(rfq_ids), *_live_rfq_filters()))
+    rfqs = result.scalars().all()
+    if not rfqs:
+        return 0
+
+    index = await get_match_index(db)
+    hits = score_rfqs(index, [RFQProfile.from_rfq(rfq) for rfq in rfqs])
+    rows = [
+        {"rfq_id": rfq.id, "business_id": hit.business_id, "score": hit.score, "reasons": hit.reasons}
+        for rfq, rfq_hits in zip(rfqs, hits)
+        for hit in rfq_hits
+    ]
+    if rows:
+        await _store_matches(db, rows)
+    return len(rows)
+
+
+async def refresh_business_suggestions(db: AsyncSession, business_ids: Sequence[int]) -> int:
+    """
+    Recompute the feeds of businesses whose profiles changed.
+
+    The match index first catches up with the change feed, so it holds
+    the new profiles. Their rows are then scored against the open RFQs
+    in their categories, keeping each business's best
+    SUGGESTIONS_PER_BUSINESS. Unverified or deleted businesses just lose
+    their feed. Does not commit. Returns how many entries were stored.
+    """
+    await db.execute(delete(RFQMatch).where(RFQMatch.business_id.in_(business_ids)))
+    index = await get_match_updater().catch_up(db)
+    positions = [index.position[b] for b in business_ids if b in index.position]
+    if not positions:
+        return 0
+
+    categories = {normalize_name(index.categories.names[c]) for c in index.category[positions] if c >= 0}
+    category = _normalized_name_sql(RFQ.category)
+    result = await db.execute(
+        select(RFQ).where(
+            *_live_rfq_filters(),
+            or_(RFQ.category.is_(None), category == "", category.in_(categories))
+        )
+    )
+    rfqs = result.scalars().all()
+    if not rfqs:
+        return 0
+
+    feeds: Dict[int, List[Dict[str, Any]]] = {}
+    profiles = [RFQProfile.from_rfq(rfq) for rfq in rfqs]
+    for rfq, hits in zip(rfqs, score_rfqs(index, profiles, limit=len(positions), only=positions)):
+        for hit in hits:
+            feeds.setdefault(hit.business_id, []).append(
+                {"rfq_id": rfq.id, "business_id": hit.business_id, "score": hit.score, "reasons": hit.reasons}
+            )
+    rows = [
+        row
+        for feed in feeds.values()
+        for row in sorted(feed, key=lambda r: r["score"], reverse=True)[:SUGGESTIONS_PER_BUSINESS]
+    ]
+    if rows:
+        await _store_matches(db, rows)
+    return len(rows)
+
+
+async def remove_rfq_suggestions(db: AsyncSession, rfq_id: int) -> None:
+    """Take an RFQ that is no longer open out of every feed. Does not commit."""
+    await db.execute(delete(RFQMatch).where(RFQMatch.rfq_id == rfq_id))
+
+
+async def prune_stale_suggestions(db: AsyncSession) -> int:
+    """
+    Delete feed entries of closed or expired RFQs and commit.
+
+    Works through at most SWEEP_BATCH RFQs per call. Returns how many
+    entries were deleted.
+    """
+    stale = (
+        select(RFQMatch.rfq_id)
+        .join(RFQ, RFQ.id == RFQMatch.rfq_id)
+        .where(or_(RFQ.status != RFQStatus.OPEN, RFQ.deadline <= datetime.utcnow()))
+        .distinct()
+        .limit(SWEEP_BATCH)
+    )
+    result = await db.execute(delete(RFQMatch).where(RFQMatch.rfq_id.in_(stale.scalar_subquery())))
+    await db.commit()
+    return result.rowcount
+
+
+def _normalized_name_sql(column: Any) -> Any:
+    """`normalize_name` in SQL (lowercased, whitespace collapsed, trimmed); '' for a blank name."""
+    return func.lower(func.btrim(func.regexp_replace(column, r"\s+", " ", "g")))
+
+
+def _live_rfq_filters() -> List[Any]:
+    """RFQs that belong in feeds: open, and not past their deadline."""
+    return [RFQ.status == RFQStatus.OPEN, or_(RFQ.deadline.is_(None), RFQ.deadline > datetime.utcnow())]
+
+
+async def generate_rfq_suggestions(
+    db: AsyncSession,
+    business: Business,
+    limit: int = 10,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    A page of the open RFQs suggested to a business, best match first.
+
+    One indexed read of the business's feed, keyset-paged on
+    (score, rfq_id).
+
+    Returns:
+        The page, and the cursor for the next one (None on the last page)
+    """
+    query = (
+        select(RFQMatch.score, RFQMatch.reasons, RFQ, Business.name)
+        .join(RFQ, RFQ.id == RFQMatch.rfq_id)
+        .join(Business, Business.id == RFQ.business_id)
+        .where(RFQMatch.business_id == business.id, *_live_rfq_filters())
+        .order_by(RFQMatch.score.desc(), RFQMatch.rfq_id.desc())
+        .limit(limit)
+    )
+    if cursor:
+        score, rfq_id = decode_cursor(cursor, 2)
+        query = query.where(tuple_(RFQMatch.score, RFQMatch.rfq_id) < tuple_(score, rfq_id))
+
+    rows = (await db.execute(query)).all()
+    suggestions = [
+        {
+            "rfq_id": encode_id(rfq.id),
+            "title": rfq.title,
+            "buyer": buyer,
+            "quantity": " ".join(filter(None, [rfq.quantity, rfq.unit])) or None,
+            "budget_range": f"${rfq.budget_min:,.0f} - ${rfq.budget_max:,.0f}" if rfq.budget_min and rfq.budget_max else None,
+            "match_score": score,
+            "match_reasons": reasons or [],
+            "deadline": rfq.deadline.date().isoformat() if rfq.deadline else None
+        }
+        for score, reasons, rfq, buyer in rows
+    ]
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1][0], rows[-1][2].id)
+    return suggestions, next_cursor
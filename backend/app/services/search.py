@@ -0,0 +1,82 @@
+"""
+Uplokal Backend - Directory Search Service
+===========================================
+Full-text business search with relevance ranking.
+
+On PostgreSQL this uses the `search_vector` tsvector column (GIN indexed)
+for prefix matching and pg_trgm word similarity on the business name for
+typo tolerance. Other databases (e.g. SQLite in development) fall back
+to plain ILIKE matching without ranking.
+"""
+
+import re
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import func, literal, literal_column, or_
+
+from app.models.business import Business
+
+# Text search configuration. 'simple' does no stemming, which suits mixed
+# Indonesian/English product names better than the English stemmer.
+SEARCH_CONFIG = "simple"
+
+# Maximum number of query terms used to build the tsquery
+MAX_SEARCH_TERMS = 8
+
+# How much the diagnostic health score (0-100) adds to text relevance
+HEALTH_SCORE_WEIGHT = 0.1
+
+_search_vector = literal_column("businesses.search_vector")
+_search_config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+
+
+def build_prefix_query(search: str) -> Optional[str]:
+    """
+    Turn free text into a prefix tsquery string.
+
+    Example: 'keripik pis' → 'keripik:* & pis:*'
+
+    Only word characters are kept, so the result is always a valid
+    tsquery. Returns None if nothing searchable remains.
+    """
+    terms = re.findall(r"\w+", search.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def business_search(search: str, dialect_name: str) -> Tuple[Any, Optional[Any]]:
+    """
+    Build the directory search filter and relevance expression.
+
+    Args:
+        search: Sanitized search text
+        dialect_name: Database dialect of the current session
+
+    Returns:
+        (filter, relevance) — relevance is None when ranking is unavailable
+    """
+    if dialect_name != "postgresql":
+        search_term = f"%{search}%"
+        return or_(
+            Business.name.ilike(search_term),
+            Business.description.ilike(search_term),
+            Business.tagline.ilike(search_term)
+        ), None
+
+    prefix_query = build_prefix_query(search) or ""
+    tsquery = func.to_tsquery(_search_config, prefix_query)
+    search_text = literal(search)
+
+    # Typo tolerance: `<%` is true when word_similarity() passes
+    # pg_trgm.word_similarity_threshold (0.6 by default)
+    search_filter = or_(
+        _search_vector.op("@@")(tsquery),
+        search_text.op("<%")(Business.name)
+    )
+    relevance = (
+        func.ts_rank_cd(_search_vector, tsquery)
+        + func.word_similarity(search_text, Business.name)
+        + HEALTH_SCORE_WEIGHT * func.coalesce(Business.health_score, 0) / 100.0
+    )
+    return search_filter, relevance
@@ -0,0 +1,485 @@
+"""
+Uplokal Backend - Storage Backends
+===================================
+Async object storage for the document vault, behind one interface:
+
+- LocalStorage: files under settings.storage_path (development, tests)
+- S3Storage: AWS S3 or any S3-compatible store (MinIO, R2) via boto3
+- SupabaseStorage: Supabase Storage REST API via httpx
+
+All backends stream: `put` consumes an async iterator of chunks and
+`get` yields chunks of an optional byte range, so memory never scales
+with object size. Clients are created once per process and pooled.
+
+Remote backends can also presign uploads, so clients send document
+bytes straight to the bucket instead of through the API.
+
+Objects are addressed by key (e.g. "blobs/3f/3fa4..."); each stored row
+records its backend name in `storage_type` so older objects stay
+readable after STORAGE_BACKEND changes.
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional
+
+import aiofiles
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Bytes per read when streaming objects out
+READ_CHUNK_SIZE = 64 * 1024
+
+# S3 multipart: objects larger than one part are uploaded in parts
+# (S3 requires parts of at least 5 MiB, except the last)
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+# Connections kept per backend client
+MAX_POOL_CONNECTIONS = 20
+
+
+@dataclass
+class PresignedUpload:
+    """Where and how a client uploads an object directly to storage."""
+    url: str
+    method: str = "PUT"
+    headers: Dict[str, str] = field(default_factory=dict)  # Must be sent as-is
+
+
+class StorageBackend:
+    """Interface for async object storage."""
+
+    name = ""
+
+    async def put(self, key: str, chunks: AsyncIterator[bytes]) -> int:
+        """
+        Store an object from a stream of chunks.
+
+        If `chunks` raises, nothing is left behind under `key`.
+
+        Returns:
+            Number of bytes stored
+        """
+        raise NotImplementedError
+
+    def get(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream bytes [start, end] (inclusive) of an object; `end=None` reads to the end."""
+        raise NotImplementedError
+
+    async def read(self, key: str, start: int, end: int) -> bytes:
+        """Read a small byte range into memory."""
+        return b"".join([chunk async for chunk in self.get(key, start, end)])
+
+    async def size(self, key: str) -> int:
+        """
+        Size of an object in bytes.
+
+        Raises:
+            FileNotFoundError if the object does not exist
+        """
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        """Delete an object; missing objects are ignored."""
+        raise NotImplementedError
+
+    async def presign_upload(
+        self,
+        key: str,
+        size: int,
+        sha256: str,
+        expires_in: int
+    ) -> Optional[PresignedUpload]:
+        """
+        URL a client can upload exactly this content to, bypassing the API.
+
+        Returns None if the backend has no direct uploads (the API's own
+        upload endpoint is used instead).
+        """
+        return None
+
+    async def verify_upload(self, key: str, size: int, sha256: str) -> bool:
+        """
+        Check a directly uploaded object has this size and SHA-256 (hex).
+
+        The default streams the object and hashes it; backends that
+        verify checksums on write answer from metadata instead.
+
+        Raises:
+            FileNotFoundError if nothing was uploaded
+        """
+        if await self.size(key) != size:
+            return False
+        digest = hashlib.sha256()
+        async for chunk in self.get(key):
+            digest.update(chunk)
+        return digest.hexdigest() == sha256
+
+    async def close(self) -> None:
+        """Release pooled connections."""
+
+
+# =============================================================================
+# LOCAL DISK
+# =============================================================================
+
+class LocalStorage(StorageBackend):
+    """Objects as files under a root directory."""
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # Rows stored before the storage layer hold absolute paths
+        if os.path.isabs(key):
+            return key
+        return os.path.join(self.root, key)
+
+    async def put(self, key: str, chunks: AsyncIterator[bytes]) -> int:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Written to a .part file and renamed, so readers never see partial objects
+        part_path = f"{path}.part"
+        written = 0
+        try:
+            async with aiofiles.open(part_path, "wb") as out:
+                async for chunk in chunks:
+                    await out.write(chunk)
+                    written += len(chunk)
+            os.replace(part_path, path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        return written
+
+    async def get(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self._path(key), "rb") as f:
+            await f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining)
+                chunk = await f.read(size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    async def size(self, key: str) -> int:
+        return os.path.getsize(self._path(key))
+
+    async def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+# =============================================================================
+# S3-COMPATIBLE
+# =============================================================================
+
+class S3Storage(StorageBackend):
+    """
+    AWS S3 or an S3-compatible store (set S3_ENDPOINT_URL for MinIO/R2).
+
+    boto3 is synchronous, so calls run in worker threads on one shared,
+    pooled client. Objects larger than MULTIPART_PART_SIZE use a
+    multipart upload, one part in memory at a time.
+
+    Presigned uploads sign the exact length and SHA-256 checksum, so the
+    store itself rejects any other content.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None
+    ):
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=Config(
+                max_pool_connections=MAX_POOL_CONNECTIONS,
+                retries={"mode": "standard"},
+                signature_version="s3v4"
+            )
+        )
+
+    async def _call(self, method: str, **kwargs):
+        return await asyncio.to_thread(getattr(self._client, method), Bucket=self.bucket, **kwargs)
+
+    async def put(self, key: str, chunks: AsyncIterator[bytes]) -> int:
+        buffer = bytearray()
+        written = 0
+        upload_id = None
+        parts = []
+
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                written += len(chunk)
+                if len(buffer) < MULTIPART_PART_SIZE:
+                    continue
+
+                if upload_id is None:
+                    upload = await self._call("create_multipart_upload", Key=key)
+                    upload_id = upload["UploadId"]
+                parts.append(await self._upload_part(key, upload_id, len(parts) + 1, bytes(buffer)))
+                buffer.clear()
+
+            if upload_id is None:
+                # Small object: a single request
+                await self._call("put_object", Key=key, Body=bytes(buffer))
+                return written
+
+            if buffer:
+                parts.append(await self._upload_part(key, upload_id, len(parts) + 1, bytes(buffer)))
+            await self._call(
+                "complete_multipart_upload",
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            if upload_id is not None:
+                await self._call("abort_multipart_upload", Key=key, UploadId=upload_id)
+            raise
+
+        return written
+
+    async def _upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> Dict:
+        result = await self._call(
+            "upload_part", Key=key, UploadId=upload_id, PartNumber=number, Body=data
+        )
+        return {"ETag": result["ETag"], "PartNumber": number}
+
+    async def get(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        if end is not None and end < start:
+            return
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        result = await self._call("get_object", Key=key, Range=byte_range)
+        body = result["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def _head(self, key: str, **kwargs) -> Dict:
+        from botocore.exceptions import ClientError
+
+        try:
+            return await self._call("head_object", Key=key, **kwargs)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(key) from e
+            raise
+
+    async def size(self, key: str) -> int:
+        return (await self._head(key))["ContentLength"]
+
+    async def delete(self, key: str) -> None:
+        await self._call("delete_object", Key=key)
+
+    async def presign_upload(
+        self,
+        key: str,
+        size: int,
+        sha256: str,
+        expires_in: int
+    ) -> Optional[PresignedUpload]:
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        # Signing is local (no request), so no worker thread is needed
+        url = self._client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ContentLength": size,
+                "ChecksumSHA256": checksum
+            },
+            ExpiresIn=expires_in
+        )
+        return PresignedUpload(
+            url=url,
+            headers={"Content-Length": str(size), "x-amz-checksum-sha256": checksum}
+        )
+
+    async def verify_upload(self, key: str, size: int, sha256: str) -> bool:
+        result = await self._head(key, ChecksumMode="ENABLED")
+        if result["ContentLength"] != size:
+            return False
+
+        # Stores without checksum support (or multipart composites) are re-hashed
+        checksum = result.get("ChecksumSHA256")
+        if checksum and "-" not in checksum:
+            return checksum == base64.b64encode(bytes.fromhex(sha256)).decode()
+        return await super().verify_upload(key, size, sha256)
+
+
+# =============================================================================
+# SUPABASE STORAGE
+# =============================================================================
+
+class SupabaseStorage(StorageBackend):
+    """
+    Supabase Storage over its REST API, authenticated with the service
+    role key, on one pooled httpx client.
+
+    Signed upload URLs cannot pin the content, so direct uploads are
+    verified by re-hashing the object.
+    """
+
+    name = "supabase"
+
+    def __init__(self, url: str, service_role_key: str, bucket: str):
+        import httpx
+
+        self.bucket = bucket
+        self._client = httpx.AsyncClient(
+            base_url=f"{url.rstrip('/')}/storage/v1",
+            headers={
+                "Authorization": f"Bearer {service_role_key}",
+                "apikey": service_role_key
+            },
+            limits=httpx.Limits(max_connections=MAX_POOL_CONNECTIONS),
+            timeout=httpx.Timeout(30.0, read=120.0)
+        )
+
+    def _object_url(self, key: str) -> str:
+        return f"/object/{self.bucket}/{key}"
+
+    async def put(self, key: str, chunks: AsyncIterator[bytes]) -> int:
+        written = 0
+
+        async def counted():
+            nonlocal written
+            async for chunk in chunks:
+                written += len(chunk)
+                yield chunk
+
+        response = await self._client.post(
+            self._object_url(key),
+            content=counted(),
+            headers={"Content-Type": "application/octet-stream", "x-upsert": "true"}
+        )
+        response.raise_for_status()
+        return written
+
+    async def get(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        if end is not None and end < start:
+            return
+        headers = {"Range": f"bytes={start}-{'' if end is None else end}"}
+        async with self._client.stream("GET", f"/object/authenticated/{self.bucket}/{key}", headers=headers) as response:
+            if response.status_code == 404:
+                raise FileNotFoundError(key)
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(READ_CHUNK_SIZE):
+                yield chunk
+
+    async def size(self, key: str) -> int:
+        response = await self._client.head(f"/object/authenticated/{self.bucket}/{key}")
+        if response.status_code in (400, 404):
+            raise FileNotFoundError(key)
+        response.raise_for_status()
+        return int(response.headers["content-length"])
+
+    async def delete(self, key: str) -> None:
+        response = await self._client.delete(self._object_url(key))
+        if response.status_code not in (200, 204, 404):
+            response.raise_for_status()
+
+    async def presign_upload(
+        self,
+        key: str,
+        size: int,
+        sha256: str,
+        expires_in: int
+    ) -> Optional[PresignedUpload]:
+        # Supabase fixes the validity of signed upload URLs itself
+        response = await self._client.post(f"/object/upload/sign/{self.bucket}/{key}")
+        response.raise_for_status()
+        return PresignedUpload(
+            url=f"{str(self._client.base_url).rstrip('/')}{response.json()['url']}",
+            headers={"Content-Type": "application/octet-stream"}
+        )
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+_backends: Dict[str, StorageBackend] = {}
+
+
+def _create_backend(name: str) -> StorageBackend:
+    if name == "local":
+        return LocalStorage(settings.storage_path)
+    if name == "s3":
+        if not settings.s3_bucket:
+            raise RuntimeError("S3 storage requires S3_BUCKET")
+        return S3Storage(
+            settings.s3_bucket,
+            endpoint_url=settings.s3_endpoint_url,
+            region=settings.s3_region,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key
+        )
+    if name == "supabase":
+        if not settings.use_supabase_storage:
+            raise RuntimeError("Supabase storage requires SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY and STORAGE_BUCKET")
+        return SupabaseStorage(
+            settings.supabase_url,
+            settings.supabase_service_role_key,
+            settings.storage_bucket
+        )
+    raise RuntimeError(f"Unknown storage backend: {name}")
+
+
+def get_storage(name: Optional[str] = None) -> StorageBackend:
+    """
+    Get a storage backend by name, created on first use.
+
+    Without a name, returns the backend new uploads go to
+    (STORAGE_BACKEND).
+    """
+    name = name or settings.storage_backend
+    if name not in _backends:
+        _backends[name] = _create_backend(name)
+    return _backends[name]
+
+
+async def close_storage() -> None:
+    """Close pooled storage clients on shutdown."""
+    for backend in _backends.values():
+        await backend.close()
+    _backends.clear()
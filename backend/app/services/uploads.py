@@ -0,0 +1,235 @@
+"""
+Uplokal Backend - Upload Pipeline
+==================================
+Streams uploaded files into a storage backend chunk by chunk.
+
+Each chunk updates a running SHA-256 and byte count, is optionally
+transformed (e.g. encrypted), then written. Memory use is bounded by
+one chunk (one multipart part on S3) regardless of file size, and the plan's size limit is
+enforced as soon as it is crossed instead of after the whole body is read.
+
+Direct uploads skip the API for the bytes: an upload intent (an
+encrypted token naming the storage key, size and SHA-256) is issued
+first, the client uploads to a presigned URL, and the intent is then
+completed against what actually landed in storage.
+"""
+
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Protocol, Tuple, Union
+
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document import Document
+from app.models.subscription import (
+    SubscriptionPlan, SubscriptionStatus, SubscriptionTier, UserSubscription
+)
+from app.services.encryption import encrypt_params, decrypt_params
+from app.services.storage import StorageBackend
+
+# Bytes read, hashed and written per step
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+MB = 1024 * 1024
+
+# Largest single document per plan tier
+MAX_FILE_BYTES = {
+    SubscriptionTier.FREE: 10 * MB,
+    SubscriptionTier.STARTER: 25 * MB,
+    SubscriptionTier.PRO: 50 * MB,
+    SubscriptionTier.ENTERPRISE: 100 * MB,
+}
+
+# Used when a user has no active subscription (matches the free plan seed)
+DEFAULT_MAX_DOCUMENTS = 5
+
+
+class ChunkTransform(Protocol):
+    """Streaming transform applied to each chunk before it is written."""
+
+    def update(self, chunk: bytes) -> bytes: ...
+
+    def finalize(self) -> bytes: ...
+
+
+@dataclass
+class StoredFile:
+    """Result of streaming an upload to storage."""
+    size: int       # Plaintext bytes received
+    sha256: str     # Hex digest of the plaintext
+    stored_size: int  # Bytes written (differs when transformed)
+
+
+# =============================================================================
+# PLAN LIMITS
+# =============================================================================
+
+async def get_document_limits(db: AsyncSession, user_id: int) -> Tuple[int, int]:
+    """
+    Get a user's document limits from their active plan.
+
+    Returns:
+        (max_documents, max_file_bytes)
+    """
+    result = await db.execute(
+        select(SubscriptionPlan.max_documents, SubscriptionPlan.tier)
+        .join(UserSubscription, UserSubscription.plan_id == SubscriptionPlan.id)
+        .where(
+            UserSubscription.user_id == user_id,
+            UserSubscription.status == SubscriptionStatus.ACTIVE
+        )
+        .limit(1)
+    )
+    row = result.first()
+    if row is None:
+        return DEFAULT_MAX_DOCUMENTS, MAX_FILE_BYTES[SubscriptionTier.FREE]
+
+    max_documents, tier = row
+    return (
+        max_documents if max_documents is not None else DEFAULT_MAX_DOCUMENTS,
+        MAX_FILE_BYTES.get(tier, MAX_FILE_BYTES[SubscriptionTier.FREE])
+    )
+
+
+async def check_document_quota(db: AsyncSession, user_id: int) -> int:
+    """
+    Raise 403 if the user's plan document count is used up.
+
+    Returns:
+        The maximum file size in bytes for the user's plan
+    """
+    max_documents, max_file_bytes = await get_document_limits(db, user_id)
+
+    result = await db.execute(
+        select(func.count(Document.id)).where(Document.owner_id == user_id)
+    )
+    if result.scalar_one() >= max_documents:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Document limit reached for your plan ({max_documents})"
+        )
+
+    return max_file_bytes
+
+
+# =============================================================================
+# STREAMING
+# =============================================================================
+
+async def _read_chunks(
+    source: Union[UploadFile, AsyncIterator[bytes]],
+    chunk_size: int
+) -> AsyncIterator[bytes]:
+    if not hasattr(source, "read"):
+        async for chunk in source:
+            if chunk:
+                yield chunk
+        return
+    while chunk := await source.read(chunk_size):
+        yield chunk
+
+
+def _content_mismatch() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Uploaded file does not match the declared size and hash"
+    )
+
+
+async def stream_to_storage(
+    source: Union[UploadFile, AsyncIterator[bytes]],
+    storage: StorageBackend,
+    key: str,
+    max_bytes: int,
+    transform: Optional[ChunkTransform] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    expected: Optional[Tuple[int, str]] = None
+) -> StoredFile:
+    """
+    Stream an upload into a storage backend under `key`, chunk by chunk.
+
+    `source` is an UploadFile or a raw body stream (`request.stream()`).
+    With `expected` (size, sha256), content that differs is rejected
+    before the object is committed, leaving any existing object intact.
+    The backend discards the partial object if the upload fails.
+
+    Raises:
+        HTTPException 413 as soon as more than `max_bytes` are received
+        HTTPException 400 if the content does not match `expected`
+    """
+    digest = hashlib.sha256()
+    size = 0
+
+    async def chunks():
+        nonlocal size
+        async for chunk in _read_chunks(source, chunk_size):
+            size += len(chunk)
+            if expected is not None and size > expected[0]:
+                raise _content_mismatch()
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File exceeds your plan limit of {max_bytes // MB} MB"
+                )
+
+            digest.update(chunk)
+            yield transform.update(chunk) if transform is not None else chunk
+
+        if expected is not None and (size, digest.hexdigest()) != expected:
+            raise _content_mismatch()
+
+        if transform is not None:
+            yield transform.finalize()
+
+    stored_size = await storage.put(key, chunks())
+
+    return StoredFile(size=size, sha256=digest.hexdigest(), stored_size=stored_size)
+
+
+# =============================================================================
+# DIRECT UPLOADS
+# =============================================================================
+
+@dataclass
+class UploadIntent:
+    """A pending direct upload, carried by the client as an opaque token."""
+    owner_id: int
+    key: str
+    backend: str      # Storage backend name the key lives in
+    size: int
+    sha256: str
+    direct: bool      # Uploaded to a presigned URL (False: through the API)
+    expires: int      # Unix time the intent (and its upload URL) expires
+
+    def to_token(self) -> str:
+        return encrypt_params({
+            "o": self.owner_id,
+            "k": self.key,
+            "b": self.backend,
+            "s": self.size,
+            "h": self.sha256,
+            "d": self.direct,
+            "x": self.expires
+        })
+
+    @classmethod
+    def from_token(cls, token: str) -> Optional["UploadIntent"]:
+        """Decode an intent token; None if it was tampered with or has expired."""
+        data: Optional[Dict[str, Any]] = decrypt_params(token)
+        if not data or data.get("x", 0) < time.time():
+            return None
+        try:
+            return cls(
+                owner_id=data["o"],
+                key=data["k"],
+                backend=data["b"],
+                size=data["s"],
+                sha256=data["h"],
+                direct=data["d"],
+                expires=data["x"]
+            )
+        except KeyError:
+            return None
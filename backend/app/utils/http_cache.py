@@ -0,0 +1,95 @@
+"""
+Uplokal Backend - HTTP Range & Conditional Request Utilities
+=============================================================
+Byte-range parsing (RFC 9110 §14) and ETag matching for file downloads.
+"""
+
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an `If-None-Match` header against the current ETag.
+
+    Uses weak comparison, as the RFC requires for If-None-Match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    current = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == current
+        for candidate in if_none_match.split(",")
+    )
+
+
+def if_range_allows(if_range: Optional[str], etag: str) -> bool:
+    """
+    Check whether a `Range` may be honored given an `If-Range` header.
+
+    If-Range needs a strong ETag match; dates are not supported and
+    fall back to a full response.
+    """
+    if not if_range:
+        return True
+    return not etag.startswith("W/") and if_range.strip() == etag
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `Range: bytes=...` header into inclusive (start, end).
+
+    Returns None when the whole representation should be sent (no
+    header, malformed header, other units or multiple ranges).
+
+    Raises:
+        HTTPException 416 if the range cannot be satisfied
+    """
+    if not range_header:
+        return None
+
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if start < size and end < start:
+                return None
+        else:
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix == 0:
+                raise _unsatisfiable(size)
+            start = max(size - suffix, 0)
+            end = size - 1
+    except ValueError:
+        return None
+
+    if start < 0 or start >= size:
+        raise _unsatisfiable(size)
+
+    return start, min(end, size - 1)
+
+
+def content_range(start: int, end: int, size: int) -> str:
+    """Value for the `Content-Range` header of a 206 response."""
+    return f"bytes {start}-{end}/{size}"
+
+
+def _unsatisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"}
+    )
@@ -0,0 +1,102 @@
+"""
+Uplokal Backend - Pagination Utilities
+=======================================
+Row counting and keyset cursor helpers shared by paginated list endpoints.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import psycopg2
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.encryption import encode_ids, decode_ids
+
+
+# =============================================================================
+# ROW COUNTS
+# =============================================================================
+
+async def count_rows(db: AsyncSession, model: Any, filters: List[Any]) -> int:
+    """
+    Count matching rows with `SELECT count(*)` in the database.
+
+    Pass the same filter list used by the page query so the total
+    always matches what the listing shows.
+    """
+    result = await db.execute(
+        select(func.count()).select_from(model).where(*filters)
+    )
+    return result.scalar() or 0
+
+
+async def estimate_rows(db: AsyncSession, model: Any, filters: List[Any]) -> int:
+    """
+    Estimate matching rows from the PostgreSQL query planner.
+
+    Runs `EXPLAIN` instead of scanning the table, so the cost does not
+    grow with table size. Accuracy depends on up-to-date statistics
+    (ANALYZE). Falls back to an exact count on other databases.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return await count_rows(db, model, filters)
+
+    # Compile with named binds so the statement can be wrapped in text()
+    stmt = select(*model.__table__.primary_key.columns).where(*filters)
+    compiled = stmt.compile(dialect=psycopg2.dialect(paramstyle="named"))
+
+    result = await db.execute(
+        text(f"EXPLAIN (FORMAT JSON) {compiled}"),
+        compiled.params
+    )
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+# =============================================================================
+# KEYSET CURSORS
+# =============================================================================
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode_cursor(*values: int) -> str:
+    """
+    Encode the sort key of the last row on a page into an opaque cursor.
+
+    Example: encode_cursor(1, 87, 4521) → 'Xy7kL9mQ'
+    """
+    return encode_ids(*values)
+
+
+def decode_cursor(cursor: str, size: int) -> Tuple[int, ...]:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Raises 400 if the cursor is malformed or has the wrong number of values.
+    """
+    values = decode_ids(cursor) if cursor else ()
+    if len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
+
+
+def datetime_to_cursor(value: datetime) -> int:
+    """Convert a UTC datetime to integer microseconds for a cursor."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def cursor_to_datetime(value: int) -> datetime:
+    """Convert cursor microseconds back to a naive UTC datetime."""
+    return _EPOCH + timedelta(microseconds=value)
@@ -0,0 +1,176 @@
+"""
+Uplokal Backend - Background Worker
+====================================
+Runs queued jobs (see app/services/jobs.py) outside the API process.
+
+Usage:
+    python -m app.worker [--concurrency N]
+
+Run as many workers as needed; they share the queue safely. SIGTERM
+stops claiming new jobs and lets running ones finish.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import time
+import traceback
+from typing import Set
+
+import app.models  # noqa: F401 - register all mappers
+from app.config import get_settings
+from app.database import async_session_maker, close_db
+from app.models.job import Job
+from app.services.jobs import (
+    JOB_HEARTBEAT_SECONDS,
+    claim_jobs,
+    complete_job,
+    fail_job,
+    get_job_handler,
+    get_notifier,
+    renew_lease,
+    requeue_expired_leases,
+    prune_finished_jobs,
+    close_jobs
+)
+from app.services.matching import close_matching
+from app.services.payment import close_midtrans
+from app.services.rfq_matching import prune_stale_suggestions
+from app.routers import diagnostic, rfq, subscription  # noqa: F401 - register job handlers
+
+settings = get_settings()
+
+# Housekeeping (expired leases, old jobs, stale RFQ suggestions) interval, in seconds
+MAINTENANCE_INTERVAL = 60
+
+
+class Worker:
+    """Claims and runs jobs with up to `concurrency` in flight."""
+
+    def __init__(self, concurrency: int, poll_interval: float):
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._running: Set[asyncio.Task] = set()
+        self._stopping = False
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    async def run(self) -> None:
+        print(f"Worker {self.id} started (concurrency {self.concurrency})")
+        notifier = get_notifier()
+        next_maintenance = 0.0
+
+        while not self._stopping:
+            if time.monotonic() >= next_maintenance:
+                await self._maintenance()
+                next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+
+            free = self.concurrency - len(self._running)
+            claimed = []
+            if free > 0:
+                try:
+                    async with async_session_maker() as db:
+                        claimed = await claim_jobs(db, self.id, free)
+                except Exception as e:
+                    # Database unavailable: back off and try again
+                    print(f"Claiming jobs failed: {e}")
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                for job in claimed:
+                    task = asyncio.create_task(self._execute(job))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+
+            if free <= 0:
+                # Full: wait for a slot
+                await asyncio.wait(
+                    self._running, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED
+                )
+            elif not claimed:
+                await notifier.wait(self.poll_interval)
+
+        if self._running:
+            print(f"Worker {self.id} finishing {len(self._running)} running jobs")
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def _execute(self, job: Job) -> None:
+        handler = get_job_handler(job.name)
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            async with async_session_maker() as db:
+                try:
+                    if handler is None:
+                        raise LookupError(f"No handler registered for job '{job.name}'")
+                    result = await handler(db, job.payload or {})
+                    if not await complete_job(db, job, self.id, result):
+                        print(f"Job {job.id} ({job.name}) lost its lease - result discarded")
+                except Exception as e:
+                    await db.rollback()
+                    error = "".join(traceback.format_exception_only(type(e), e)).strip()
+                    retried = await fail_job(db, job, self.id, error)
+                    if retried is None:
+                        print(f"Job {job.id} ({job.name}) lost its lease - failure not recorded: {error}")
+                    else:
+                        print(f"Job {job.id} ({job.name}) attempt {job.attempts} failed: {error}"
+                              f"{' - will retry' if retried else ' - giving up'}")
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job: Job) -> None:
+        """Keep a long-running job's lease, so it is not run twice."""
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                # Own session: the handler's transaction commits only at the end
+                async with async_session_maker() as db:
+                    if not await renew_lease(db, job, self.id):
+                        print(f"Job {job.id} ({job.name}) lost its lease")
+                        return
+            except Exception as e:
+                # Retried next beat; the lease has JOB_LEASE_SECONDS of slack
+                print(f"Renewing lease of job {job.id} failed: {e}")
+
+    async def _maintenance(self) -> None:
+        try:
+            async with async_session_maker() as db:
+                requeued = await requeue_expired_leases(db)
+                pruned = await prune_finished_jobs(db)
+            if requeued or pruned:
+                print(f"Requeued {requeued} jobs with expired leases, pruned {pruned} finished jobs")
+        except Exception as e:
+            print(f"Job maintenance failed: {e}")
+
+        try:
+            async with async_session_maker() as db:
+                swept = await prune_stale_suggestions(db)
+            if swept:
+                print(f"Swept {swept} suggestions of closed or expired RFQs")
+        except Exception as e:
+            print(f"Suggestion sweep failed: {e}")
+
+
+async def main(concurrency: int) -> None:
+    worker = Worker(concurrency, settings.job_poll_interval_seconds)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        await close_jobs()
+        await close_midtrans()
+        await close_matching()
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Uplokal background jobs")
+    parser.add_argument("--concurrency", type=int, default=settings.job_concurrency)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
@@ -0,0 +1,119 @@
+"""
+Benchmark the business directory total count.
+
+Seeds synthetic verified businesses in growing batches and times the
+old row-loading count against the SQL COUNT, cached and planner-estimate
+modes used by /api/business/directory.
+
+Run against a scratch database, never production:
+    BENCH_DATABASE_URL=postgresql+asyncpg://... python bench_directory.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401 - register all mappers
+from app.database import Base
+from app.models.business import Business
+from app.models.user import User, UserRole
+from app.services.cache import TTLCache
+from app.utils.pagination import count_rows, estimate_rows
+
+SIZES = [1_000, 10_000, 50_000]
+ROUNDS = 5
+EMAIL_DOMAIN = "bench.uplokal.invalid"
+
+
+async def _timed(fn) -> float:
+    """Return the median latency of `fn` in milliseconds."""
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+async def _seed(session: AsyncSession, start: int, stop: int):
+    """Insert users and verified businesses with ids in [start, stop)."""
+    users = [
+        {"email": f"bench{i}@{EMAIL_DOMAIN}", "full_name": f"Bench {i}", "role": UserRole.USER}
+        for i in range(start, stop)
+    ]
+    await session.execute(insert(User), users)
+
+    result = await session.execute(
+        select(User.id).where(User.email.like(f"%@{EMAIL_DOMAIN}")).order_by(User.id).offset(start)
+    )
+    owner_ids = result.scalars().all()
+    await session.execute(insert(Business), [
+        {"owner_id": owner_id, "name": f"UMKM {owner_id}", "category": "food", "is_verified": True}
+        for owner_id in owner_ids
+    ])
+    await session.commit()
+
+
+async def _cleanup(session: AsyncSession):
+    owner_ids = select(User.id).where(User.email.like(f"%@{EMAIL_DOMAIN}"))
+    await session.execute(delete(Business).where(Business.owner_id.in_(owner_ids)))
+    await session.execute(delete(User).where(User.email.like(f"%@{EMAIL_DOMAIN}")))
+    await session.commit()
+
+
+async def run_benchmark():
+    database_url = os.environ.get("BENCH_DATABASE_URL")
+    if not database_url:
+        print("❌ Set BENCH_DATABASE_URL to a scratch database")
+        return
+
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    filters = [Business.is_verified == True, Business.category == "food"]
+
+    async with session_maker() as session:
+        await _cleanup(session)
+        seeded = 0
+        print(f"{'rows':>8} {'load-all':>10} {'count':>10} {'cached':>10} {'approx':>10}  (ms)")
+
+        for size in SIZES:
+            await _seed(session, seeded, size)
+            seeded = size
+
+            async def load_all():
+                result = await session.execute(select(Business).where(*filters))
+                len(result.scalars().all())
+                session.expunge_all()
+
+            cache = TTLCache(ttl=60)
+
+            async def cached():
+                if cache.get("food") is None:
+                    cache.set("food", await count_rows(session, Business, filters))
+
+            print(
+                f"{size:>8} "
+                f"{await _timed(load_all):>10.2f} "
+                f"{await _timed(lambda: count_rows(session, Business, filters)):>10.2f} "
+                f"{await _timed(cached):>10.2f} "
+                f"{await _timed(lambda: estimate_rows(session, Business, filters)):>10.2f}"
+            )
+
+        await _cleanup(session)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
@@ -0,0 +1,124 @@
+"""
+Benchmark a login storm against non-auth endpoint latency.
+
+Serves a minimal app with the backend's password hashing on one event
+loop, fires a burst of concurrent logins, and meanwhile probes a cheap
+endpoint every 20 ms. For each mode it reports login latency and probe
+latency (p50/p99/max, counted from when each probe was due):
+
+- inline: bcrypt called directly in the handler, as before
+- pool: verify_and_update_password on the bounded hashing pool
+
+Needs the usual backend environment (.env) but no database:
+    python bench_login_storm.py [--logins 64]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from app.services.auth import (
+    close_password_hasher,
+    get_password_hasher,
+    pwd_context,
+    verify_and_update_password
+)
+
+PROBE_INTERVAL = 0.02
+PASSWORD = "correct horse battery staple"
+
+
+def create_app(password_hash: str, pooled: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if pooled:
+            valid, _ = await verify_and_update_password(PASSWORD, password_hash)
+        else:
+            valid = pwd_context.verify(PASSWORD, password_hash)
+        if not valid:
+            raise HTTPException(status_code=401)
+        return {"success": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+def _ms(values) -> str:
+    ordered = sorted(values)
+    p99 = ordered[max(int(len(ordered) * 0.99) - 1, 0)]
+    return (f"p50 {statistics.median(ordered) * 1000:8.1f} ms  p99 {p99 * 1000:8.1f} ms  "
+            f"max {ordered[-1] * 1000:8.1f} ms")
+
+
+async def run_storm(app: FastAPI, logins: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        probes = []
+        statuses = []
+        storming = True
+
+        async def probe():
+            # Open loop: latency counts from when the probe was due, so
+            # time spent unable to even send it (loop blocked) is included
+            due = time.perf_counter()
+            while storming:
+                await asyncio.sleep(max(due - time.perf_counter(), 0))
+                await client.get("/health")
+                probes.append(time.perf_counter() - due)
+                due += PROBE_INTERVAL
+
+        async def login():
+            start = time.perf_counter()
+            response = await client.post("/login")
+            statuses.append(response.status_code)
+            return time.perf_counter() - start
+
+        prober = asyncio.create_task(probe())
+        await asyncio.sleep(PROBE_INTERVAL * 5)
+        probes.clear()  # Only count probes during the storm
+        start = time.perf_counter()
+        timings = await asyncio.gather(*(login() for _ in range(logins)))
+        total = time.perf_counter() - start
+        storming = False
+        await prober
+
+    ok = statuses.count(200)
+    print(f"  health probes  {_ms(probes)}  ({len(probes)} probes)")
+    print(f"  logins         {_ms(timings)}  {ok} ok, {len(statuses) - ok} rejected, {total:5.2f} s")
+
+
+async def main(logins: int) -> None:
+    password_hash = pwd_context.hash(PASSWORD)
+    start = time.perf_counter()
+    pwd_context.verify(PASSWORD, password_hash)
+    print(f"{logins} concurrent logins, one verify = {(time.perf_counter() - start) * 1000:.0f} ms on {os.cpu_count()} CPUs")
+
+    print("inline (bcrypt in the event loop)")
+    await run_storm(create_app(password_hash, pooled=False), logins)
+
+    hasher = get_password_hasher()
+    print(f"pool ({hasher.workers} workers, max {hasher.max_pending} pending)")
+    await run_storm(create_app(password_hash, pooled=True), logins)
+    print(f"  metrics {hasher.stats()}")
+    close_password_hasher()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark a login storm")
+    parser.add_argument("--logins", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
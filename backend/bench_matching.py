@@ -0,0 +1,112 @@
+"""
+Benchmark B2B matchmaking at directory scale.
+
+Builds a MatchIndex over synthetic verified businesses (realistic mix of
+categories, provinces, export markets and certifications) and times
+match requests for random profiles:
+
+- build: encoding every business into the feature arrays
+- blocked: candidates from the (category, province) blocking index
+- full scan: the same scoring over every business, for comparison
+
+Target: under 20 ms per match request at 100k businesses.
+
+Needs the usual backend environment (.env) but no database:
+    python bench_matching.py [--businesses 100000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.services.matching import MatchIndex, MatchProfile, PROVINCE_CENTROIDS
+
+QUERIES = 1000
+CATEGORIES = ["manufaktur", "kerajinan", "fnb", "fashion", "agrikultur", "furniture", "lainnya"]
+COUNTRIES = ["Singapore", "Malaysia", "Japan", "USA", "Netherlands", "Germany", "Australia",
+             "China", "South Korea", "UAE", "Saudi Arabia", "Thailand", "Vietnam", "UK"]
+CERTIFICATIONS = ["Halal MUI", "BPOM", "SNI", "ISO 9001", "HACCP", "SVLK", "FSC", "PIRT"]
+PROVINCES = [p.title() for p in PROVINCE_CENTROIDS]
+# Java and Bali hold most businesses
+PROVINCE_WEIGHTS = [8 if p.lower().startswith(("jawa", "dki", "banten", "di ", "bali")) else 1 for p in PROVINCES]
+
+
+def synthetic_rows(n: int, rng: random.Random):
+    rows = []
+    for i in range(n):
+        province = rng.choices(PROVINCES, PROVINCE_WEIGHTS)[0]
+        rows.append((
+            i + 1,
+            rng.choice(CATEGORIES),
+            province,
+            f"Kota {province} {rng.randint(1, 8)}",
+            rng.sample(COUNTRIES, rng.randint(0, 4)),
+            rng.sample(CERTIFICATIONS, rng.randint(0, 3)),
+            int(rng.lognormvariate(2, 1.2)) + 1,
+            rng.randint(30, 100),
+            rng.randint(0, 100),
+            rng.randint(0, 100),
+            rng.randint(0, 100),
+            rng.random() < 0.3,
+        ))
+    return rows
+
+
+def _ms(values) -> str:
+    ordered = sorted(values)
+    pick = lambda q: ordered[max(int(len(ordered) * q) - 1, 0)] * 1000
+    return f"p50 {statistics.median(ordered) * 1000:6.2f} ms  p95 {pick(0.95):6.2f} ms  p99 {pick(0.99):6.2f} ms"
+
+
+def main(businesses: int) -> None:
+    rng = random.Random(42)
+    rows = synthetic_rows(businesses, rng)
+
+    start = time.perf_counter()
+    index = MatchIndex(rows)
+    print(f"build     {businesses} businesses in {time.perf_counter() - start:5.2f} s")
+
+    profiles = []
+    for row in rng.sample(rows, QUERIES):
+        business_id, category, province, city, countries, certs, employees = row[:7]
+        profiles.append(MatchProfile(
+            business_id=business_id,
+            category=category,
+            province=province.lower(),
+            city=city.lower(),
+            countries={c.lower(): c for c in countries},
+            certifications={c.lower(): c for c in certs},
+            size_band=0 if employees < 5 else 1 if employees < 20 else 2 if employees < 100 else 3
+        ))
+
+    timings, candidates = [], []
+    for profile in profiles:
+        start = time.perf_counter()
+        index.match(profile, 10)
+        timings.append(time.perf_counter() - start)
+        candidates.append(len(index.candidates(profile)))
+    print(f"blocked   {_ms(timings)}  ({statistics.mean(candidates):.0f} candidates on average)")
+
+    everyone = np.arange(len(index))
+    timings = []
+    for profile in profiles[:100]:
+        start = time.perf_counter()
+        total = index.score(profile, everyone)["total"]
+        np.argpartition(-total, 10)[:10]
+        timings.append(time.perf_counter() - start)
+    print(f"full scan {_ms(timings)}  ({len(index)} candidates)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark B2B matchmaking")
+    parser.add_argument("--businesses", type=int, default=100_000)
+    args = parser.parse_args()
+    main(args.businesses)
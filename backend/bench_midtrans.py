@@ -0,0 +1,127 @@
+"""
+Benchmark Midtrans gateway calls under load, against fake_midtrans.py.
+
+Fires a burst of concurrent subscription checkouts at a fake gateway
+with realistic latency and reports, for each client:
+
+- blocking: a synchronous HTTP call per request inside the coroutine,
+  as the midtransclient SDK did
+- async: the pooled MidtransClient in app/services/payment.py
+
+Call latency (p50/p95), total time, and the worst event-loop stall seen
+by a 10 ms ticker - every stall delays all other requests the server is
+handling. A final run takes the gateway down to show the circuit
+breaker failing fast.
+
+Needs the usual backend environment (.env) but no database:
+    python bench_midtrans.py [--requests 200] [--latency-ms 150]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+
+from app.services import payment
+from app.services.payment import MidtransClient, create_subscription_transaction, generate_order_id
+from fake_midtrans import FakeGateway, create_app
+
+PORT = 8091
+BASE_URL = f"http://127.0.0.1:{PORT}"
+TICK_SECONDS = 0.01
+
+
+def start_fake_gateway(gateway: FakeGateway) -> uvicorn.Server:
+    """Serve the fake gateway from its own thread and event loop."""
+    server = uvicorn.Server(uvicorn.Config(create_app(gateway), port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def blocking_checkout() -> None:
+    # One new connection per call, synchronous, like the SDK
+    with httpx.Client(auth=("SB-Mid-server-bench", "")) as client:
+        response = client.post(
+            f"{BASE_URL}/snap/v1/transactions",
+            json={"transaction_details": {"order_id": generate_order_id(), "gross_amount": 299000}}
+        )
+        response.raise_for_status()
+
+
+async def async_checkout() -> None:
+    result = await create_subscription_transaction(1, "bench@example.com", "Bench User", "Pro", 299000)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+
+
+async def run_burst(checkout, requests: int) -> None:
+    stalls = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            stalls.append(time.perf_counter() - start - TICK_SECONDS)
+
+    async def timed():
+        start = time.perf_counter()
+        try:
+            await checkout()
+        except Exception:
+            pass
+        return time.perf_counter() - start
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK_SECONDS * 2)
+    start = time.perf_counter()
+    timings = sorted(await asyncio.gather(*(timed() for _ in range(requests))))
+    total = time.perf_counter() - start
+    stop.set()
+    await tick
+
+    p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+    print(f"  p50 {statistics.median(timings) * 1000:8.1f} ms  p95 {p95 * 1000:8.1f} ms  "
+          f"total {total:6.2f} s  worst loop stall {max(stalls) * 1000:8.1f} ms")
+
+
+async def main(requests: int, latency_ms: float) -> None:
+    gateway = FakeGateway(latency_ms=latency_ms)
+    server = start_fake_gateway(gateway)
+    payment._client = MidtransClient("SB-Mid-server-bench", False, BASE_URL)
+
+    try:
+        print(f"{requests} concurrent checkouts, gateway latency {latency_ms:.0f} ms")
+        print("blocking (sync SDK call in the event loop)")
+        await run_burst(blocking_checkout, requests)
+        print("async (pooled MidtransClient)")
+        await run_burst(async_checkout, requests)
+
+        gateway.error_rate = 1.0
+        for phase in ("gateway down (503s), breaker closed", "gateway down, breaker open"):
+            print(phase)
+            before = gateway.requests
+            await run_burst(async_checkout, requests)
+            print(f"  {gateway.requests - before} requests reached the gateway")
+    finally:
+        await payment.close_midtrans()
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Midtrans gateway calls")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency_ms))
@@ -0,0 +1,145 @@
+"""
+Benchmark document preview latency.
+
+Renders previews of typical vault documents (a phone photo, a scanned
+PNG, a multi-page PDF) and reports:
+
+- render: time to produce the JPEG preview from plaintext, per type
+- pipeline: time from scheduling until the encrypted preview is stored,
+  for a burst of uploads at once, through the bounded worker pool
+
+Needs the usual backend environment (.env) but no database:
+    python bench_previews.py
+"""
+
+import asyncio
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+import pypdfium2 as pdfium
+
+from app.config import get_settings
+from app.services import storage as storage_module
+from app.services.encryption import FileEncryptor
+from app.services.previews import PreviewJob, PreviewPipeline, render_preview, preview_key
+from app.services.storage import LocalStorage
+
+RENDER_RUNS = 20
+BURST_SIZE = 32
+
+
+def _photo() -> bytes:
+    # 12 MP, like a phone camera
+    image = Image.linear_gradient("L").resize((4000, 3000)).convert("RGB")
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+def _scan() -> bytes:
+    image = Image.new("RGB", (2480, 3508), "white")  # A4 at 300 dpi
+    draw = ImageDraw.Draw(image)
+    for y in range(100, 3400, 40):
+        draw.line((100, y, 2380, y), fill="black", width=3)
+    out = io.BytesIO()
+    image.save(out, "PNG")
+    return out.getvalue()
+
+
+def _pdf(pages: int = 20) -> bytes:
+    pdf = pdfium.PdfDocument.new()
+    for _ in range(pages):
+        pdf.new_page(595, 842)
+    out = io.BytesIO()
+    pdf.save(out)
+    pdf.close()
+    return out.getvalue()
+
+
+SAMPLES = {
+    "photo (jpeg)": ("image/jpeg", _photo),
+    "scan (png)": ("image/png", _scan),
+    "pdf (20 pages)": ("application/pdf", _pdf),
+}
+
+
+def _ms(values) -> str:
+    ordered = sorted(values)
+    p95 = ordered[max(int(len(ordered) * 0.95) - 1, 0)]
+    return f"p50 {statistics.median(ordered) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms"
+
+
+def bench_render(samples) -> None:
+    print(f"render ({RENDER_RUNS} runs each)")
+    for name, (mime_type, data) in samples.items():
+        timings = []
+        for _ in range(RENDER_RUNS):
+            start = time.perf_counter()
+            render_preview(data, mime_type)
+            timings.append(time.perf_counter() - start)
+        print(f"  {name:<16} {len(data) / 1024:8.0f} KB  {_ms(timings)}")
+
+
+async def bench_pipeline(samples, root: str, workers: int) -> None:
+    storage = LocalStorage(root)
+    storage_module._backends["bench"] = storage
+
+    # Encrypted sources, as uploads leave them
+    jobs = []
+    for i in range(BURST_SIZE):
+        mime_type, data = list(samples.values())[i % len(samples)]
+        data += i.to_bytes(4, "big")  # Distinct content, so nothing is deduplicated
+        encryptor = FileEncryptor()
+
+        async def sealed(data=data, encryptor=encryptor):
+            yield encryptor.update(data)
+            yield encryptor.finalize()
+
+        key = f"sources/{i}"
+        await storage.put(key, sealed())
+        jobs.append(PreviewJob("bench", key, f"{i:064x}", mime_type))
+
+    pipeline = PreviewPipeline(workers)
+    start = time.perf_counter()
+    done = {}
+
+    async def watch(job):
+        while True:
+            try:
+                await storage.size(preview_key(job.content_hash))
+                done[job] = time.perf_counter() - start
+                return
+            except FileNotFoundError:
+                await asyncio.sleep(0.005)
+
+    for job in jobs:
+        pipeline.schedule(job)
+    await asyncio.gather(*(watch(job) for job in jobs))
+    total = time.perf_counter() - start
+    await pipeline.close()
+
+    print(f"  {workers} workers  {_ms(done.values())}  burst done in {total:5.2f} s")
+
+
+def main():
+    settings = get_settings()
+    samples = {name: (mime_type, make()) for name, (mime_type, make) in SAMPLES.items()}
+
+    bench_render(samples)
+
+    print(f"pipeline (burst of {BURST_SIZE} uploads, schedule -> preview stored)")
+    for workers in sorted({1, settings.preview_workers, 4}):
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(bench_pipeline(samples, tmp, workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark RFQ supplier matching for a burst of published RFQs.
+
+Builds a MatchIndex over synthetic verified businesses (see
+bench_matching.py) and matches a burst of synthetic RFQs against it:
+
+- one at a time: a score pass per RFQ, as if each job ran alone
+- batched: RFQ_MATCH_BATCH RFQs per pass, as the rfq.match job does
+
+Needs the usual backend environment (.env) but no database:
+    python bench_rfq_matching.py [--businesses 100000] [--rfqs 1000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.rfq import RFQ
+from app.services.matching import MatchIndex
+from app.services.rfq_matching import RFQ_MATCH_BATCH, RFQProfile, score_rfqs
+from bench_matching import CATEGORIES, CERTIFICATIONS, COUNTRIES, PROVINCES, synthetic_rows
+
+
+def synthetic_rfqs(n: int, businesses: int, rng: random.Random):
+    rfqs = []
+    for i in range(n):
+        abroad = rng.random() < 0.5
+        rfqs.append(RFQ(
+            id=i + 1,
+            business_id=rng.randint(1, businesses),
+            title=f"RFQ {i + 1}",
+            category=rng.choice(CATEGORIES),
+            specifications={"certification": rng.sample(CERTIFICATIONS, rng.randint(0, 2)), "grade": "A"},
+            budget_max=rng.choice([5_000, 20_000, 80_000, 400_000]),
+            currency="USD",
+            origin_countries=rng.choice([None, ["Indonesia"], rng.sample(PROVINCES, 2)]),
+            delivery_location=f"Port, {rng.choice(COUNTRIES)}" if abroad else f"Kota, {rng.choice(PROVINCES)}"
+        ))
+    return rfqs
+
+
+def main(businesses: int, rfqs: int) -> None:
+    rng = random.Random(42)
+    index = MatchIndex(synthetic_rows(businesses, rng))
+    profiles = [RFQProfile.from_rfq(rfq) for rfq in synthetic_rfqs(rfqs, businesses, rng)]
+    print(f"index     {len(index)} businesses, burst of {rfqs} RFQs")
+
+    start = time.perf_counter()
+    for profile in profiles:
+        score_rfqs(index, [profile])
+    single = time.perf_counter() - start
+    print(f"one at a time {single:6.2f} s  ({rfqs / single:7.1f} RFQs/s)")
+
+    start = time.perf_counter()
+    matches = 0
+    for i in range(0, rfqs, RFQ_MATCH_BATCH):
+        matches += sum(len(hits) for hits in score_rfqs(index, profiles[i:i + RFQ_MATCH_BATCH]))
+    batched = time.perf_counter() - start
+    print(f"batched       {batched:6.2f} s  ({rfqs / batched:7.1f} RFQs/s, {matches / rfqs:.1f} matches per RFQ)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark RFQ supplier matching")
+    parser.add_argument("--businesses", type=int, default=100_000)
+    parser.add_argument("--rfqs", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.businesses, args.rfqs)
@@ -0,0 +1,84 @@
+"""
+Benchmark peak memory of the document upload pipeline.
+
+Writes files of growing size through the old read-everything upload and
+the chunked streaming pipeline, each run in a fresh process, and reports
+peak RSS against file size.
+
+Needs the usual backend environment (.env) but no database:
+    python bench_upload.py
+"""
+
+import asyncio
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SIZES_MB = [10, 50, 200]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _read_all(source, path):
+    import aiofiles
+
+    content = await source.read()
+    async with aiofiles.open(path, "wb") as f:
+        await f.write(content)
+
+
+async def _streaming(source, path):
+    from app.services.storage import LocalStorage
+    from app.services.uploads import stream_to_storage
+
+    storage = LocalStorage(os.path.dirname(path))
+    await stream_to_storage(source, storage, os.path.basename(path), max_bytes=sys.maxsize)
+
+
+def _run(mode: str, src: str, queue):
+    from starlette.datastructures import UploadFile
+
+    import app.services.uploads  # noqa: F401 - import cost outside the measurement
+
+    fn = {"read-all": _read_all, "streaming": _streaming}[mode]
+    with tempfile.TemporaryDirectory() as tmp, open(src, "rb") as f:
+        baseline = _peak_rss_mb()
+        start = time.perf_counter()
+        asyncio.run(fn(UploadFile(file=f, filename="bench.pdf"), os.path.join(tmp, "out")))
+        elapsed = time.perf_counter() - start
+        queue.put((_peak_rss_mb() - baseline, elapsed))
+
+
+def main():
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'size':>8} {'mode':>10} {'peak RSS +MB':>13} {'seconds':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in SIZES_MB:
+            src = os.path.join(tmp, f"src-{size_mb}")
+            with open(src, "wb") as f:
+                for _ in range(size_mb):
+                    f.write(os.urandom(1024 * 1024))
+
+            for mode in ("read-all", "streaming"):
+                queue = ctx.Queue()
+                proc = ctx.Process(target=_run, args=(mode, src, queue))
+                proc.start()
+                rss, elapsed = queue.get()
+                proc.join()
+                print(f"{size_mb:>6}MB {mode:>10} {rss:>13.1f} {elapsed:>8.2f}")
+
+            os.remove(src)
+
+
+if __name__ == "__main__":
+    main()
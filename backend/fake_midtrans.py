@@ -0,0 +1,123 @@
+"""
+Local fake of the Midtrans Snap and Core API endpoints.
+
+Enough of the gateway for development, integration tests and load
+benchmarks without sandbox credentials or network access:
+
+- POST /snap/v1/transactions   create a checkout (duplicate order IDs rejected)
+- GET  /v2/{order_id}/status   status of a created transaction ("pending")
+
+Latency and failure rate are configurable, to exercise timeouts, retries
+and the circuit breaker.
+
+Usage:
+    python fake_midtrans.py [--port 8090] [--latency-ms 100] [--error-rate 0.1]
+
+Then set MIDTRANS_BASE_URL=http://127.0.0.1:8090 for the backend.
+"""
+
+import argparse
+import asyncio
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class FakeGateway:
+    """Behaviour knobs and created transactions; change at runtime in tests."""
+    latency_ms: float = 0.0
+    error_rate: float = 0.0  # Share of requests answered with 503
+    transactions: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    requests: int = 0
+
+
+def create_app(gateway: FakeGateway) -> FastAPI:
+    app = FastAPI(title="Fake Midtrans")
+
+    async def simulate(request: Request):
+        """Common latency, auth and failure handling; returns an error response or None."""
+        gateway.requests += 1
+        if gateway.latency_ms:
+            await asyncio.sleep(gateway.latency_ms / 1000)
+        if not request.headers.get("authorization", "").startswith("Basic "):
+            return JSONResponse(
+                status_code=401,
+                content={"status_code": "401", "error_messages": ["Access denied, please check client or server key"]}
+            )
+        if random.random() < gateway.error_rate:
+            return JSONResponse(status_code=503, content={"status_code": "503", "status_message": "Service unavailable"})
+        return None
+
+    @app.post("/snap/v1/transactions")
+    async def create_transaction(request: Request):
+        error = await simulate(request)
+        if error:
+            return error
+
+        params = await request.json()
+        details = params.get("transaction_details") or {}
+        order_id = details.get("order_id")
+        if not order_id or not details.get("gross_amount"):
+            return JSONResponse(
+                status_code=400,
+                content={"error_messages": ["transaction_details.order_id and gross_amount are required"]}
+            )
+        if order_id in gateway.transactions:
+            return JSONResponse(
+                status_code=400,
+                content={"error_messages": ["transaction_details.order_id has already been taken"]}
+            )
+
+        token = str(uuid.uuid4())
+        gateway.transactions[order_id] = {
+            "order_id": order_id,
+            "gross_amount": f"{details['gross_amount']}.00",
+            "transaction_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        return JSONResponse(
+            status_code=201,
+            content={
+                "token": token,
+                "redirect_url": f"{request.base_url}snap/v2/vtweb/{token}"
+            }
+        )
+
+    @app.get("/v2/{order_id}/status")
+    async def transaction_status(order_id: str, request: Request):
+        error = await simulate(request)
+        if error:
+            return error
+
+        transaction = gateway.transactions.get(order_id)
+        if transaction is None:
+            # Core API reports errors in the body with HTTP 200
+            return {"status_code": "404", "status_message": "Transaction doesn't exist."}
+        return {
+            "status_code": "201",
+            "status_message": "Success, transaction is found",
+            "transaction_status": "pending",
+            "fraud_status": "accept",
+            "currency": "IDR",
+            **transaction
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Midtrans gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    gateway = FakeGateway(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    uvicorn.run(create_app(gateway), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,82 @@
+import asyncio
+import sys
+import os
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401 - register all mappers
+from app.config import get_settings
+from app.services.encryption import is_encrypted_header, HEADER_SIZE
+from app.services.storage import get_storage
+
+async def migrate_blob_encryption():
+    settings = get_settings()
+    try:
+        engine = create_async_engine(
+            settings.database_url,
+            connect_args={"statement_cache_size": 0}
+        )
+
+        async with engine.begin() as conn:
+            print("Adding blobs.is_encrypted...")
+            await conn.execute(text("ALTER TABLE blobs ADD COLUMN IF NOT EXISTS is_encrypted BOOLEAN"))
+
+        # Label existing blobs by what is actually stored, not by their documents
+        async with engine.connect() as conn:
+            result = await conn.execute(text(
+                "SELECT id, storage_type, storage_path FROM blobs WHERE is_encrypted IS NULL ORDER BY id"
+            ))
+            blobs = result.all()
+
+        encrypted = plaintext = missing = 0
+        for blob_id, storage_type, storage_path in blobs:
+            try:
+                header = await get_storage(storage_type or "local").read(storage_path, 0, HEADER_SIZE - 1)
+                is_encrypted = is_encrypted_header(header)
+            except FileNotFoundError:
+                is_encrypted = True
+                missing += 1
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text("UPDATE blobs SET is_encrypted = :encrypted WHERE id = :id"),
+                    {"encrypted": is_encrypted, "id": blob_id}
+                )
+            if is_encrypted:
+                encrypted += 1
+            else:
+                plaintext += 1
+        print(f"✅ Labelled {encrypted} encrypted and {plaintext} plaintext blobs ({missing} missing on storage).")
+
+        async with engine.begin() as conn:
+            print("Deduplicating on (content_hash, is_encrypted)...")
+            await conn.execute(text("ALTER TABLE blobs ALTER COLUMN is_encrypted SET DEFAULT true"))
+            await conn.execute(text("ALTER TABLE blobs ALTER COLUMN is_encrypted SET NOT NULL"))
+            await conn.execute(text("ALTER TABLE blobs DROP CONSTRAINT IF EXISTS blobs_content_hash_key"))
+            await conn.execute(text("""
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_blobs_content_hash_encrypted') THEN
+                        ALTER TABLE blobs ADD CONSTRAINT uq_blobs_content_hash_encrypted UNIQUE (content_hash, is_encrypted);
+                    END IF;
+                END $$;
+            """))
+
+            # Documents that shared a blob stored the other way were mislabelled
+            result = await conn.execute(text("""
+                UPDATE documents d
+                SET is_encrypted = CASE WHEN b.is_encrypted THEN 'true' ELSE 'false' END
+                FROM blobs b
+                WHERE d.blob_id = b.id
+                  AND d.is_encrypted IS DISTINCT FROM CASE WHEN b.is_encrypted THEN 'true' ELSE 'false' END
+            """))
+            print(f"✅ Relabelled {result.rowcount} documents to match their blobs.")
+
+        await engine.dispose()
+    except Exception as e:
+        print(f"❌ Error migrating blob encryption: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_blob_encryption())
@@ -0,0 +1,37 @@
+import asyncio
+import sys
+import os
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import text
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings
+from app.models.business import BUSINESS_SEARCH_DDL
+
+async def migrate_business_search():
+    settings = get_settings()
+    try:
+        engine = create_async_engine(
+            settings.database_url,
+            connect_args={"statement_cache_size": 0}
+        )
+
+        async with engine.begin() as conn:
+            print("Adding directory full-text search column and indexes...")
+
+            # Same statements that run on create_all for fresh databases
+            for statement in BUSINESS_SEARCH_DDL:
+                await conn.execute(text(statement))
+            print("✅ businesses.search_vector and search indexes are in place.")
+
+            await conn.execute(text("ANALYZE businesses;"))
+            print("✅ businesses statistics refreshed.")
+
+        await engine.dispose()
+    except Exception as e:
+        print(f"❌ Error migrating search: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_business_search())
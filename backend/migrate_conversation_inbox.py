@@ -0,0 +1,44 @@
+import asyncio
+import sys
+import os
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import text
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401 - register all mappers
+from app.config import get_settings
+from app.models.message import Conversation
+from app.services.inbox import reconcile_conversation_counters
+
+async def migrate_conversation_inbox():
+    settings = get_settings()
+    try:
+        engine = create_async_engine(
+            settings.database_url,
+            connect_args={"statement_cache_size": 0}
+        )
+
+        async with engine.begin() as conn:
+            print("Adding inbox snapshot columns to conversations...")
+            await conn.execute(text("ALTER TABLE conversations ADD COLUMN IF NOT EXISTS unread_count_1 INTEGER DEFAULT 0;"))
+            await conn.execute(text("ALTER TABLE conversations ADD COLUMN IF NOT EXISTS unread_count_2 INTEGER DEFAULT 0;"))
+            await conn.execute(text("ALTER TABLE conversations ADD COLUMN IF NOT EXISTS last_message_preview VARCHAR(100);"))
+            await conn.execute(text("ALTER TABLE conversations ADD COLUMN IF NOT EXISTS last_sender_id INTEGER REFERENCES users(id);"))
+            for index in Conversation.__table__.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+            print("✅ conversations columns and inbox indexes are in place.")
+
+        # Backfill the snapshot from messages, in batches
+        session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_maker() as db:
+            total = await reconcile_conversation_counters(db)
+            print(f"✅ Reconciled {total} conversations.")
+
+        await engine.dispose()
+    except Exception as e:
+        print(f"❌ Error migrating conversations: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_conversation_inbox())
@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import sys
+import os
+from functools import partial
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import select, text
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401 - register all mappers
+from app.config import get_settings
+from app.models.document import Blob, Document
+from app.services.blob_store import new_blob_key, commit_blob
+from app.services.encryption import FileEncryptor, is_encrypted_header, decrypt_range, HEADER_SIZE
+from app.services.storage import get_storage, StorageBackend
+from app.services.uploads import StoredFile
+
+BATCH_SIZE = 100
+
+
+async def _plaintext_chunks(source: StorageBackend, key: str, stored_size: int):
+    """Plaintext of a stored object, whether or not it is encrypted."""
+    header = await source.read(key, 0, HEADER_SIZE - 1)
+    if is_encrypted_header(header):
+        async for chunk in decrypt_range(partial(source.get, key), stored_size, header=header):
+            yield chunk
+        return
+    async for chunk in source.get(key):
+        yield chunk
+
+
+async def _restore_encrypted(source: StorageBackend, key: str, target: StorageBackend, new_key: str) -> StoredFile:
+    """Re-hash a stored object and write an encrypted copy under `new_key`."""
+    digest = hashlib.sha256()
+    encryptor = FileEncryptor()
+    size = 0
+
+    async def sealed_chunks():
+        nonlocal size
+        async for chunk in _plaintext_chunks(source, key, await source.size(key)):
+            digest.update(chunk)
+            size += len(chunk)
+            yield encryptor.update(chunk)
+        yield encryptor.finalize()
+
+    stored_size = await target.put(new_key, sealed_chunks())
+    return StoredFile(size=size, sha256=digest.hexdigest(), stored_size=stored_size)
+
+
+async def migrate_document_blobs():
+    settings = get_settings()
+    try:
+        engine = create_async_engine(
+            settings.database_url,
+            connect_args={"statement_cache_size": 0}
+        )
+
+        async with engine.begin() as conn:
+            print("Adding blob store table and documents.blob_id...")
+            await conn.run_sync(Blob.__table__.create, checkfirst=True)
+            await conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS blob_id INTEGER REFERENCES blobs(id);"))
+            for index in Document.__table__.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+            print("✅ blobs table and documents.blob_id are in place.")
+
+        # Re-hash and dedupe existing files, one committed batch at a time
+        session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        target = get_storage()
+        migrated = missing = 0
+        last_id = 0
+        async with session_maker() as db:
+            while True:
+                result = await db.execute(
+                    select(Document)
+                    .where(Document.id > last_id, Document.blob_id.is_(None))
+                    .order_by(Document.id)
+                    .limit(BATCH_SIZE)
+                )
+                documents = result.scalars().all()
+                if not documents:
+                    break
+
+                old_objects = []
+                for document in documents:
+                    source = get_storage(document.storage_type or "local")
+                    try:
+                        await source.size(document.storage_path)
+                    except FileNotFoundError:
+                        missing += 1
+                        continue
+
+                    key = new_blob_key()
+                    stored = await _restore_encrypted(source, document.storage_path, target, key)
+                    blob = await commit_blob(db, target, key, stored, encrypted=True)
+
+                    old_objects.append((source, document.storage_path))
+                    document.blob_id = blob.id
+                    document.content_hash = stored.sha256
+                    document.file_size = stored.size
+                    document.filename = blob.storage_path.rsplit("/", 1)[-1]
+                    document.storage_path = blob.storage_path
+                    document.storage_type = blob.storage_type
+                    document.is_encrypted = "true"
+                    migrated += 1
+
+                await db.commit()
+
+                # Originals are only removed once their documents point at blobs
+                for source, old_key in old_objects:
+                    await source.delete(old_key)
+
+                last_id = documents[-1].id
+                print(f"   ...{migrated} documents moved to the blob store")
+
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT count(*) FROM blobs;"))
+            print(f"✅ Migrated {migrated} documents into {result.scalar()} blobs ({missing} files missing on storage).")
+
+        await engine.dispose()
+    except Exception as e:
+        print(f"❌ Error migrating document blobs: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_document_blobs())
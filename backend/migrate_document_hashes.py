@@ -0,0 +1,33 @@
+import asyncio
+import sys
+import os
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import text
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings
+from app.models.document import Document
+
+async def migrate_document_hashes():
+    settings = get_settings()
+    try:
+        engine = create_async_engine(
+            settings.database_url,
+            connect_args={"statement_cache_size": 0}
+        )
+
+        async with engine.begin() as conn:
+            print("Adding content hash column to documents...")
+            await conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);"))
+            for index in Document.__table__.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+            print("✅ documents.content_hash is in place (existing rows keep a fallback ETag).")
+
+        await engine.dispose()
+    except Exception as e:
+        print(f"❌ Error migrating documents: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_document_hashes())
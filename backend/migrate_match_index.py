@@ -0,0 +1,33 @@
+import asyncio
+import sys
+import os
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401 - register all mappers
+from app.config import get_settings
+from app.models.matching import MatchIndexChange
+
+async def migrate_match_index():
+    settings = get_settings()
+    try:
+        engine = create_async_engine(
+            settings.database_url,
+            connect_args={"statement_cache_size": 0}
+        )
+
+        async with engine.begin() as conn:
+            print("Adding match index change feed table...")
+            await conn.run_sync(MatchIndexChange.__table__.create, checkfirst=True)
+            for index in MatchIndexChange.__table__.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+            print("✅ match_index_changes table is in place.")
+
+        await engine.dispose()
+    except Exception as e:
+        print(f"❌ Error migrating match index feed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_match_index())
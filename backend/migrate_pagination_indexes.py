@@ -0,0 +1,45 @@
+import asyncio
+import sys
+import os
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import text
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings
+from app.models.business import Business
+from app.models.message import Message
+from app.models.rfq import RFQ
+from app.models.user import User
+
+async def migrate_pagination_indexes():
+    settings = get_settings()
+    try:
+        engine = create_async_engine(
+            settings.database_url,
+            connect_args={"statement_cache_size": 0}
+        )
+
+        async with engine.begin() as conn:
+            # Keyset comparisons skip rows with NULL sort keys
+            print("Backfilling NULL sort keys...")
+            await conn.execute(text("UPDATE businesses SET is_featured = FALSE WHERE is_featured IS NULL;"))
+            await conn.execute(text("UPDATE businesses SET health_score = 0 WHERE health_score IS NULL;"))
+            await conn.execute(text("UPDATE rfqs SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;"))
+            await conn.execute(text("UPDATE users SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;"))
+            print("✅ Sort keys backfilled.")
+
+            print("Creating keyset pagination indexes...")
+            for model in (Business, RFQ, User, Message):
+                for index in model.__table__.indexes:
+                    if len(index.columns) > 1:
+                        await conn.run_sync(index.create, checkfirst=True)
+                        print(f"✅ {index.name}")
+
+        await engine.dispose()
+    except Exception as e:
+        print(f"❌ Error creating indexes: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_pagination_indexes())
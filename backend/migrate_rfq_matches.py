@@ -0,0 +1,33 @@
+import asyncio
+import sys
+import os
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401 - register all mappers
+from app.config import get_settings
+from app.models.rfq import RFQMatch
+
+async def migrate_rfq_matches():
+    settings = get_settings()
+    try:
+        engine = create_async_engine(
+            settings.database_url,
+            connect_args={"statement_cache_size": 0}
+        )
+
+        async with engine.begin() as conn:
+            print("Adding RFQ supplier matches table...")
+            await conn.run_sync(RFQMatch.__table__.create, checkfirst=True)
+            for index in RFQMatch.__table__.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+            print("✅ rfq_matches table is in place.")
+
+        await engine.dispose()
+    except Exception as e:
+        print(f"❌ Error migrating RFQ matches: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_rfq_matches())
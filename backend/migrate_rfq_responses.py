@@ -0,0 +1,57 @@
+import asyncio
+import sys
+import os
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings
+
+async def migrate_rfq_responses():
+    settings = get_settings()
+    try:
+        engine = create_async_engine(
+            settings.database_url,
+            connect_args={"statement_cache_size": 0}
+        )
+
+        async with engine.begin() as conn:
+            print("Removing duplicate quotes (keeping each supplier's first)...")
+            result = await conn.execute(text("""
+                DELETE FROM rfq_responses r
+                USING rfq_responses first
+                WHERE r.rfq_id = first.rfq_id
+                  AND r.responder_id = first.responder_id
+                  AND r.id > first.id
+                RETURNING r.rfq_id
+            """))
+            rfq_ids = sorted({row[0] for row in result})
+
+            # Counts of the affected RFQs included the removed duplicates
+            if rfq_ids:
+                await conn.execute(text("""
+                    UPDATE rfqs
+                    SET response_count = (SELECT count(*) FROM rfq_responses WHERE rfq_responses.rfq_id = rfqs.id)
+                    WHERE id = ANY(:ids)
+                """), {"ids": rfq_ids})
+            print(f"✅ Cleaned up duplicate quotes on {len(rfq_ids)} RFQs.")
+
+            print("Adding unique constraint on (rfq_id, responder_id)...")
+            await conn.execute(text("""
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_rfq_responses_rfq_responder') THEN
+                        ALTER TABLE rfq_responses ADD CONSTRAINT uq_rfq_responses_rfq_responder UNIQUE (rfq_id, responder_id);
+                    END IF;
+                END $$;
+            """))
+            print("✅ rfq_responses allows one quote per supplier.")
+
+        await engine.dispose()
+    except Exception as e:
+        print(f"❌ Error migrating RFQ responses: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_rfq_responses())
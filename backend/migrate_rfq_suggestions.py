@@ -0,0 +1,36 @@
+import asyncio
+import sys
+import os
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401 - register all mappers
+from app.config import get_settings
+from app.models.rfq import RFQMatch
+
+async def migrate_rfq_suggestions():
+    settings = get_settings()
+    try:
+        engine = create_async_engine(
+            settings.database_url,
+            connect_args={"statement_cache_size": 0}
+        )
+
+        async with engine.begin() as conn:
+            print("Turning rfq_matches into per-business suggestion feeds...")
+            await conn.run_sync(RFQMatch.__table__.create, checkfirst=True)
+            # Per-RFQ rank has no meaning once business refreshes add entries
+            await conn.execute(text("ALTER TABLE rfq_matches DROP COLUMN IF EXISTS rank"))
+            for index in RFQMatch.__table__.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+            print("✅ rfq_matches is ready for suggestion feeds.")
+
+        await engine.dispose()
+    except Exception as e:
+        print(f"❌ Error migrating RFQ suggestions: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_rfq_suggestions())
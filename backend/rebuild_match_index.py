@@ -0,0 +1,32 @@
+import asyncio
+import sys
+import os
+import time
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401 - register all mappers
+from app.database import async_session_maker
+from app.services.matching import build_match_index, request_match_index_rebuild
+
+async def rebuild_match_index():
+    """
+    Rebuild the B2B match index everywhere (disaster recovery).
+
+    Builds the index once here to check every verified business encodes,
+    then asks all running API processes to rebuild theirs from scratch.
+    """
+    print("Rebuilding match index...")
+    try:
+        async with async_session_maker() as db:
+            start = time.perf_counter()
+            index = await build_match_index(db)
+            print(f"   Encoded {len(index)} verified businesses in {time.perf_counter() - start:.2f}s")
+            await request_match_index_rebuild(db)
+            print("✅ Rebuild requested; API processes pick it up on their next feed poll.")
+    except Exception as e:
+        print(f"❌ Error rebuilding match index: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_match_index())
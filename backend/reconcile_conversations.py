@@ -0,0 +1,23 @@
+import asyncio
+import sys
+import os
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401 - register all mappers
+from app.database import async_session_maker
+from app.services.inbox import reconcile_conversation_counters
+
+async def reconcile_conversations():
+    """Rebuild unread counters and last-message snapshots from messages."""
+    print("Reconciling conversation inbox snapshots...")
+    try:
+        async with async_session_maker() as db:
+            total = await reconcile_conversation_counters(db)
+            print(f"✅ Reconciled {total} conversations.")
+    except Exception as e:
+        print(f"❌ Error reconciling conversations: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(reconcile_conversations())
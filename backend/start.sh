@@ -1,2 +1,6 @@
 #!/bin/bash
+# uvicorn takes the client address from X-Forwarded-For only when the
+# connection comes from FORWARDED_ALLOW_IPS (default 127.0.0.1). Behind the
+# platform proxy, set it to the proxy's address or CIDR, never "*": any
+# client can put its own entry in X-Forwarded-For
 exec uvicorn app.main:app --host 0.0.0.0 --port ${PORT:-8000}
@@ -0,0 +1,139 @@
+"""
+Buffered counter checks (in-process buffer; SQLite for the batched UPDATE).
+
+Needs the usual backend environment (.env):
+    python -m pytest -q test_counters.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import counters
+from app.services.counters import CounterBuffer
+
+
+@pytest.fixture
+def applied(monkeypatch):
+    """Record flushed batches instead of writing them."""
+    batches = []
+
+    async def apply_counts(pending):
+        batches.append(dict(pending))
+
+    monkeypatch.setattr(counters, "apply_counts", apply_counts)
+    return batches
+
+
+def test_counts_are_batched_and_deduped(applied):
+    async def run():
+        buffer = CounterBuffer()
+        for _ in range(3):
+            await buffer.count("rfq.views", 1, viewer="user:7")
+        await buffer.count("rfq.views", 1, viewer="user:8")
+        await buffer.count("rfq.responses", 1)
+        await buffer.count("rfq.responses", 1)
+
+        assert await buffer.flush() == 2
+        assert await buffer.flush() == 0
+        await buffer.close()
+
+    asyncio.run(run())
+    assert applied == [{("rfq.views", 1): 2, ("rfq.responses", 1): 2}]
+
+
+def test_failed_flush_keeps_the_batch(monkeypatch):
+    async def run():
+        async def fail(pending):
+            raise RuntimeError("database down")
+
+        buffer = CounterBuffer()
+        await buffer.count("document.downloads", 5, n=3)
+        monkeypatch.setattr(counters, "apply_counts", fail)
+        with pytest.raises(RuntimeError):
+            await buffer.flush()
+        await buffer.count("document.downloads", 5)
+
+        assert dict(buffer._pending) == {("document.downloads", 5): 4}
+        buffer._task.cancel()
+
+    asyncio.run(run())
+
+
+def test_cancelled_flush_keeps_the_batch(monkeypatch):
+    async def run():
+        async def hang(pending):
+            await asyncio.sleep(3600)
+
+        buffer = CounterBuffer()
+        await buffer.count("rfq.views", 2, n=5)
+        monkeypatch.setattr(counters, "apply_counts", hang)
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.01)
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+
+        assert dict(buffer._pending) == {("rfq.views", 2): 5}
+        buffer._task.cancel()
+
+    asyncio.run(run())
+
+
+def test_close_waits_for_an_in_flight_flush(monkeypatch):
+    batches = []
+
+    async def slow(pending):
+        await asyncio.sleep(0.05)
+        batches.append(dict(pending))
+
+    async def run():
+        monkeypatch.setattr(counters, "apply_counts", slow)
+        monkeypatch.setattr(counters, "COUNTER_FLUSH_SECONDS", 0.01)
+        buffer = CounterBuffer()
+        await buffer.count("rfq.views", 3)
+        await asyncio.sleep(0.03)  # The flusher is now inside apply_counts
+        await buffer.count("rfq.views", 3)
+        await buffer.close()
+
+    asyncio.run(run())
+    assert batches == [{("rfq.views", 3): 1}, {("rfq.views", 3): 1}]
+
+
+def test_apply_counts_adds_in_sql(tmp_path, monkeypatch):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.database import Base
+    from app.models.business import Business
+    from app.models.rfq import RFQ
+    from app.models.user import User
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'counters.db'}")
+        session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        monkeypatch.setattr(counters, "async_session_maker", session_maker)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            db.add(User(id=1, email="buyer@example.com", password_hash="x"))
+            db.add(Business(id=1, owner_id=1, name="Buyer"))
+            db.add_all([RFQ(id=i, business_id=1, title=f"RFQ {i}", view_count=10) for i in (1, 2)])
+            await db.commit()
+
+        # Two flushes from different processes both add up
+        await counters.apply_counts({("rfq.views", 1): 3, ("rfq.views", 2): 1, ("rfq.responses", 1): 2})
+        await counters.apply_counts({("rfq.views", 1): 4})
+
+        async with session_maker() as db:
+            rows = (await db.execute(select(RFQ.id, RFQ.view_count, RFQ.response_count).order_by(RFQ.id))).all()
+        await engine.dispose()
+        return [tuple(row) for row in rows]
+
+    assert asyncio.run(run()) == [(1, 17, 2), (2, 11, 0)]
@@ -0,0 +1,164 @@
+"""
+B2B match index checks (in memory; SQLite for the change feed).
+
+Needs the usual backend environment (.env):
+    python -m pytest -q test_match_index.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.matching import MatchIndex, MatchIndexUpdater, MatchProfile
+
+# (id, category, province, city, export countries, certifications,
+#  employees, health, marketing, finance, legal, export ready)
+BUSINESSES = [
+    (1, "Furniture", "Jawa Tengah", "Jepara", ["Netherlands"], ["SVLK"], 40, 90, 80, 80, 80, True),
+    (2, "Furniture", "Jawa Tengah", "Jepara", ["Netherlands", "Japan"], ["SVLK", "FSC"], 30, 80, 70, 70, 70, True),
+    (3, "Furniture", "DI Yogyakarta", "Bantul", ["Japan"], [], 12, 60, 60, 60, 60, False),
+    (4, "Furniture", "Papua", "Jayapura", [], [], 3, 40, 40, 40, 40, False),
+    (5, "Makanan", "Jawa Tengah", "Jepara", ["Netherlands"], ["Halal"], 40, 90, 90, 90, 90, True),
+]
+
+
+def _buyer(business_id=1, category="furniture", province="jawa tengah", city="jepara") -> MatchProfile:
+    return MatchProfile(
+        business_id=business_id,
+        category=category,
+        province=province,
+        city=city,
+        countries={"netherlands": "Netherlands"},
+        certifications={"svlk": "SVLK"},
+        size_band=2
+    )
+
+
+def test_match_ranks_within_category_and_skips_self():
+    index = MatchIndex(BUSINESSES)
+
+    hits = index.match(_buyer())
+    assert [hit.business_id for hit in hits] == [2, 3, 4]
+    assert hits[0].score > hits[1].score > hits[2].score
+    assert all(0 <= hit.score <= 100 for hit in hits)
+    assert "Berada di kota yang sama" in hits[0].reasons
+    assert "Pasar ekspor sama: Netherlands" in hits[0].reasons
+
+
+def test_match_respects_limit():
+    index = MatchIndex(BUSINESSES)
+
+    assert [hit.business_id for hit in index.match(_buyer(), limit=1)] == [2]
+    assert index.match(_buyer(), limit=0) == []
+
+
+def test_match_without_known_category_stays_in_province():
+    index = MatchIndex(BUSINESSES)
+
+    hits = index.match(_buyer(business_id=None, category="tekstil"))
+    assert sorted(hit.business_id for hit in hits) == [1, 2, 5]
+    assert index.match(_buyer(business_id=None, category=None, province=None)) == []
+
+
+def test_upsert_replaces_a_business():
+    index = MatchIndex(BUSINESSES)
+
+    index.upsert((2, "Kerajinan", "Bali", "Gianyar", ["Germany"], ["SNI"], 30, 80, 70, 70, 70, True))
+    assert len(index) == len(BUSINESSES)
+    assert index.dead_rows == 1
+    assert [hit.business_id for hit in index.match(_buyer())] == [3, 4]
+    hits = index.match(MatchProfile(None, "kerajinan", "bali", "gianyar", {"germany": "Germany"}, {"sni": "SNI"}))
+    assert [hit.business_id for hit in hits] == [2]
+    assert "Pasar ekspor sama: Germany" in hits[0].reasons
+
+
+def test_upsert_adds_a_business_with_new_names():
+    index = MatchIndex(BUSINESSES)
+
+    index.upsert((6, "Furniture", "Maluku Utara", "Ternate", ["Korea"], ["ISO 9001"], 8, 70, 70, 70, 70, True))
+    assert len(index) == len(BUSINESSES) + 1
+    assert 6 in [hit.business_id for hit in index.match(_buyer())]
+    hits = index.match(MatchProfile(None, "furniture", "maluku utara", "ternate", {"korea": "Korea"}))
+    assert hits[0].business_id == 6
+    assert "Berada di kota yang sama" in hits[0].reasons
+
+
+def test_remove_drops_a_business():
+    index = MatchIndex(BUSINESSES)
+
+    index.remove(2)
+    index.remove(2)
+    index.remove(404)  # Not indexed
+    assert len(index) == len(BUSINESSES) - 1
+    assert index.dead_rows == 1
+    assert [hit.business_id for hit in index.match(_buyer())] == [3, 4]
+    assert 2 not in index.business_ids[index.live_rows("furniture")]
+
+
+def test_apply_changes_picks_up_late_feed_ids(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy import update
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.database import Base
+    from app.models.business import Business
+    from app.models.matching import MatchIndexChange
+    from app.models.user import User
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'feed.db'}")
+        session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        updater = MatchIndexUpdater()
+        updater.index = MatchIndex([])
+        async with session_maker() as db:
+            for business_id, category, province, city, *_ in BUSINESSES[:3]:
+                db.add(User(id=business_id, email=f"owner{business_id}@example.com", password_hash="x"))
+                db.add(Business(
+                    id=business_id, owner_id=business_id, name=f"Business {business_id}",
+                    category=category, province=province, city=city, is_verified=True
+                ))
+            # Feed id 2 is still committing when the first poll runs
+            db.add_all([MatchIndexChange(id=1, business_id=1), MatchIndexChange(id=3, business_id=3)])
+            await db.commit()
+
+            assert await updater.apply_changes(db) == 2
+            assert sorted(updater.index.position) == [1, 3]
+            assert updater.index.change_id == 3
+            assert list(updater._gaps) == [2]
+
+            db.add(MatchIndexChange(id=2, business_id=2))
+            await db.commit()
+            assert await updater.apply_changes(db) == 1
+            assert sorted(updater.index.position) == [1, 2, 3]
+            assert updater.index.change_id == 3
+            assert updater._gaps == {}
+            assert await updater.apply_changes(db) == 0
+
+            # Unverified: out of the index
+            await db.execute(update(Business).where(Business.id == 1).values(is_verified=False))
+            db.add(MatchIndexChange(id=4, business_id=1))
+            await db.commit()
+            assert await updater.apply_changes(db) == 1
+            assert sorted(updater.index.position) == [2, 3]
+
+            # A rebuild request is served once, though the rebuilt index re-reads it
+            db.add(MatchIndexChange(id=5, business_id=None))
+            await db.commit()
+            await updater.apply_changes(db)
+            assert updater.rebuilds == 1
+            assert sorted(updater.index.position) == [2, 3]
+            while await updater.apply_changes(db):
+                pass
+            assert updater.rebuilds == 1
+            assert updater.index.change_id == 5
+        await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,121 @@
+"""
+Inbox and message paging checks (SQLite, no server needed).
+
+The inbox must cost the same number of SQL statements however many
+conversations it shows, and a page anchor must be a message of the
+conversation being paged:
+    python -m pytest -q test_message_inbox.py
+"""
+
+import asyncio
+import os
+import sys
+from typing import Tuple
+
+import pytest
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("aiosqlite")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base, count_query, get_db
+from app.main import app, settings
+from app.models.business import Business
+from app.models.user import User
+from app.services.auth import create_access_token
+from app.services.encryption import encode_id
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'inbox.db'}")
+    event.listen(engine.sync_engine, "before_cursor_execute", count_query)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            for i in range(1, 42):
+                db.add(User(id=i, email=f"user{i}@example.com", password_hash="x", full_name=f"User {i}"))
+                db.add(Business(id=i, owner_id=i, name=f"Business {i}"))
+            await db.commit()
+
+    async def override_get_db():
+        async with session_maker() as db:
+            try:
+                yield db
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+    asyncio.run(setup())
+    monkeypatch.setattr(settings, "debug", True)  # Enables X-Query-Count
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        asyncio.run(engine.dispose())
+
+
+def _auth(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user_id, 'user')}"}
+
+
+def _inbox_queries(client: TestClient) -> Tuple[int, int]:
+    """Conversations in the inbox, and the statements it took."""
+    client.get("/api/messages/conversations", headers=_auth(1))  # Warm the principal cache
+    response = client.get("/api/messages/conversations", params={"limit": 100}, headers=_auth(1))
+    assert response.status_code == 200
+    return len(response.json()), int(response.headers["X-Query-Count"])
+
+
+def test_inbox_query_count_is_constant(client):
+    counts = {}
+    sender = 2
+    for size in (1, 10, 40):
+        while sender <= size + 1:
+            response = client.post(
+                "/api/messages/send",
+                json={"recipient_id": encode_id(1), "content": f"Hello from {sender}"},
+                headers=_auth(sender)
+            )
+            assert response.status_code == 201
+            sender += 1
+        conversations, queries = _inbox_queries(client)
+        assert conversations == size
+        counts[size] = queries
+
+    assert len(set(counts.values())) == 1, counts
+
+
+def _send(client: TestClient, sender: int, recipient: int, content: str) -> dict:
+    response = client.post(
+        "/api/messages/send",
+        json={"recipient_id": encode_id(recipient), "content": content},
+        headers=_auth(sender)
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_foreign_page_anchor_is_not_found(client):
+    sent = [_send(client, 2, 1, f"Message {n}") for n in range(3)]
+    conversation = sent[0]["conversation_id"]
+    other = _send(client, 3, 1, "Elsewhere")
+
+    for anchor in (other["message_id"], encode_id(999), "not-an-id"):
+        response = client.get(f"/api/messages/{conversation}", params={"before": anchor}, headers=_auth(1))
+        assert response.status_code == 404
+    inbox = client.get("/api/messages/conversations", headers=_auth(1)).json()
+    assert {c["id"]: c["unread_count"] for c in inbox}[conversation] == 3  # A 404 marks nothing read
+
+    response = client.get(f"/api/messages/{conversation}", params={"before": sent[2]["message_id"]}, headers=_auth(1))
+    assert [m["content"] for m in response.json()] == ["Message 0", "Message 1"]
@@ -0,0 +1,78 @@
+"""
+Midtrans client circuit breaker checks (no gateway needed).
+
+Needs the usual backend environment (.env):
+    python -m pytest -q test_payment.py
+"""
+
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.payment import CircuitBreaker, MidtransClient, MidtransError
+
+
+def _client(handler) -> MidtransClient:
+    client = MidtransClient("server-key", False, "http://midtrans.test")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.breaker = CircuitBreaker(threshold=1, reset_seconds=0.05)
+    return client
+
+
+async def _hang(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(3600)
+
+
+def test_cancelled_trial_lets_the_breaker_try_again():
+    async def run():
+        client = _client(_hang)
+        client.breaker.record_failure()  # Open
+        await asyncio.sleep(0.06)
+
+        trial = asyncio.create_task(client.transaction_status("UPL-1"))
+        await asyncio.sleep(0.01)
+        assert not client.breaker.allow()  # Trial in flight
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        assert client.breaker.allow()
+        await client.close()
+
+    asyncio.run(run())
+
+
+def test_unexpected_error_settles_the_trial():
+    async def run():
+        def redirect(request: httpx.Request) -> httpx.Response:
+            raise httpx.TooManyRedirects("loop", request=request)
+
+        client = _client(redirect)
+        client.breaker.record_failure()
+        await asyncio.sleep(0.06)
+
+        with pytest.raises(httpx.TooManyRedirects):
+            await client.transaction_status("UPL-1")
+        assert client.breaker.allow()
+        await client.close()
+
+    asyncio.run(run())
+
+
+def test_open_breaker_fails_fast():
+    async def run():
+        client = _client(_hang)
+        client.breaker.record_failure()
+
+        with pytest.raises(MidtransError) as exc:
+            await client.transaction_status("UPL-1")
+        assert exc.value.status_code == 503
+        await client.close()
+
+    asyncio.run(run())
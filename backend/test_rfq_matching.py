@@ -0,0 +1,42 @@
+"""
+RFQ supplier matching checks (no database needed).
+
+Needs the usual backend environment (.env):
+    python -m pytest -q test_rfq_matching.py
+"""
+
+import os
+import sys
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.rfq import RFQ
+from app.services.matching import MatchIndex
+from app.services.rfq_matching import RFQProfile, score_rfqs
+
+# (id, category, province, city, export countries, certifications,
+#  employees, health, marketing, finance, legal, export ready)
+SUPPLIERS = [
+    (1, "Kerajinan", "Bali", "Gianyar", ["Australia"], ["SVLK"], 12, 80, 70, 60, 70, True),
+    (2, None, "Jawa Tengah", "Jepara", ["Netherlands"], ["SVLK"], 40, 90, 80, 80, 80, True),
+    (3, "Makanan", "DKI Jakarta", "Jakarta", [], [], 5, 60, 50, 50, 50, False),
+]
+
+
+def _profile(rfq_id: int, category: str) -> RFQProfile:
+    return RFQProfile.from_rfq(RFQ(id=rfq_id, business_id=99, title="RFQ", category=category))
+
+
+def test_unknown_category_matches_nobody():
+    index = MatchIndex(SUPPLIERS)
+
+    assert len(index.live_rows("furniture")) == 0
+    assert score_rfqs(index, [_profile(1, "Furniture")]) == [[]]
+
+
+def test_known_category_matches_only_its_suppliers():
+    index = MatchIndex(SUPPLIERS)
+
+    hits = score_rfqs(index, [_profile(1, "kerajinan")])[0]
+    assert [hit.business_id for hit in hits] == [1]
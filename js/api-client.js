@@ -451,6 +451,35 @@ const api = {
          */
         async getConversation(conversationHash, limit = 50) {
             return api.get(`/messages/${conversationHash}`, { limit });
+        },
+
+        /**
+         * Mark messages as read up to (and including) a message
+         * @param {string} conversationHash - Obfuscated conversation ID
+         * @param {string} upToMessageId - Obfuscated message ID
+         */
+        async markRead(conversationHash, upToMessageId) {
+            return api.post(`/messages/${conversationHash}/read`, {
+                up_to: upToMessageId
+            });
+        },
+
+        /**
+         * Subscribe to realtime message events (Server-Sent Events).
+         * Replaces polling getConversation() for new messages.
+         * @param {Object} handlers - { message, read, resync } callbacks
+         * @returns {EventSource} Call .close() to unsubscribe
+         */
+        stream(handlers = {}) {
+            const source = new EventSource(`${API_BASE}/messages/stream`, {
+                withCredentials: true
+            });
+            ['message', 'read', 'resync'].forEach(type => {
+                if (handlers[type]) {
+                    source.addEventListener(type, event => handlers[type](JSON.parse(event.data)));
+                }
+            });
+            return source;
         }
     },
 